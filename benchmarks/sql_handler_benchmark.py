@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares the throughput of mysql_statement_factory with sqlparse and with
+the hand written lexer, on a large CREATE TABLE, an ALTER TABLE and the BEGIN
+query events that precede every transaction.
+
+Usage:
+    python benchmarks/sql_handler_benchmark.py
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import timeit
+
+from replication_handler import config
+from replication_handler.components.sql_handler import mysql_statement_factory
+
+
+NUMBER = 200
+
+REPEAT = 5
+
+COLUMNS = 120
+
+
+def create_table_query():
+    columns = [
+        "  `column_{0}` varchar(255) COLLATE utf8_unicode_ci DEFAULT 'value {0}' "
+        "COMMENT 'column number {0}'".format(index)
+        for index in range(COLUMNS)
+    ]
+    return (
+        "CREATE TABLE IF NOT EXISTS `yelp`.`business` (\n"
+        "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT,\n"
+        "{columns},\n"
+        "  PRIMARY KEY (`id`),\n"
+        "  KEY `column_0_idx` (`column_0`)\n"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8 /* generated */".format(
+            columns=',\n'.join(columns)
+        )
+    )
+
+
+QUERIES = (
+    ('create', create_table_query()),
+    ('alter', "ALTER TABLE `yelp`.`business` ADD COLUMN `flag` tinyint(1) NOT NULL DEFAULT 0"),
+    ('begin', "BEGIN"),
+)
+
+
+def queries_per_second(query, ddl_lexer_enabled):
+    config.env_config._snapshot = config.env_config.snapshot._replace(
+        ddl_lexer_enabled=ddl_lexer_enabled
+    )
+    best = min(timeit.repeat(
+        lambda: mysql_statement_factory(query),
+        number=NUMBER,
+        repeat=REPEAT
+    ))
+    return NUMBER / best
+
+
+def main():
+    # mysql_statement_factory logs every query it parses.
+    logging.disable(logging.INFO)
+    for name, query in QUERIES:
+        sqlparse_qps = queries_per_second(query, ddl_lexer_enabled=False)
+        lexer_qps = queries_per_second(query, ddl_lexer_enabled=True)
+        print(
+            "{name:>6} ({length} bytes): sqlparse {sqlparse:.0f}/s, "
+            "lexer {lexer:.0f}/s ({speedup:.1f}x)".format(
+                name=name,
+                length=len(query),
+                sqlparse=sqlparse_qps,
+                lexer=lexer_qps,
+                speedup=lexer_qps / sqlparse_qps,
+            )
+        )
+    config.env_config.reload_snapshot()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares the per row cost of building the position dict and transaction id
+meta attribute with and without TransactionIdCache, on 1000 row transactions.
+
+Usage:
+    python benchmarks/transaction_id_cache_benchmark.py
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import timeit
+
+from replication_handler.util.position import GtidPosition
+from replication_handler.util.position import LogPosition
+from replication_handler.util.transaction_id import TransactionIdCache
+
+
+ROWS_PER_TRANSACTION = 1000
+
+TRANSACTIONS = 10
+
+REPEAT = 5
+
+TRANSACTION_ID_SCHEMA_ID = 911
+
+CLUSTER_NAME = 'refresh_primary'
+
+
+def gtid_positions():
+    return [
+        GtidPosition(gtid='sid:{}'.format(transaction), offset=offset)
+        for transaction in range(TRANSACTIONS)
+        for offset in range(ROWS_PER_TRANSACTION)
+    ]
+
+
+def log_positions():
+    return [
+        LogPosition(
+            log_pos=4 + transaction,
+            log_file='mysql-bin.000001',
+            offset=offset,
+            hb_serial=transaction,
+            hb_timestamp=1445429127 + transaction,
+        )
+        for transaction in range(TRANSACTIONS)
+        for offset in range(ROWS_PER_TRANSACTION)
+    ]
+
+
+def uncached(positions):
+    for position in positions:
+        position.to_dict()
+        position.get_transaction_id(TRANSACTION_ID_SCHEMA_ID, CLUSTER_NAME)
+
+
+def cached(positions):
+    cache = TransactionIdCache(TRANSACTION_ID_SCHEMA_ID)
+    for position in positions:
+        cache.get_position_dict(position, CLUSTER_NAME)
+        cache.get_meta_attribute(position, CLUSTER_NAME)
+
+
+def per_row_microseconds(func, positions):
+    best = min(timeit.repeat(lambda: func(positions), number=1, repeat=REPEAT))
+    return best * 1000000 / len(positions)
+
+
+def main():
+    for name, positions in (('gtid', gtid_positions()), ('log', log_positions())):
+        uncached_cost = per_row_microseconds(uncached, positions)
+        cached_cost = per_row_microseconds(cached, positions)
+        print(
+            "{name:>4}: uncached {uncached:.2f}us/row, cached {cached:.2f}us/row, "
+            "saved {saved:.2f}us/row ({speedup:.1f}x)".format(
+                name=name,
+                uncached=uncached_cost,
+                cached=cached_cost,
+                saved=uncached_cost - cached_cost,
+                speedup=uncached_cost / cached_cost,
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -20,9 +20,9 @@ import logging
 import os
 import signal
 import sys
+import time
 from collections import namedtuple
 from contextlib import contextmanager
-from functools import partial
 
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import TimeoutError
@@ -41,10 +41,19 @@ from replication_handler.components.schema_event_handler import SchemaEventHandl
 from replication_handler.components.schema_wrapper import SchemaWrapper
 from replication_handler.models.database import get_connection
 from replication_handler.models.global_event_state import EventType
+from replication_handler.util.catch_up_mode import CatchUpMode
+from replication_handler.util.heavy_hitters import TableHeavyHitters
+from replication_handler.util.in_flight_memory import InFlightMemory
+from replication_handler.util.in_flight_tables import InFlightTables
+from replication_handler.util.message_latency import MessageLatency
 from replication_handler.util.misc import DataEvent
 from replication_handler.util.misc import REPLICATION_HANDLER_PRODUCER_NAME
 from replication_handler.util.misc import REPLICATION_HANDLER_TEAM_NAME
 from replication_handler.util.misc import save_position
+from replication_handler.util.position import construct_position
+from replication_handler.util.position import GtidPosition
+from replication_handler.util.published_messages import PublishedMessages
+from replication_handler.util.startup_timeline import startup_timeline
 
 
 log = logging.getLogger('replication_handler.batch.base_parse_replication_stream')
@@ -65,22 +74,50 @@ class BaseParseReplicationStream(object):
 
     def __init__(self):
         super(BaseParseReplicationStream, self).__init__()
-        self.db_connections = get_connection(
-            config.env_config.topology_path,
-            config.env_config.rbr_source_cluster,
-            config.env_config.schema_tracker_cluster,
-            config.env_config.rbr_state_cluster,
-            config.env_config.rbr_source_cluster_topology_name,
-        )
-        self.schema_wrapper = SchemaWrapper(
-            db_connections=self.db_connections,
-            schematizer_client=get_schematizer()
-        )
+        with startup_timeline.phase('db_connections'):
+            self.db_connections = get_connection(
+                config.env_config.topology_path,
+                config.env_config.rbr_source_cluster,
+                config.env_config.schema_tracker_cluster,
+                config.env_config.rbr_state_cluster,
+                config.env_config.rbr_source_cluster_topology_name,
+            )
+        with startup_timeline.phase('schema_wrapper'):
+            self.schema_wrapper = SchemaWrapper(
+                db_connections=self.db_connections,
+                schematizer_client=get_schematizer()
+            )
         self.register_dry_run = config.env_config.register_dry_run
         self.publish_dry_run = config.env_config.publish_dry_run
         self._running = True
         self._profiler_running = False
         self._changelog_mode = config.env_config.changelog_mode
+        self._async_schema_resolution = config.env_config.async_schema_resolution
+        self._data_event_handler = None
+        self._schema_event_handler = None
+        self._in_flight_memory = self._get_in_flight_memory()
+        self._in_flight_tables = (
+            InFlightTables()
+            if config.env_config.ddl_flush_in_flight_tables_only else None
+        )
+        self._message_latency = self._get_message_latency()
+        self._published_messages = self._get_published_messages()
+        self._table_heavy_hitters = self._get_table_heavy_hitters()
+        self._catch_up_mode = self._get_catch_up_mode()
+        self._last_checkpoint_at = 0
+        self._skipped_checkpoints = 0
+        self._transaction_scoped_checkpoints = (
+            config.env_config.transaction_scoped_checkpoints
+        )
+        self._has_rows_to_checkpoint = False
+        self._rows_since_checkpoint = 0
+        self._max_rows_between_checkpoints = (
+            self._get_max_rows_between_checkpoints()
+            if self._transaction_scoped_checkpoints else None
+        )
+        self._batch_schema_event_checkpoints = (
+            config.env_config.batch_schema_event_checkpoints
+        )
         if get_config().kafka_producer_buffer_size > config.env_config.recovery_queue_size:
             # Printing here, since this executes *before* logging is
             # configured.
@@ -92,10 +129,62 @@ class BaseParseReplicationStream(object):
     def running(self):
         return self._running
 
+    def _get_in_flight_memory(self):
+        if not config.env_config.max_in_flight_bytes:
+            return None
+        return InFlightMemory(max_bytes=config.env_config.max_in_flight_bytes)
+
+    def _get_message_latency(self):
+        if not config.env_config.message_latency_tracing:
+            return None
+        return MessageLatency(
+            slow_threshold_seconds=config.env_config.slow_message_latency_seconds,
+            max_slow_traces=config.env_config.max_slow_message_traces
+        )
+
+    def _get_published_messages(self):
+        trackers = [
+            tracker for tracker in (
+                self._in_flight_memory,
+                self._in_flight_tables,
+                self._message_latency
+            )
+            if tracker is not None
+        ]
+        if not trackers:
+            return None
+        return PublishedMessages(trackers)
+
+    def _get_table_heavy_hitters(self):
+        if not config.env_config.table_heavy_hitters_capacity:
+            return None
+        return TableHeavyHitters(
+            capacity=config.env_config.table_heavy_hitters_capacity,
+            top_n=config.env_config.table_heavy_hitters_top_n,
+            log_interval_seconds=config.env_config.table_heavy_hitters_log_interval_seconds
+        )
+
+    def _get_catch_up_mode(self):
+        if config.env_config.catch_up_enter_delay_seconds is None:
+            return None
+        return CatchUpMode(
+            enter_delay_seconds=config.env_config.catch_up_enter_delay_seconds,
+            exit_delay_seconds=config.env_config.catch_up_exit_delay_seconds
+        )
+
     def _post_producer_setup(self):
         """ All these setups would need producer to be initialized."""
-        self.handler_map = self._build_handler_map()
-        self.stream = self._get_stream()
+        # Building the handlers registers schemas with the schematizer, which
+        # is independent of reading the saved state.  The handlers have to be
+        # built before the restart, whose recovery can checkpoint positions.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            handler_map_future = executor.submit(self._build_handler_map_phase)
+            with startup_timeline.phase('replication_stream_restarter'):
+                replication_stream_restarter = self._get_replication_stream_restarter()
+            self.handler_map = handler_map_future.result()
+        with startup_timeline.phase('restart'):
+            self.stream = self._get_stream(replication_stream_restarter)
+        startup_timeline.log()
 
     def run(self):
         try:
@@ -123,10 +212,13 @@ class BaseParseReplicationStream(object):
 
     @contextmanager
     def _setup_components(self):
-        with ZKLock(
-            "replication_handler",
-            config.env_config.namespace
-        ) as self.zk, self._setup_producer(
+        # The lock is acquired when it is created.
+        with startup_timeline.phase('zk_lock'):
+            zk_lock = ZKLock(
+                "replication_handler",
+                config.env_config.namespace
+            )
+        with zk_lock as self.zk, self._setup_producer(
         ) as self.producer, self._setup_counters(
         ) as self.counters, self._register_signal_handlers():
             yield
@@ -134,31 +226,61 @@ class BaseParseReplicationStream(object):
     def process_event(self, replication_handler_event):
         event_class = replication_handler_event.event.__class__
         self.current_event_type = self.handler_map[event_class].event_type
+        if self.current_event_type != EventType.DATA_EVENT:
+            if self.handler_map[event_class].handler.changes_schema(
+                replication_handler_event.event
+            ):
+                # Schema events change the schema cache, so rows held back
+                # for their schema have to be published before them.
+                self._publish_deferred_data_events(wait=True)
+            if self._transaction_scoped_checkpoints and self._has_rows_to_checkpoint:
+                # Every row event comes after the BEGIN of its transaction, so
+                # the next query event ends the transaction of the rows
+                # before it.
+                self._checkpoint_transaction_end()
+        else:
+            self._save_deferred_schema_event_checkpoint()
+            if self._transaction_scoped_checkpoints:
+                self._has_rows_to_checkpoint = True
+                self._checkpoint_long_transaction()
         self.handler_map[event_class].handler.handle_event(
             replication_handler_event.event,
             replication_handler_event.position
         )
+        if self._async_schema_resolution:
+            self._checkpoint_rows_published_out_of_order()
+        if self._catch_up_mode is not None:
+            self._update_catch_up_mode()
 
     def _get_events(self):
         with ThreadPoolExecutor(max_workers=1) as executor:
             future = None
             while self.running:
                 if future is None:
+                    self._wait_for_in_flight_memory()
                     future = executor.submit(self.stream.next)
 
                 try:
                     yield future.result(timeout=0.1)
                     future = None
                 except TimeoutError:
-                    self.producer.wake()
+                    self._handle_idle_stream()
+
+    def _handle_idle_stream(self):
+        """Called whenever no event arrived within the read timeout."""
+        self._save_deferred_schema_event_checkpoint()
+        self._publish_deferred_data_events()
+        self.producer.wake()
 
-    def _get_stream(self):
-        replication_stream_restarter = ReplicationStreamRestarter(
+    def _get_replication_stream_restarter(self):
+        return ReplicationStreamRestarter(
             self.db_connections,
             self.schema_wrapper,
             config.env_config.activate_mysql_dump_recovery,
             config.env_config.gtid_enabled
         )
+
+    def _get_stream(self, replication_stream_restarter):
         replication_stream_restarter.restart(
             self.producer,
             register_dry_run=self.register_dry_run,
@@ -181,43 +303,259 @@ class BaseParseReplicationStream(object):
             schema_wrapper=self.schema_wrapper,
             stats_counter=self.counters['data_event_counter'],
             register_dry_run=self.register_dry_run,
-            gtid_enabled=config.env_config.gtid_enabled
+            gtid_enabled=config.env_config.gtid_enabled,
+            async_schema_resolution=self._async_schema_resolution,
+            publish_workers=config.env_config.publish_workers,
+            in_flight_memory=self._in_flight_memory,
+            published_messages=self._published_messages,
+            table_heavy_hitters=self._table_heavy_hitters
         )
 
+    def _build_handler_map_phase(self):
+        with startup_timeline.phase('handler_map'):
+            return self._build_handler_map()
+
     def _build_handler_map(self):
-        schema_event_handler = SchemaEventHandler(
+        self._schema_event_handler = SchemaEventHandler(
             db_connections=self.db_connections,
             producer=self.producer,
             schema_wrapper=self.schema_wrapper,
             stats_counter=self.counters['schema_event_counter'],
             register_dry_run=self.register_dry_run,
+            in_flight_tables=self._in_flight_tables,
+            published_messages=self._published_messages,
+            newest_position_info_callback=self._get_newest_published_position_info
         )
+        self._data_event_handler = self._get_data_event_handler()
         handler_map = {
             DataEvent: HandlerInfo(
                 event_type=EventType.DATA_EVENT,
-                handler=self._get_data_event_handler()
+                handler=self._data_event_handler
             ),
             QueryEvent: HandlerInfo(
                 event_type=EventType.SCHEMA_EVENT,
-                handler=schema_event_handler
+                handler=self._schema_event_handler
             )
         }
         return handler_map
 
+    def _publish_deferred_data_events(self, wait=False):
+        if self._data_event_handler is not None:
+            self._data_event_handler.publish_deferred_rows(wait=wait)
+        if wait and self._async_schema_resolution:
+            self.schema_wrapper.wait_for_pending_fetches()
+        self._checkpoint_rows_published_out_of_order()
+
+    def _checkpoint_rows_published_out_of_order(self):
+        """Held back rows published after rows further in the binlog leave the
+        position the producer reports behind rows it already delivered, so
+        checkpoints are skipped until no row is held back anymore.  Then the
+        producer is flushed, and the position of the newest published row is
+        saved.
+        """
+        if (
+            self._data_event_handler is None or
+            not self._data_event_handler.published_out_of_order or
+            self._data_event_handler.has_deferred_rows
+        ):
+            return
+        self._flush_producer()
+        self._save_flushed_position()
+        self._data_event_handler.published_out_of_order = False
+
+    def _has_rows_waiting_for_schema(self):
+        # While rows are held back for their schema, rows published after them
+        # would move the checkpoint past rows that are not published yet.
+        return self._data_event_handler is not None and (
+            self._data_event_handler.has_deferred_rows or
+            self._data_event_handler.published_out_of_order
+        )
+
+    def _get_newest_published_position_info(self):
+        if self._data_event_handler is None:
+            return None
+        return self._data_event_handler.newest_published_position_info
+
+    def _save_deferred_schema_event_checkpoint(self):
+        # A data event, or the stream going idle, ends a run of schema events.
+        if self._batch_schema_event_checkpoints:
+            self._schema_event_handler.save_deferred_checkpoint()
+
+    def _update_catch_up_mode(self):
+        self._catch_up_mode.update(self.stream.delay_seconds)
+
+    def _is_checkpoint_due(self):
+        if self._catch_up_mode is None or not self._catch_up_mode.active:
+            return True
+        # Recovery from an unclean shutdown only looks recovery_queue_size
+        # events past the last checkpoint, and every skipped checkpoint can
+        # leave up to a producer buffer of messages more behind it.
+        max_skipped_checkpoints = (
+            config.env_config.recovery_queue_size //
+            get_config().kafka_producer_buffer_size
+        ) - 2
+        if self._skipped_checkpoints >= max_skipped_checkpoints:
+            return True
+        return (
+            time.time() - self._last_checkpoint_at >=
+            config.env_config.catch_up_checkpoint_interval_seconds
+        )
+
+    def _get_max_rows_between_checkpoints(self):
+        # Recovery from an unclean shutdown only looks recovery_queue_size
+        # events past the last checkpoint, and the producer can hold up to a
+        # buffer of messages more that were never delivered.
+        return (
+            config.env_config.recovery_queue_size -
+            get_config().kafka_producer_buffer_size
+        )
+
+    def _checkpoint_transaction_end(self):
+        """Flushes the rows of the transaction that just ended and saves the
+        position of the transaction itself, without the offset of its last
+        row, so a restart resumes with the next transaction.
+        """
+        if (
+            time.time() - self._last_checkpoint_at <
+            config.env_config.transaction_checkpoint_interval_seconds or
+            self._has_rows_waiting_for_schema()
+        ):
+            return
+        self._flush_producer()
+        position_data = self.producer.get_checkpoint_position_data()
+        self._save_position(
+            position_data,
+            position_info=self._get_transaction_position_info(position_data)
+        )
+        self._mark_transaction_checkpoint()
+
+    def _checkpoint_long_transaction(self):
+        """Checkpoints in the middle of a transaction, at the position of its
+        last published row, once too many rows were published since the last
+        checkpoint for recovery to find them all.
+        """
+        self._rows_since_checkpoint += 1
+        if (
+            self._rows_since_checkpoint < self._max_rows_between_checkpoints or
+            self._has_rows_waiting_for_schema()
+        ):
+            return
+        log.info("Checkpointing after {} rows without a transaction end".format(
+            self._rows_since_checkpoint
+        ))
+        self._flush_producer()
+        self._save_flushed_position()
+        self._mark_transaction_checkpoint()
+
+    def _mark_transaction_checkpoint(self):
+        self._last_checkpoint_at = time.time()
+        self._has_rows_to_checkpoint = False
+        self._rows_since_checkpoint = 0
+
+    def _get_transaction_position_info(self, position_data):
+        position_info = (
+            self._get_newest_published_position_info() or
+            position_data.last_published_message_position_info
+        )
+        if position_info is None:
+            return None
+        position = construct_position(position_info['position'])
+        # Offsets of log positions count from the last heartbeat rather than
+        # from the start of a transaction, so they are kept.
+        if not isinstance(position, GtidPosition):
+            return position_info
+        transaction_position_info = dict(position_info)
+        transaction_position_info['position'] = position.to_transaction_dict()
+        return transaction_position_info
+
+    def _wait_for_in_flight_memory(self):
+        """Pauses reading from the binlog while the rows between the reader
+        and Kafka exceed max_in_flight_bytes, until the held back rows are
+        published and the producer has delivered them.
+        """
+        if self._in_flight_memory is None:
+            return
+        self._in_flight_memory.log_gauges_periodically()
+        if not self._in_flight_memory.is_over_limit:
+            return
+        paused_at = time.time()
+        log.info("Pausing binlog reading, in flight memory: {}".format(
+            self._in_flight_memory.gauges()
+        ))
+        self._publish_deferred_data_events(wait=True)
+        self._flush_producer()
+        self._in_flight_memory.record_pause(time.time() - paused_at)
+        log.info("Resuming binlog reading after {:.3f} seconds".format(
+            time.time() - paused_at
+        ))
+
+    def _flush_producer(self):
+        self.producer.flush()
+        # Everything published is delivered after a flush, whether or not the
+        # producer reported the position of the last message.
+        if self._published_messages is not None:
+            self._published_messages.mark_all_delivered()
+
+    def _save_position(self, position_data, is_clean_shutdown=False, position_info=None):
+        if self._in_flight_tables is not None:
+            # A schema event checkpoint may be waiting for this position.
+            self._schema_event_handler.save_position(
+                position_data,
+                is_clean_shutdown=is_clean_shutdown,
+                position_info=position_info
+            )
+            return
+        save_position(
+            position_data=position_data,
+            is_clean_shutdown=is_clean_shutdown,
+            state_session=self.db_connections.state_session,
+            position_info=position_info
+        )
+
+    def _save_flushed_position(self, is_clean_shutdown=False):
+        """Saves the position of the newest published row, which is only
+        delivered once the producer is flushed.
+        """
+        self._save_position(
+            self.producer.get_checkpoint_position_data(),
+            is_clean_shutdown=is_clean_shutdown,
+            position_info=self._get_newest_published_position_info()
+        )
+
+    def _save_position_callback(self, position_data):
+        if self._published_messages is not None and position_data is not None:
+            self._published_messages.mark_delivered_through(
+                position_data.last_published_message_position_info
+            )
+        if self._message_latency is not None:
+            self._message_latency.log_stats_periodically()
+        if self._has_rows_waiting_for_schema():
+            log.debug("Skipping checkpoint while rows wait for their schema")
+            return
+        # The position of the last delivered message can be in the middle of
+        # a transaction, the checkpoint is taken at its end instead.
+        if self._transaction_scoped_checkpoints:
+            return
+        if not self._is_checkpoint_due():
+            self._skipped_checkpoints += 1
+            return
+        self._save_position(position_data)
+        self._last_checkpoint_at = time.time()
+        self._skipped_checkpoints = 0
+
     @contextmanager
     def _setup_producer(self):
-        save_position_callback = partial(
-            save_position,
-            state_session=self.db_connections.state_session
-        )
-        with Producer(
-            producer_name=REPLICATION_HANDLER_PRODUCER_NAME,
-            team_name=REPLICATION_HANDLER_TEAM_NAME,
-            expected_frequency_seconds=ExpectedFrequency.constantly,
-            monitoring_enabled=False,
-            dry_run=self.publish_dry_run,
-            position_data_callback=save_position_callback,
-        ) as producer:
+        # The producer connects to Kafka when it is created.
+        with startup_timeline.phase('producer'):
+            kafka_producer = Producer(
+                producer_name=REPLICATION_HANDLER_PRODUCER_NAME,
+                team_name=REPLICATION_HANDLER_TEAM_NAME,
+                expected_frequency_seconds=ExpectedFrequency.constantly,
+                monitoring_enabled=False,
+                dry_run=self.publish_dry_run,
+                position_data_callback=self._save_position_callback,
+            )
+        with kafka_producer as producer:
             yield producer
 
     @contextmanager
@@ -243,16 +581,13 @@ class BaseParseReplicationStream(object):
         self._running = False
 
     def _handle_graceful_termination(self):
+        self._save_deferred_schema_event_checkpoint()
         # We will not do anything for SchemaEvent, because we have
         # a good way to recover it.
-        if self.current_event_type == EventType.DATA_EVENT:
-            self.producer.flush()
-            position_data = self.producer.get_checkpoint_position_data()
-            save_position(
-                position_data=position_data,
-                is_clean_shutdown=True,
-                state_session=self.db_connections.state_session
-            )
+        if self.current_event_type == EventType.DATA_EVENT or self._has_rows_to_checkpoint:
+            self._publish_deferred_data_events(wait=True)
+            self._flush_producer()
+            self._save_flushed_position(is_clean_shutdown=True)
         log.info("Gracefully shutting down")
 
     def _force_exit(self):
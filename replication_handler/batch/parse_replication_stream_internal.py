@@ -27,6 +27,8 @@ from yelp_batch import Batch
 
 from replication_handler import config
 from replication_handler.batch.base_parse_replication_stream import BaseParseReplicationStream
+from replication_handler.util.continuous_profiler import ContinuousProfiler
+from replication_handler.util.heap_snapshot import HeapSnapshot
 
 
 log = logging.getLogger('replication_handler.batch.parse_replication_stream_internal')
@@ -43,6 +45,60 @@ class ParseReplicationStreamInternal(BaseParseReplicationStream, Batch):
 
     def __init__(self):
         super(ParseReplicationStreamInternal, self).__init__()
+        self._continuous_profiler = self._get_continuous_profiler()
+        self._heap_snapshot = HeapSnapshot(
+            file_path=config.env_config.heap_snapshot_file,
+            max_bytes=config.env_config.heap_snapshot_max_bytes,
+            backup_count=config.env_config.heap_snapshot_backup_count,
+            top_n=config.env_config.heap_snapshot_top_n,
+            interval_seconds=config.env_config.heap_snapshot_interval_seconds,
+            trace_allocations=config.env_config.heap_snapshot_trace_allocations,
+        )
+
+    def _get_continuous_profiler(self):
+        if not config.env_config.continuous_profiling_enabled:
+            return None
+        return ContinuousProfiler(
+            profile_dir=config.env_config.profiler_directory,
+            sampling_period_seconds=config.env_config.profiler_sampling_period_seconds,
+            rotation_interval_seconds=config.env_config.profiler_rotation_interval_seconds,
+            max_files=config.env_config.profiler_max_files,
+            delay_threshold_seconds=config.env_config.profiler_delay_threshold_seconds,
+        )
+
+    def process_event(self, replication_handler_event):
+        super(ParseReplicationStreamInternal, self).process_event(
+            replication_handler_event
+        )
+        self._run_periodic_diagnostics()
+
+    def _handle_idle_stream(self):
+        super(ParseReplicationStreamInternal, self)._handle_idle_stream()
+        # Profile rotation and the delay threshold are also checked while no
+        # event arrives.
+        self._run_periodic_diagnostics()
+
+    def _run_periodic_diagnostics(self):
+        if self._continuous_profiler:
+            self._continuous_profiler.periodic_process(self.stream.delay_seconds)
+        self._heap_snapshot.periodic_process(self._get_cache_sizes)
+
+    def _get_cache_sizes(self):
+        cache_sizes = {
+            'schema_wrapper_cache': len(self.schema_wrapper.cache),
+        }
+        stream = getattr(self, 'stream', None)
+        if stream is not None:
+            low_level_stream = stream.stream
+            cache_sizes['current_events'] = len(stream.current_events)
+            cache_sizes['low_level_current_events'] = len(low_level_stream.current_events)
+            cache_sizes['binlog_table_map'] = len(low_level_stream.stream.table_map)
+        if self._data_event_handler is not None:
+            cache_sizes['deferred_rows'] = self._data_event_handler.deferred_row_count
+            cache_sizes['in_flight_rows'] = len(self._data_event_handler.in_flight_rows)
+        if self._in_flight_memory is not None:
+            cache_sizes['producer_buffered_bytes'] = self._in_flight_memory.published_bytes
+        return cache_sizes
 
     def _get_data_event_counter(self):
         """Decides which data_event counter to choose as per changelog_mode
@@ -89,12 +145,14 @@ class ParseReplicationStreamInternal(BaseParseReplicationStream, Batch):
 
     @contextmanager
     def _register_signal_handlers(self):
-        """Register the handler SIGUSR2, which will toggle a profiler on and off.
+        """Register the handler SIGUSR2, which will toggle a profiler on and off,
+        and the handler SIGUSR1, which will write a heap snapshot.
         """
         try:
             signal.signal(signal.SIGINT, self._handle_shutdown_signal)
             signal.signal(signal.SIGTERM, self._handle_shutdown_signal)
             signal.signal(signal.SIGUSR2, self._handle_profiler_signal)
+            signal.signal(signal.SIGUSR1, self._handle_heap_snapshot_signal)
             yield
         finally:
             # Cleanup for the profiler signal handler has to happen here,
@@ -102,10 +160,29 @@ class ParseReplicationStreamInternal(BaseParseReplicationStream, Batch):
             # way that normal methods do.  Any contextmanager or finally
             # statement won't live past the handler function returning.
             signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+            signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+            self._heap_snapshot.stop()
             if self._profiler_running:
                 self._disable_profiler()
+            if self._continuous_profiler:
+                self._continuous_profiler.stop()
+
+    def _handle_heap_snapshot_signal(self, sig, frame):
+        log.info("Writing heap snapshot")
+        # The handler runs in the middle of whatever the main thread was
+        # doing, which an exception raised here would abort.
+        try:
+            self._heap_snapshot.write(self._get_cache_sizes())
+        except Exception:
+            log.exception("Failed to write heap snapshot")
 
     def _handle_profiler_signal(self, sig, frame):
+        if self._continuous_profiler:
+            # vmprof can only be enabled once, so with continuous profiling on
+            # the signal starts a fresh profile file instead.
+            log.info("Rotating continuous profiler")
+            self._continuous_profiler.rotate()
+            return
         log.info("Toggling Profiler")
         if self._profiler_running:
             self._disable_profiler()
@@ -49,7 +49,7 @@ class BaseEventHandler(object):
         raise NotImplementedError
 
     def is_blacklisted(self, event, schema):
-        if schema in env_config.schema_blacklist:
+        if schema in env_config.snapshot.schema_blacklist:
             self.log_blacklisted_schema(event, schema)
             return True
         return False
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import calendar
+import logging
+import time
+
+from dateutil import parser
+from dateutil.tz import tzutc
+from pymysqlreplication import BinLogStreamReader
+from pymysqlreplication.event import FormatDescriptionEvent
+from pymysqlreplication.event import GtidEvent
+from pymysqlreplication.event import QueryEvent
+
+from replication_handler.util.position import GtidPosition
+from replication_handler.util.position import LogPosition
+
+
+log = logging.getLogger('replication_handler.components.binlog_timestamp_searcher')
+
+# Every binlog file starts at this position.
+BINLOG_START_POSITION = 4
+
+
+def parse_timestamp(value):
+    """Returns the unix timestamp of value, either a number of seconds or a
+    date time string, which is taken as UTC when it has no time zone.
+    """
+    if isinstance(value, (int, long, float)):
+        return int(value)
+    if value.isdigit():
+        return int(value)
+    timestamp = parser.parse(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=tzutc())
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+class BinlogTimestampSearcher(object):
+    """ This class finds the position of the first transaction that started
+    at or after a given time, to start tailing from it.
+
+    The binlog files are binary searched by the timestamp of their first
+    event, and the last file starting at or before the time is then scanned
+    for the transaction.  With gtid enabled the position is the executed gtid
+    set of the server without the transaction and the later ones of its
+    server, otherwise it is the log position right before the query event
+    starting it.  The transactions of the other servers in gtid_executed are
+    all taken as executed, so only the server of the transaction should have
+    written after the time.
+
+    Args:
+      db_connections(BaseConnection object): a wrapper for communication with mysql db.
+      gtid_enabled(bool): use to indicate if gtid is enabled in the system.
+    """
+
+    def __init__(self, db_connections, gtid_enabled):
+        self.db_connections = db_connections
+        self.gtid_enabled = gtid_enabled
+
+    def get_position(self, timestamp):
+        started_at = time.time()
+        log_files = self._get_log_files()
+        first_log_file_index = self._find_log_file_index(log_files, timestamp)
+        position = None
+        for log_file in log_files[first_log_file_index:]:
+            position = self._search_log_file(log_file, timestamp)
+            if position is not None:
+                break
+        if position is None:
+            raise ValueError(
+                "No transaction started at or after {} in the binlogs".format(timestamp)
+            )
+        log.info("Starting from {position} for timestamp {timestamp}, found in {s:.3f} seconds".format(
+            position=position.to_replication_dict(),
+            timestamp=timestamp,
+            s=time.time() - started_at
+        ))
+        return position
+
+    def _get_log_files(self):
+        with self.db_connections.get_source_cursor() as cursor:
+            cursor.execute("SHOW BINARY LOGS")
+            return [row[0] for row in cursor.fetchall()]
+
+    def _get_gtid_executed(self):
+        with self.db_connections.get_source_cursor() as cursor:
+            cursor.execute("SELECT @@GLOBAL.gtid_executed")
+            return cursor.fetchone()[0]
+
+    def _find_log_file_index(self, log_files, timestamp):
+        """Returns the index of the last log file whose first event is at or
+        before timestamp, or 0 when they are all after it.
+        """
+        low, high = 0, len(log_files) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._get_first_event_timestamp(log_files[middle]) <= timestamp:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def _get_first_event_timestamp(self, log_file):
+        for event in self._iter_events(log_file, [FormatDescriptionEvent]):
+            return event.timestamp
+
+    def _search_log_file(self, log_file, timestamp):
+        if self.gtid_enabled:
+            return self._search_gtid_event(log_file, timestamp)
+        return self._search_query_event(log_file, timestamp)
+
+    def _search_gtid_event(self, log_file, timestamp):
+        for event in self._iter_events(log_file, [GtidEvent]):
+            if event.timestamp < timestamp:
+                continue
+            sid, transaction_id = event.gtid.split(":")
+            executed_gtid_set = self._get_executed_gtid_set_before(
+                sid,
+                int(transaction_id)
+            )
+            if not executed_gtid_set:
+                # An empty auto_position tails from the current master
+                # position, so the first transaction of a server with nothing
+                # else executed is found by its log position instead.
+                return LogPosition(
+                    log_pos=event.packet.log_pos - event.packet.event_size,
+                    log_file=log_file
+                )
+            return GtidPosition(executed_gtid_set=executed_gtid_set)
+
+    def _get_executed_gtid_set_before(self, sid, transaction_id):
+        """Returns gtid_executed without the transactions of sid from
+        transaction_id on.
+        """
+        gtids = []
+        for gtid in self._get_gtid_executed().split(","):
+            intervals = [interval for interval in gtid.strip().split(":") if interval]
+            if not intervals:
+                continue
+            gtid_sid = intervals.pop(0)
+            if gtid_sid.lower() == sid.lower():
+                intervals = self._get_intervals_before(intervals, transaction_id)
+            if intervals:
+                gtids.append(":".join([gtid_sid] + intervals))
+        return ",".join(gtids)
+
+    def _get_intervals_before(self, intervals, transaction_id):
+        intervals_before = []
+        for interval in intervals:
+            start, _, end = interval.partition("-")
+            if int(start) >= transaction_id:
+                continue
+            end = min(int(end or start), transaction_id - 1)
+            intervals_before.append(
+                start if int(start) == end else "{}-{}".format(start, end)
+            )
+        return intervals_before
+
+    def _search_query_event(self, log_file, timestamp):
+        for event in self._iter_events(log_file, [QueryEvent]):
+            if event.timestamp < timestamp or event.query == 'COMMIT':
+                continue
+            return LogPosition(
+                log_pos=event.packet.log_pos - event.packet.event_size,
+                log_file=log_file
+            )
+
+    def _iter_events(self, log_file, only_events):
+        """Yields the events of the given types in log_file."""
+        stream = BinLogStreamReader(
+            connection_settings=self.db_connections.source_database_config,
+            server_id=1,
+            blocking=False,
+            resume_stream=True,
+            log_file=log_file,
+            log_pos=BINLOG_START_POSITION,
+            only_events=only_events
+        )
+        try:
+            for event in stream:
+                if stream.log_file != log_file:
+                    break
+                yield event
+        finally:
+            stream.close()
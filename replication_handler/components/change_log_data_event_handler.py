@@ -18,6 +18,9 @@ from __future__ import unicode_literals
 
 import logging
 import os
+import time
+from collections import namedtuple
+from collections import OrderedDict
 
 import yaml
 from cached_property import cached_property
@@ -36,14 +39,38 @@ SCHEMA_FILEPATH = os.path.join(
     CURR_FILEPATH, '../schema/{}.yaml'.format(CHANGELOG_SCHEMANAME))
 OWNER_EMAIL = 'distsys-data+changelog@yelp.com'
 
+CoalescedRow = namedtuple('CoalescedRow', ('event', 'position'))
+
 
 class ChangeLogDataEventHandler(DataEventHandler):
-    """Handles data change events: add, update and delete"""
+    """Handles data change events: add, update and delete
+
+    With changelog_coalesce_window_seconds set, only the latest change to a
+    row id within the window is published.  Rows are published in the order
+    of their latest change, so the position of every published message is
+    past all the changes it stands for, and the checkpoint never moves past
+    a change whose row id has not been published since.
+
+    Recovery from an unclean shutdown replays the rows past the checkpoint
+    without coalescing them.  The producer skips as many of them as it finds
+    in Kafka, which are at most the rows of the windows published before the
+    shutdown, so no change is lost.  Changes that were coalesced away or
+    already published can be published again, so delivery is at least once.
+    Coalescing the replayed rows could leave fewer rows than were published,
+    and the producer would then skip changes that were never published.
+    """
 
     def __init__(self, *args, **kwargs):
         super(ChangeLogDataEventHandler, self).__init__(*args, **kwargs)
         self.schema_wrapper_entry = SchemaWrapperEntry(
             schema_id=self.schema_id, transformation_map={})
+        self.coalesce_window_seconds = config.env_config.changelog_coalesce_window_seconds
+        self.coalesce_max_rows = config.env_config.changelog_coalesce_max_rows
+        # Latest change per (schema, table, id), in the order of the latest
+        # changes.
+        self.coalescing_rows = OrderedDict()
+        self.coalesced_row_count = 0
+        self._window_started_at = None
 
     @cached_property
     def schema_id(self):
@@ -64,19 +91,60 @@ class ChangeLogDataEventHandler(DataEventHandler):
         """
         if self.is_blacklisted(event, event.schema):
             return
-        self._handle_row(self.schema_wrapper_entry, event, position)
+        if self.noise_columns and self._is_noise_update(event):
+            return
+        self._add_row_size(event)
+        if not self.coalesce_window_seconds:
+            self._handle_row(self.schema_wrapper_entry, event, position)
+            return
+        self._coalesce_row(event, position)
+        self.publish_deferred_rows()
+
+    def publish_deferred_rows(self, wait=False):
+        """Publishes the coalesced rows once the window is over or full, or
+        right away when wait is set.
+        """
+        if not self.coalescing_rows:
+            return
+        if (
+            wait or
+            len(self.coalescing_rows) >= self.coalesce_max_rows or
+            time.time() - self._window_started_at >= self.coalesce_window_seconds
+        ):
+            self._publish_coalesced_rows()
+
+    def _coalesce_row(self, event, position):
+        values = event.row.get('values') or event.row['after_values']
+        key = (event.schema, event.table, values['id'])
+        replaced_row = self.coalescing_rows.pop(key, None)
+        if replaced_row is not None:
+            self.coalesced_row_count += 1
+            if self.in_flight_memory is not None:
+                self.in_flight_memory.remove(replaced_row.event.row_size)
+        elif not self.coalescing_rows:
+            self._window_started_at = time.time()
+        self.coalescing_rows[key] = CoalescedRow(event=event, position=position)
+
+    def _publish_coalesced_rows(self):
+        coalescing_rows = self.coalescing_rows
+        self.coalescing_rows = OrderedDict()
+        self._window_started_at = None
+        for coalesced_row in coalescing_rows.itervalues():
+            self._handle_row(
+                self.schema_wrapper_entry,
+                coalesced_row.event,
+                coalesced_row.position
+            )
 
-    def _handle_row(self, schema_wrapper_entry, event, position):
+    def _build_message(self, schema_wrapper_entry, event, position, transaction_id_cache):
         builder = ChangeLogMessageBuilder(
             schema_wrapper_entry,
             event,
             self.transaction_id_schema_id,
             position,
-            self.register_dry_run
+            self.register_dry_run,
+            transaction_id_cache=transaction_id_cache
         )
-        message = builder.build_message(
+        return builder.build_message(
             self.db_connections.source_cluster_name,
         )
-        self.producer.publish(message)
-        if self.stats_counter:
-            self.stats_counter.increment(event.table)
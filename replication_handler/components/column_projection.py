@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import re
+
+from replication_handler.components.schema_catalog import COLUMN_DEFINITION_REGEX
+
+
+QUOTED_IDENTIFIER_REGEX = re.compile(r'`((?:[^`]|``)+)`')
+
+ROW_VALUE_KEYS = ('values', 'before_values', 'after_values')
+
+
+class TableProjection(object):
+    """ The columns of a table that are replicated, given either as the
+    columns to include or as the columns to exclude.
+
+    Args:
+      include(iterable, optional): the only columns that are replicated.
+      exclude(iterable, optional): columns that are not replicated.
+    """
+
+    def __init__(self, include=None, exclude=None):
+        if (include is None) == (exclude is None):
+            raise ValueError(
+                "A column projection needs exactly one of include and exclude"
+            )
+        self.include = frozenset(include) if include is not None else None
+        self.exclude = frozenset(exclude) if exclude is not None else frozenset()
+
+    def keeps(self, column_name):
+        if self.include is not None:
+            return column_name in self.include
+        return column_name not in self.exclude
+
+    def project_row(self, row):
+        """Removes the columns that are not replicated from the decoded row,
+        in place.
+        """
+        for key in ROW_VALUE_KEYS:
+            values = row.get(key)
+            if not values:
+                continue
+            if self.include is None:
+                for column_name in self.exclude:
+                    values.pop(column_name, None)
+            else:
+                for column_name in [c for c in values if c not in self.include]:
+                    del values[column_name]
+
+    def project_create_table_stmt(self, create_table_stmt):
+        """Removes the definitions of the columns that are not replicated, and
+        of the indexes on them, from a canonical CREATE TABLE statement as
+        returned by SHOW CREATE TABLE.
+        """
+        if not create_table_stmt:
+            return create_table_stmt
+        lines = create_table_stmt.split('\n')
+        definitions = []
+        for line in lines[1:-1]:
+            definition = line.rstrip().rstrip(',')
+            if self._keeps_definition(definition):
+                definitions.append(definition)
+        return '\n'.join(
+            [lines[0], ',\n'.join(definitions), lines[-1]]
+        )
+
+    def _keeps_definition(self, definition):
+        column_match = COLUMN_DEFINITION_REGEX.match(definition)
+        if column_match:
+            return self.keeps(column_match.group(1).replace('``', '`'))
+        if '(' not in definition:
+            return True
+        index_columns = [
+            column_name.replace('``', '`')
+            for column_name in QUOTED_IDENTIFIER_REGEX.findall(
+                definition[definition.index('('):]
+            )
+        ]
+        dropped_columns = [c for c in index_columns if not self.keeps(c)]
+        if dropped_columns and definition.lstrip().startswith('PRIMARY KEY'):
+            raise ValueError(
+                "Primary key columns {} can not be projected out".format(
+                    dropped_columns
+                )
+            )
+        return not dropped_columns
+
+
+class ColumnProjection(object):
+    """ Per table column projections, configured as a mapping from
+    "database.table" to a mapping with either an include or an exclude list.
+
+    Args:
+      projection_config(dict): the column_projection config.
+    """
+
+    def __init__(self, projection_config):
+        self.table_projections = {
+            tuple(table_name.split('.', 1)): TableProjection(
+                include=table_config.get('include'),
+                exclude=table_config.get('exclude')
+            )
+            for table_name, table_config in (projection_config or {}).iteritems()
+        }
+
+    def __nonzero__(self):
+        return bool(self.table_projections)
+
+    def get(self, database_name, table_name):
+        """Returns the TableProjection of the table, or None when all of its
+        columns are replicated.
+        """
+        return self.table_projections.get((database_name, table_name))
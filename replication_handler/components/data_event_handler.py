@@ -17,52 +17,321 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import logging
+import time
+from collections import deque
+from collections import Counter
+from collections import namedtuple
+from collections import OrderedDict
+
+from concurrent.futures import ThreadPoolExecutor
+from data_pipeline.message import UpdateMessage
 
 from replication_handler.components.base_event_handler import BaseEventHandler
 from replication_handler.components.base_event_handler import Table
+from replication_handler.config import env_config
+from replication_handler.util.in_flight_memory import estimate_row_size
 from replication_handler.util.message_builder import MessageBuilder
 from replication_handler.util.misc import get_transaction_id_schema_id
+from replication_handler.util.transaction_id import TransactionIdCache
 
 
 log = logging.getLogger('replication_handler.parse_replication_stream')
 
 
+DeferredRow = namedtuple(
+    'DeferredRow',
+    ('event', 'position', 'deferred_at', 'row_number')
+)
+
+InFlightRow = namedtuple('InFlightRow', ('future', 'event'))
+
+PublishWorker = namedtuple('PublishWorker', ('executor', 'transaction_id_cache'))
+
+NOISE_UPDATE_LOG_INTERVAL_SECONDS = 60
+
+
+def get_noise_columns():
+    """Returns the noise_columns config keyed by (database, table)."""
+    return {
+        tuple(table_name.split('.', 1)): frozenset(column_names)
+        for table_name, column_names in env_config.noise_columns.iteritems()
+    }
+
+
+def is_noise_update(event, noise_columns):
+    """Returns whether event is an update that only changes the columns
+    noise_columns, as returned by get_noise_columns, lists for its table.
+    """
+    if event.message_type != UpdateMessage:
+        return False
+    table_noise_columns = noise_columns.get((event.schema, event.table))
+    if table_noise_columns is None:
+        return False
+    before_values = event.row['before_values']
+    for column_name, value in event.row['after_values'].iteritems():
+        if column_name not in table_noise_columns and before_values.get(column_name) != value:
+            return False
+    return True
+
+
 class DataEventHandler(BaseEventHandler):
-    """Handles data change events: add, update and delete"""
+    """Handles data change events: add, update and delete
+
+    With async_schema_resolution, rows of a table whose schema is not cached
+    are held back while the schema is fetched in the background, and rows of
+    other tables keep being published.  Rows of a single table are always
+    published in binlog order.  Held back rows published after rows further
+    in the binlog set published_out_of_order, and newest_published_position_info
+    keeps the upstream position info of the published row furthest in the
+    binlog.
+
+    With publish_workers, schema lookup and message building run on worker
+    threads, each owning the tables hashed onto it.  Built messages are
+    published from the calling thread in binlog order, so the checkpoints
+    the producer reports only ever cover a contiguous prefix of the stream.
+
+    Updates of tables with noise_columns configured that only change those
+    columns are dropped.  They still take their place in the stream, so the
+    offsets of the positions around them are unchanged, and they are dropped
+    again when the stream is replayed.
+
+    With in_flight_memory, the estimated size of every row is accounted from
+    the moment it is received.  With published_messages, every published
+    message is remembered until the producer reports it as published, for
+    the in flight memory, in flight tables and message latency trackers it
+    was built with.  With table_heavy_hitters, the tables with the most published rows, bytes
+    and time are tracked in bounded memory.
+    """
 
     def __init__(self, *args, **kwargs):
         self.register_dry_run = kwargs.pop('register_dry_run')
         self.transaction_id_schema_id = get_transaction_id_schema_id(
             kwargs.pop('gtid_enabled')
         )
+        self.async_schema_resolution = kwargs.pop(
+            'async_schema_resolution',
+            False
+        )
+        self.publish_workers = kwargs.pop('publish_workers', 0)
+        self.in_flight_memory = kwargs.pop('in_flight_memory', None)
+        self.published_messages = kwargs.pop('published_messages', None)
+        self.table_heavy_hitters = kwargs.pop('table_heavy_hitters', None)
         super(DataEventHandler, self).__init__(*args, **kwargs)
+        self.transaction_id_cache = TransactionIdCache(
+            self.transaction_id_schema_id
+        )
+        # Tables in the order their first held back row arrived, so the first
+        # entry always holds the oldest deferred row.
+        self.deferred_rows = OrderedDict()
+        self.deferred_row_count = 0
+        # Rows received on the async_schema_resolution path, numbered in
+        # binlog order.
+        self._received_row_count = 0
+        self._newest_published_row_number = 0
+        self.newest_published_position_info = None
+        self.published_out_of_order = False
+        if self.async_schema_resolution:
+            self.max_deferred_rows = env_config.schema_resolution_max_deferred_rows
+            self.max_deferral_seconds = env_config.schema_resolution_max_wait_seconds
+        # Rows handed to the workers, in binlog order.
+        self.in_flight_rows = deque()
+        self.noise_columns = get_noise_columns()
+        # Dropped noise updates per (database, table)
+        self.noise_update_counts = Counter()
+        self._next_noise_update_log_at = 0
+        if self.publish_workers:
+            self.max_in_flight_rows = env_config.publish_max_in_flight_rows
+            self._workers = [
+                PublishWorker(
+                    executor=ThreadPoolExecutor(max_workers=1),
+                    # The cache is not thread safe, so every worker has its own.
+                    transaction_id_cache=TransactionIdCache(
+                        self.transaction_id_schema_id
+                    )
+                )
+                for _ in range(self.publish_workers)
+            ]
+
+    @property
+    def has_deferred_rows(self):
+        return self.deferred_row_count > 0
 
     def handle_event(self, event, position):
         """Make sure that the schema wrapper has the table, publish to Kafka.
         """
         if self.is_blacklisted(event, event.schema):
             return
-        schema_wrapper_entry = self._get_payload_schema(
-            Table(
-                cluster_name=self.db_connections.source_cluster_name,
-                database_name=event.schema,
-                table_name=event.table
+        if self.noise_columns and self._is_noise_update(event):
+            return
+        table = Table(
+            cluster_name=self.db_connections.source_cluster_name,
+            database_name=event.schema,
+            table_name=event.table
+        )
+        self._add_row_size(event)
+        if self.publish_workers:
+            self._submit_row(table, event, position)
+        elif self.async_schema_resolution:
+            self._handle_row_with_async_schema(table, event, position)
+        else:
+            self._handle_row(self._get_payload_schema(table), event, position)
+
+    def _add_row_size(self, event):
+        """Estimates the size of the row once, for the in flight memory and
+        the table heavy hitters.
+        """
+        if self.in_flight_memory is None and self.table_heavy_hitters is None:
+            return
+        event.row_size = estimate_row_size(event.row)
+        if self.in_flight_memory is not None:
+            self.in_flight_memory.add(event.row_size)
+
+    def _is_noise_update(self, event):
+        if not is_noise_update(event, self.noise_columns):
+            return False
+        self.noise_update_counts[(event.schema, event.table)] += 1
+        self._log_noise_update_counts()
+        return True
+
+    def _log_noise_update_counts(self):
+        now = time.time()
+        if now < self._next_noise_update_log_at:
+            return
+        self._next_noise_update_log_at = now + NOISE_UPDATE_LOG_INTERVAL_SECONDS
+        log.info("Dropped noise updates: {}".format(
+            ', '.join(
+                "{}.{}: {}".format(database_name, table_name, count)
+                for (database_name, table_name), count
+                in self.noise_update_counts.most_common()
             )
+        ))
+
+    def publish_deferred_rows(self, wait=False):
+        """Publishes the held back rows of every table whose schema is ready.
+        Blocks on the schema of the oldest held back row while there are too
+        many held back rows, or it has been held back for too long, or until
+        nothing is held back anymore when wait is set.
+        """
+        self._publish_built_rows(wait=wait)
+        if not self.deferred_rows:
+            return
+        for table in [t for t in self.deferred_rows if self.schema_wrapper.is_ready(t)]:
+            self._publish_deferred_rows_for_table(table)
+        while self.deferred_rows and (wait or self._should_block_on_deferred_rows()):
+            self._publish_deferred_rows_for_table(next(iter(self.deferred_rows)))
+
+    def _submit_row(self, table, event, position):
+        worker = self._workers[hash(table) % len(self._workers)]
+        future = worker.executor.submit(
+            self._build_row_message,
+            table,
+            event,
+            position,
+            worker.transaction_id_cache
         )
-        self._handle_row(schema_wrapper_entry, event, position)
+        self.in_flight_rows.append(InFlightRow(future=future, event=event))
+        self._publish_built_rows()
+
+    def _build_row_message(self, table, event, position, transaction_id_cache):
+        return self._build_message(
+            self._get_payload_schema(table),
+            event,
+            position,
+            transaction_id_cache
+        )
+
+    def _publish_built_rows(self, wait=False):
+        """Publishes built messages up to the first row still being built.
+        Waits for that row too while too many rows are in flight, or until no
+        row is in flight anymore when wait is set.
+        """
+        while self.in_flight_rows and (
+            wait or
+            self.in_flight_rows[0].future.done() or
+            len(self.in_flight_rows) >= self.max_in_flight_rows
+        ):
+            in_flight_row = self.in_flight_rows[0]
+            message = in_flight_row.future.result()
+            self.in_flight_rows.popleft()
+            self._publish(message, in_flight_row.event)
+
+    def _handle_row_with_async_schema(self, table, event, position):
+        self._received_row_count += 1
+        if table not in self.deferred_rows and self.schema_wrapper.is_ready(table):
+            message = self._handle_row(self._get_payload_schema(table), event, position)
+            self._newest_published_row_number = self._received_row_count
+            self.newest_published_position_info = message.upstream_position_info
+        else:
+            self.schema_wrapper.prefetch(table)
+            self.deferred_rows.setdefault(table, deque()).append(
+                DeferredRow(
+                    event=event,
+                    position=position,
+                    deferred_at=time.time(),
+                    row_number=self._received_row_count
+                )
+            )
+            self.deferred_row_count += 1
+        self.publish_deferred_rows()
+
+    def _should_block_on_deferred_rows(self):
+        if self.deferred_row_count >= self.max_deferred_rows:
+            return True
+        oldest_row = next(iter(self.deferred_rows.values()))[0]
+        return time.time() - oldest_row.deferred_at >= self.max_deferral_seconds
+
+    def _publish_deferred_rows_for_table(self, table):
+        schema_wrapper_entry = self._get_payload_schema(table)
+        deferred_rows = self.deferred_rows.pop(table)
+        log.info("Publishing {} held back rows of table '{}'".format(
+            len(deferred_rows),
+            table
+        ))
+        self.deferred_row_count -= len(deferred_rows)
+        for deferred_row in deferred_rows:
+            message = self._handle_row(
+                schema_wrapper_entry,
+                deferred_row.event,
+                deferred_row.position
+            )
+            if deferred_row.row_number < self._newest_published_row_number:
+                self.published_out_of_order = True
+            else:
+                self._newest_published_row_number = deferred_row.row_number
+                self.newest_published_position_info = message.upstream_position_info
 
     def _handle_row(self, schema_wrapper_entry, event, position):
+        message = self._build_message(
+            schema_wrapper_entry,
+            event,
+            position,
+            self.transaction_id_cache
+        )
+        self._publish(message, event)
+        return message
+
+    def _build_message(self, schema_wrapper_entry, event, position, transaction_id_cache):
         builder = MessageBuilder(
             schema_wrapper_entry,
             event,
             self.transaction_id_schema_id,
             position,
-            self.register_dry_run
+            self.register_dry_run,
+            transaction_id_cache=transaction_id_cache
         )
-        message = builder.build_message(
+        return builder.build_message(
             self.db_connections.source_cluster_name
         )
+
+    def _publish(self, message, event):
         self.producer.publish(message)
+        if self.published_messages is not None:
+            self.published_messages.mark_published(
+                message.upstream_position_info,
+                event
+            )
+        if self.table_heavy_hitters is not None:
+            self.table_heavy_hitters.record(event, time.time())
         if self.stats_counter:
             self.stats_counter.increment(event.table)
 
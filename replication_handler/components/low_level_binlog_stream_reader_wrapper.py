@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import logging
 import random
+from collections import namedtuple
 
 from data_pipeline.message import CreateMessage
 from data_pipeline.message import DeleteMessage
@@ -35,12 +36,21 @@ from pymysqlreplication.row_event import WriteRowsEvent
 
 from replication_handler import config
 from replication_handler.components.base_binlog_stream_reader_wrapper import BaseBinlogStreamReaderWrapper
+from replication_handler.components.column_projection import ColumnProjection
 from replication_handler.util.misc import DataEvent
+from replication_handler.util.misc import HEARTBEAT_DB
+from replication_handler.util.misc import REFRESH_TABLE_SUFFIX
 
 
 log = logging.getLogger('replication_handler.components.low_level_binlog_stream_reader_wrapper')
 
 
+_NO_ROW_CACHE = object()
+
+# Stands in for the rows of a skipped row event, so the offsets of the events
+# after it do not depend on whether its rows were handed out.
+SkippedRows = namedtuple('SkippedRows', ('schema', 'table', 'row_count'))
+
 message_type_map = {
     WRITE_ROWS_EVENT_V2: CreateMessage,
     UPDATE_ROWS_EVENT_V2: UpdateMessage,
@@ -52,13 +62,41 @@ class LowLevelBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
     """ This class wraps pymysqlreplication stream object, providing the ability to
     resume stream at a specific position, peek at next event, and pop next event.
 
+    Row events of blacklisted schemas are dropped here before their rows are
+    decoded, and counted in skipped_row_events and skipped_bytes from their
+    event headers.  Only while count_skipped_rows is set, to replay positions
+    saved when skipped rows counted towards the offsets, their rows are
+    decoded to be counted, and handed out as a single SkippedRows.
+
+    Rows of the other row events are decoded and turned into DataEvents one
+    at a time, as they are peeked at or popped, so a huge row event never has
+    all of its rows in memory at once.  Columns projected out by the
+    column_projection config are dropped from every row right after it is
+    decoded.
+
     Args:
       position(Position object): use to specify where the stream should resume.
+      gtid_enabled(bool): use to indicate if gtid is enabled in the system.
+        Without gtid, heartbeat rows are needed for position tracking and are
+        never skipped.
     """
 
-    def __init__(self, source_database_config, tracker_database_config, position):
+    def __init__(
+        self,
+        source_database_config,
+        tracker_database_config,
+        position,
+        gtid_enabled=False
+    ):
         super(LowLevelBinlogStreamReaderWrapper, self).__init__()
-        self.refresh_table_suffix = '_data_pipeline_refresh'
+        self.refresh_table_suffix = REFRESH_TABLE_SUFFIX
+        self.skipped_schemas = self._get_skipped_schemas(gtid_enabled)
+        self.skipped_row_events = 0
+        self.skipped_bytes = 0
+        self.count_skipped_rows = False
+        self.column_projection = ColumnProjection(config.env_config.column_projection)
+        # Remaining events of the last binlog event read from the stream.
+        self._pending_events = iter(())
         only_tables = self._get_only_tables()
         allowed_event_types = [
             GtidEvent,
@@ -75,6 +113,16 @@ class LowLevelBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
             only_tables
         )
 
+    @property
+    def log_file(self):
+        """Binlog file of the last event read from the stream."""
+        return self.stream.log_file
+
+    @property
+    def log_pos(self):
+        """End position of the last event read from the stream."""
+        return self.stream.log_pos
+
     def _get_only_tables(self):
         only_tables = config.env_config.table_whitelist
         if not only_tables:
@@ -93,9 +141,21 @@ class LowLevelBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
 
         return res_only_table
 
+    def _get_skipped_schemas(self, gtid_enabled):
+        skipped_schemas = config.env_config.snapshot.schema_blacklist
+        if not gtid_enabled:
+            skipped_schemas = skipped_schemas - {HEARTBEAT_DB}
+        return skipped_schemas
+
     def _refill_current_events(self):
         if not self.current_events:
-            self.current_events.extend(self._prepare_event(self.stream.fetchone()))
+            next_event = next(self._pending_events, None)
+            if next_event is None:
+                self._pending_events = iter(
+                    self._prepare_event(self.stream.fetchone())
+                )
+            else:
+                self.current_events.append(next_event)
 
     def _prepare_event(self, event):
         """ event can be None, see http://bit.ly/1JaLW9G."""
@@ -108,11 +168,29 @@ class LowLevelBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
                 event.log_file = self.stream.log_file
                 return [event]
             elif isinstance(event, (WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent)):
+                if event.schema in self.skipped_schemas:
+                    return self._skip_row_event(event)
                 return self._get_data_events_from_row_event(event)
         return []
 
+    def _skip_row_event(self, row_event):
+        """pymysqlreplication decodes rows lazily on first access of
+        row_event.rows, so dropping the event here skips the decoding cost.
+        Binlog row events do not hold their row count, so counting the rows
+        still decodes them, one at a time.
+        """
+        self.skipped_row_events += 1
+        self.skipped_bytes += row_event.event_size
+        if not self.count_skipped_rows:
+            return []
+        return [SkippedRows(
+            schema=row_event.schema,
+            table=row_event.table,
+            row_count=sum(1 for _ in self._iter_rows(row_event))
+        )]
+
     def _get_data_events_from_row_event(self, row_event):
-        """ Convert the rows into events."""
+        """ Lazily convert the rows into events."""
         target_table = row_event.table
         message_type = message_type_map[row_event.event_type]
         # Tables with suffix _data_pipeline_refresh come
@@ -122,17 +200,46 @@ class LowLevelBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
             # is determined by removing the suffix.
             target_table = row_event.table[:-len(self.refresh_table_suffix)]
             message_type = RefreshMessage
-        return [
+        # Read before the generator runs, so the position is the one of this
+        # row event no matter when its rows are consumed.
+        log_pos = self.stream.log_pos
+        log_file = self.stream.log_file
+        rows = self._iter_rows(row_event)
+        table_projection = self.column_projection.get(row_event.schema, target_table)
+        if table_projection is not None:
+            rows = self._iter_projected_rows(rows, table_projection)
+        return (
             DataEvent(
                 schema=row_event.schema,
                 table=target_table,
-                log_pos=self.stream.log_pos,
-                log_file=self.stream.log_file,
+                log_pos=log_pos,
+                log_file=log_file,
                 row=row,
                 timestamp=row_event.timestamp,
                 message_type=message_type
-            ) for row in row_event.rows
-        ]
+            ) for row in rows
+        )
+
+    def _iter_projected_rows(self, rows, table_projection):
+        for row in rows:
+            table_projection.project_row(row)
+            yield row
+
+    def _iter_rows(self, row_event):
+        """pymysqlreplication decodes every row of an event into a list on the
+        first access of row_event.rows.  While that has not happened yet, the
+        rows are decoded here one at a time instead, the same way
+        RowsEvent._fetch_rows does it.
+        """
+        if getattr(row_event, '_RowsEvent__rows', _NO_ROW_CACHE) is not None:
+            # Already decoded, or not a pymysqlreplication event.
+            for row in row_event.rows:
+                yield row
+            return
+        if not row_event.complete:
+            return
+        while row_event.packet.read_bytes + 1 < row_event.event_size:
+            yield row_event._fetch_one_row()
 
     def get_unique_server_id(self):
         # server_id must be unique per instance
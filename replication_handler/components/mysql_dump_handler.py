@@ -22,6 +22,7 @@ from replication_handler.components.mysql_tools import _get_dump_file
 from replication_handler.components.mysql_tools import _write_dump_content
 from replication_handler.components.mysql_tools import create_mysql_dump
 from replication_handler.components.mysql_tools import restore_mysql_dump
+from replication_handler.components.mysql_tools import restore_mysql_dump_in_parallel
 from replication_handler.config import env_config
 from replication_handler.models.mysql_dumps import MySQLDumps
 from replication_handler.util.misc import delete_file_if_exists
@@ -85,6 +86,15 @@ class MySQLDumpHandler(object):
             cluster_name=self.db_connections.tracker_cluster_name
         )
 
+        if env_config.schema_restore_workers > 1:
+            restore_mysql_dump_in_parallel(
+                db_creds=self.db_connections.tracker_database_config,
+                mysql_dump=latest_dump,
+                workers=env_config.schema_restore_workers
+            )
+            logger.info('Successfully completed restoration')
+            return
+
         # TODO: DATAPIPE-1911
         dump_file = _get_dump_file()
         logger.info("Writing MySQL dump to file {f}".format(
@@ -117,7 +127,8 @@ class MySQLDumpHandler(object):
             result = tracker_cursor.fetchall()
 
         unfiltered_databases = [ele for tupl in result for ele in tupl]
+        schema_blacklist = env_config.snapshot.schema_blacklist
         return ' '.join(
-            filter(lambda db_name: db_name not in env_config.schema_blacklist,
+            filter(lambda db_name: db_name not in schema_blacklist,
                    unfiltered_databases)
         )
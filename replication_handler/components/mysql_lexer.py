@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import re
+from collections import namedtuple
+
+
+# Token types
+WORD = 'word'
+NAME = 'name'
+STRING = 'string'
+PUNCTUATION = 'punctuation'
+
+_IDENTIFIER_PATTERN = (
+    r'(?:`(?:[^`]|``)*`'
+    r'|"(?:[^"]|"")*"'
+    '|[0-9a-zA-Z$_\u0080-\uffff]+)'
+)
+
+# Alternatives are tried in order, so comments have to come before the
+# punctuation catch-all.  Identifiers directly joined by dots are kept in one
+# token, the way the MysqlQualifiedIdentifierParser expects them.
+_TOKEN_REGEX = re.compile(
+    r'''
+    (?P<whitespace>\s+)
+    | (?P<comment>(?:--(?=\s|$)|\#)[^\n]*|/\*.*?(?:\*/|$))
+    | (?P<identifier>{identifier}(?:\.{identifier})*)
+    | (?P<string>'(?:[^'\\]|\\.|'')*')
+    | (?P<punctuation>.)
+    '''.format(identifier=_IDENTIFIER_PATTERN),
+    re.VERBOSE | re.DOTALL | re.UNICODE
+)
+
+_UNQUOTED_WORD_REGEX = re.compile('^[0-9a-zA-Z$_\u0080-\uffff]+$', re.UNICODE)
+
+
+class LexerToken(namedtuple('LexerToken', ('ttype', 'value'))):
+    """A token of a MySQL statement.  Unquoted single words, which include all
+    keywords, are WORD tokens, quoted or qualified identifiers are NAME tokens.
+    """
+    __slots__ = ()
+
+    def is_whitespace(self):
+        return False
+
+    def is_keyword(self, value):
+        return self.ttype == WORD and self.value.upper() == value.upper()
+
+
+def tokenize(query):
+    """Splits the query into tokens in a single pass, skipping whitespace and
+    comments.
+    """
+    for match in _TOKEN_REGEX.finditer(query):
+        kind = match.lastgroup
+        if kind == 'whitespace' or kind == 'comment':
+            continue
+        value = match.group()
+        if kind == 'identifier':
+            yield LexerToken(
+                WORD if _UNQUOTED_WORD_REGEX.match(value) else NAME,
+                value
+            )
+        elif kind == 'string':
+            yield LexerToken(STRING, value)
+        else:
+            yield LexerToken(PUNCTUATION, value)
+
+
+class LexedStatement(object):
+    """Drop in replacement for the sqlparse statement the MysqlStatement
+    classes match against.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.tokens = list(tokenize(query))
+
+    def __unicode__(self):
+        return self.query
+
+    def __str__(self):
+        return unicode(self).encode('utf-8')
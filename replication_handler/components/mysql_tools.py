@@ -18,24 +18,32 @@ from __future__ import unicode_literals
 
 import logging
 import os
+import re
+import time
 import uuid
+from collections import defaultdict
 from subprocess import Popen
 
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+
 from replication_handler.util.misc import delete_file_if_exists
 
 
 logger = logging.getLogger('replication_handler.components.mysql_tools')
 EMPTY_WAITING_OPTIONS = 0
 
+# mysqldump --databases starts the statements of every database with this
+# comment block.
+CURRENT_DATABASE_REGEX = re.compile(r'^--\n-- Current Database: `(.+)`\n', re.MULTILINE)
+
+RESTORE_PROGRESS_LOG_INTERVAL_SECONDS = 10
+
+SLOWEST_DATABASES_LOGGED = 5
+
 
 def restore_mysql_dump(db_creds, dump_file):
-    restore_cmd = "mysql --host={h} --port={p} --user={u} --password={pa} < {dump_file_path}".format(
-        h=db_creds['host'],
-        p=db_creds['port'],
-        u=db_creds['user'],
-        pa=db_creds['passwd'],
-        dump_file_path=dump_file
-    )
+    restore_cmd = _get_restore_cmd(db_creds, dump_file)
 
     logger.info("Running restore on host {h} as user {u}".format(
         h=db_creds['host'],
@@ -45,6 +53,131 @@ def restore_mysql_dump(db_creds, dump_file):
     os.waitpid(p.pid, EMPTY_WAITING_OPTIONS)
 
 
+def restore_mysql_dump_in_parallel(db_creds, mysql_dump, workers):
+    """Restores a mysqldump --databases dump one database at a time, over at
+    most workers concurrent mysql clients.  mysqldump writes the views of
+    every database in a second section at the end of the dump, so the
+    sections are restored in rounds, and the views only once all the tables
+    are.  Sections that fail to restore, for example because a view refers
+    to another view restored after it, are retried one at a time once all
+    the others are restored.
+    """
+    pieces = split_mysql_dump(mysql_dump)
+    database_count = len(set(database_name for database_name, _ in pieces))
+    logger.info(
+        "Restoring {count} databases in {pieces} sections on host {h} with "
+        "{workers} workers".format(
+            count=database_count,
+            pieces=len(pieces),
+            h=db_creds['host'],
+            workers=workers
+        )
+    )
+    started_at = time.time()
+    next_progress_log_at = started_at + RESTORE_PROGRESS_LOG_INTERVAL_SECONDS
+    restore_seconds = defaultdict(float)
+    restored_count = 0
+    failed_pieces = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for round_pieces in _get_restore_rounds(pieces):
+            futures = {
+                executor.submit(_restore_timed, db_creds, piece): (database_name, piece)
+                for database_name, piece in round_pieces
+            }
+            for future in as_completed(futures):
+                database_name, piece = futures[future]
+                succeeded, seconds = future.result()
+                restore_seconds[database_name] += seconds
+                restored_count += 1
+                if not succeeded:
+                    failed_pieces.append((database_name, piece))
+                if time.time() >= next_progress_log_at:
+                    next_progress_log_at = time.time() + RESTORE_PROGRESS_LOG_INTERVAL_SECONDS
+                    logger.info("Restored {done}/{count} sections in {s:.1f} seconds".format(
+                        done=restored_count,
+                        count=len(pieces),
+                        s=time.time() - started_at
+                    ))
+
+    for database_name, piece in failed_pieces:
+        logger.info("Retrying the restore of a section of database {}".format(database_name))
+        succeeded, seconds = _restore_timed(db_creds, piece)
+        if not succeeded:
+            raise RuntimeError("Restoring database {} failed".format(database_name))
+        restore_seconds[database_name] += seconds
+
+    slowest = sorted(restore_seconds.items(), key=lambda item: item[1], reverse=True)
+    logger.info(
+        "Restored {count} databases in {s:.1f} seconds ({retried} sections retried), "
+        "slowest: {slowest}".format(
+            count=database_count,
+            s=time.time() - started_at,
+            retried=len(failed_pieces),
+            slowest=', '.join(
+                '{}: {:.1f}s'.format(database_name, seconds)
+                for database_name, seconds in slowest[:SLOWEST_DATABASES_LOGGED]
+            )
+        )
+    )
+
+
+def split_mysql_dump(mysql_dump):
+    """Splits a mysqldump --databases dump into a dump per section, as a list
+    of (database name, dump) tuples in the order of the full dump.  A
+    database has a second section when it has views.  Every dump starts with
+    the session settings at the top of the full dump.
+    """
+    matches = list(CURRENT_DATABASE_REGEX.finditer(mysql_dump))
+    if not matches:
+        return []
+    header = mysql_dump[:matches[0].start()]
+    ends = [match.start() for match in matches[1:]] + [len(mysql_dump)]
+    return [
+        (match.group(1), header + mysql_dump[match.start():end])
+        for match, end in zip(matches, ends)
+    ]
+
+
+def _get_restore_rounds(pieces):
+    """Returns the pieces grouped in rounds, the nth round holding the nth
+    section of every database, in order.
+    """
+    rounds = []
+    section_counts = defaultdict(int)
+    for database_name, piece in pieces:
+        index = section_counts[database_name]
+        section_counts[database_name] += 1
+        if index == len(rounds):
+            rounds.append([])
+        rounds[index].append((database_name, piece))
+    return rounds
+
+
+def _restore_timed(db_creds, mysql_dump):
+    started_at = time.time()
+    dump_file = _get_dump_file()
+    try:
+        _write_dump_content(dump_file, mysql_dump)
+        return_code = _run_restore(db_creds, dump_file)
+    finally:
+        delete_file_if_exists(dump_file)
+    return return_code == 0, time.time() - started_at
+
+
+def _run_restore(db_creds, dump_file):
+    return Popen(_get_restore_cmd(db_creds, dump_file), shell=True).wait()
+
+
+def _get_restore_cmd(db_creds, dump_file):
+    return "mysql --host={h} --port={p} --user={u} --password={pa} < {dump_file_path}".format(
+        h=db_creds['host'],
+        p=db_creds['port'],
+        u=db_creds['user'],
+        pa=db_creds['passwd'],
+        dump_file_path=dump_file
+    )
+
+
 def create_mysql_dump(db_creds, databases):
     temp_file = _get_dump_file()
     dump_cmd = "mysqldump --host={} --port={} --user={} --password={} {} {} {} {} --databases {} > {}".format(
@@ -18,6 +18,8 @@ from __future__ import unicode_literals
 
 import logging
 
+from replication_handler.components.binlog_timestamp_searcher import BinlogTimestampSearcher
+from replication_handler.components.binlog_timestamp_searcher import parse_timestamp
 from replication_handler.util.position import construct_position
 from replication_handler.util.position import GtidPosition
 from replication_handler.util.position import LogPosition
@@ -33,13 +35,22 @@ class PositionFinder(object):
     Args:
       global_event_state(GlobalEventState object): stores the global state, including
         position information.
+      start_timestamp(int or str): time to start tailing from when there is no saved
+        position, see BinlogTimestampSearcher.
+      db_connections(BaseConnection object): a wrapper for communication with mysql db,
+        required with start_timestamp.
     """
 
-    def __init__(self, gtid_enabled, global_event_state):
+    def __init__(self, gtid_enabled, global_event_state, start_timestamp=None, db_connections=None):
         self.gtid_enabled = gtid_enabled
         self.global_event_state = global_event_state
+        self.start_timestamp = start_timestamp
+        self.db_connections = db_connections
 
     def get_position_to_resume_tailing_from(self):
         if self.global_event_state:
             return construct_position(self.global_event_state.position)
+        if self.start_timestamp is not None:
+            searcher = BinlogTimestampSearcher(self.db_connections, self.gtid_enabled)
+            return searcher.get_position(parse_timestamp(self.start_timestamp))
         return GtidPosition() if self.gtid_enabled else LogPosition()
@@ -23,6 +23,8 @@ from pymysqlreplication.event import QueryEvent
 
 from replication_handler.components.base_event_handler import Table
 from replication_handler.components.change_log_data_event_handler import ChangeLogDataEventHandler
+from replication_handler.components.data_event_handler import get_noise_columns
+from replication_handler.components.data_event_handler import is_noise_update
 from replication_handler.components.mysql_dump_handler import MySQLDumpHandler
 from replication_handler.components.sql_handler import mysql_statement_factory
 from replication_handler.config import env_config
@@ -54,6 +56,10 @@ class RecoveryHandler(object):
       register_dry_run(boolean): whether a schema has to be registered for a message to be published.
       publish_dry_run(boolean): whether actually publishing a message or not.
       changelog_mode(boolean): If True, executes change_log flow (default: false)
+
+    Updates that only change noise columns are not replayed, as they were
+    never published.  Changelog rows are replayed without being coalesced, see
+    ChangeLogDataEventHandler.
     """
 
     def __init__(
@@ -90,6 +96,7 @@ class RecoveryHandler(object):
         self.transaction_id_schema_id = get_transaction_id_schema_id(gtid_enabled)
         self.changelog_schema_wrapper = self._get_changelog_schema_wrapper()
         self.mysql_dump_handler = MySQLDumpHandler(db_connections)
+        self.noise_columns = get_noise_columns()
 
     @property
     def need_recovery(self):
@@ -148,9 +155,12 @@ class RecoveryHandler(object):
                     repr(event), event.query
                 ))
                 break
-            log.info("Recovery event for %s" % event.table)
             replication_handler_event = stream.next()
-            events.append(replication_handler_event)
+            if self.noise_columns and is_noise_update(event, self.noise_columns):
+                log.info("Recovery skipped noise update for %s" % event.table)
+            else:
+                log.info("Recovery event for %s" % event.table)
+                events.append(replication_handler_event)
             if self._already_caught_up(replication_handler_event):
                 break
         log.info("Recovering with %s events" % len(events))
@@ -22,7 +22,10 @@ import logging
 from replication_handler.components.position_finder import PositionFinder
 from replication_handler.components.recovery_handler import RecoveryHandler
 from replication_handler.components.simple_binlog_stream_reader_wrapper import SimpleBinlogStreamReaderWrapper
+from replication_handler.config import env_config
 from replication_handler.models.global_event_state import GlobalEventState
+from replication_handler.util.binlog_backlog import BinlogBacklogSampler
+from replication_handler.util.startup_timeline import startup_timeline
 
 
 log = logging.getLogger('replication_handler.components.replication_stream_restarter')
@@ -47,7 +50,9 @@ class ReplicationStreamRestarter(object):
         )
         self.position_finder = PositionFinder(
             gtid_enabled,
-            self.global_event_state
+            self.global_event_state,
+            start_timestamp=env_config.start_timestamp,
+            db_connections=self.db_connections
         )
         self.schema_wrapper = schema_wrapper
         self.activate_mysql_dump_recovery = activate_mysql_dump_recovery
@@ -61,15 +66,22 @@ class ReplicationStreamRestarter(object):
         register_dry_run(boolean): whether a schema has to be registered for a message to be published.
         changelog_mode(boolean): If True, executes change_log flow (default: false)
         """
-        position = self.position_finder.get_position_to_resume_tailing_from()
+        with startup_timeline.phase('find_position'):
+            position = self.position_finder.get_position_to_resume_tailing_from()
         log.info("Restarting replication: %s" % repr(position))
-        self.stream = SimpleBinlogStreamReaderWrapper(
-            source_database_config=self.db_connections.source_database_config,
-            tracker_database_config=self.db_connections.tracker_database_config,
-            position=position,
-            gtid_enabled=self.gtid_enabled
-        )
+        with startup_timeline.phase('seek_stream'):
+            self.stream = SimpleBinlogStreamReaderWrapper(
+                source_database_config=self.db_connections.source_database_config,
+                tracker_database_config=self.db_connections.tracker_database_config,
+                position=position,
+                gtid_enabled=self.gtid_enabled,
+                backlog_sampler=self._get_backlog_sampler()
+            )
         log.info("Created replication stream.")
+        with startup_timeline.phase('recovery'):
+            self._recover(producer, register_dry_run, changelog_mode)
+
+    def _recover(self, producer, register_dry_run, changelog_mode):
         if self.global_event_state:
             recovery_handler = RecoveryHandler(
                 stream=self.stream,
@@ -90,6 +102,14 @@ class ReplicationStreamRestarter(object):
         """ This function returns the replication stream"""
         return self.stream
 
+    def _get_backlog_sampler(self):
+        if not env_config.binlog_backlog_sample_interval_seconds:
+            return None
+        return BinlogBacklogSampler(
+            self.db_connections,
+            env_config.binlog_backlog_sample_interval_seconds
+        )
+
     def _get_global_event_state(self, cluster_name):
         with self.db_connections.state_session.connect_begin(ro=True) as session:
             return copy.copy(
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+import re
+import time
+from collections import namedtuple
+from collections import OrderedDict
+
+from replication_handler.components.base_event_handler import Table
+from replication_handler.components.schema_tracker import SchemaTracker
+from replication_handler.components.schema_tracker import ShowCreateResult
+from replication_handler.components.sql_handler import AlterTableStatement
+from replication_handler.components.sql_handler import CreateTableStatement
+from replication_handler.components.sql_handler import mysql_statement_factory
+
+
+log = logging.getLogger('replication_handler.components.schema_catalog')
+
+
+CatalogEntry = namedtuple(
+    'CatalogEntry',
+    ('create_table_stmt', 'column_type_map', 'verified_at')
+)
+
+
+# Matches a column definition line of the canonical SHOW CREATE TABLE output,
+# e.g. "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT,".  The type is the
+# name, its optional parenthesized arguments (which may contain quoted values)
+# and the unsigned/zerofill attributes, the same text SHOW COLUMNS reports.
+COLUMN_DEFINITION_REGEX = re.compile(
+    r"^\s*`((?:[^`]|``)+)`\s+"
+    r"(\w+(?:\((?:[^()']|'(?:[^']|'')*')*\))?(?:\s+unsigned)?(?:\s+zerofill)?)",
+    re.IGNORECASE
+)
+
+
+def parse_column_type_map(create_table_stmt):
+    """Extracts the column name to column type mapping from a canonical
+    CREATE TABLE statement, as returned by SHOW CREATE TABLE.
+    """
+    column_type_map = OrderedDict()
+    for line in create_table_stmt.splitlines()[1:]:
+        match = COLUMN_DEFINITION_REGEX.match(line)
+        if match:
+            column_name = match.group(1).replace('``', '`')
+            column_type_map[column_name] = match.group(2)
+    return column_type_map
+
+
+class SchemaCatalog(SchemaTracker):
+    """ This class keeps an in process copy of the table definitions of the
+    schema tracker database, so the CREATE TABLE statement before an ALTER and
+    the column types after it are served from memory instead of SHOW CREATE
+    TABLE and SHOW COLUMNS round trips.
+
+    This does not take the schema tracker out of schema changes.  Every DDL
+    is still executed against the schema tracker database, which renders the
+    canonical CREATE TABLE statement, since rendering it in process would mean
+    reimplementing the DDL semantics of MySQL.  Entries of the tables a
+    statement touches are dropped, so every ALTER is still followed by a SHOW
+    CREATE TABLE, and statements that can touch several tables (renames,
+    drops, database statements) drop the whole catalog.  Only the repeated
+    reads of table definitions between schema changes are saved.  Entries
+    older than verify_interval_seconds are compared with the tracker again
+    the next time they are used.
+
+    Args:
+        db_connections: The data base connections
+        verify_interval_seconds(int): age after which an entry is verified
+          against the schema tracker database.
+    """
+
+    def __init__(self, db_connections, verify_interval_seconds):
+        super(SchemaCatalog, self).__init__(db_connections)
+        self.verify_interval_seconds = verify_interval_seconds
+        self.entries = {}
+
+    def execute_query(self, query, database_name):
+        super(SchemaCatalog, self).execute_query(query, database_name)
+        self._apply_statement(mysql_statement_factory(query), database_name)
+
+    def get_show_create_statement(self, table):
+        entry = self._get_entry(table)
+        if entry is None:
+            return super(SchemaCatalog, self).get_show_create_statement(table)
+        return ShowCreateResult(
+            table=table.table_name,
+            query=entry.create_table_stmt
+        )
+
+    def get_column_type_map(self, table):
+        entry = self._get_entry(table)
+        if entry is None:
+            return super(SchemaCatalog, self).get_column_type_map(table)
+        return dict(entry.column_type_map)
+
+    def clear(self):
+        self.entries = {}
+
+    def _get_entry(self, table):
+        entry = self.entries.get(table)
+        if entry is None:
+            return self._load_entry(table)
+        if time.time() - entry.verified_at >= self.verify_interval_seconds:
+            return self._verify_entry(table, entry)
+        return entry
+
+    def _load_entry(self, table):
+        show_create_result = super(SchemaCatalog, self).get_show_create_statement(table)
+        if not show_create_result.query:
+            # Tables missing from the tracker are not cached, so they are
+            # picked up as soon as they are created.
+            return None
+        column_type_map = parse_column_type_map(show_create_result.query)
+        if not column_type_map:
+            log.warning("Could not parse the columns of {}, not caching it".format(
+                table
+            ))
+            return None
+        entry = CatalogEntry(
+            create_table_stmt=show_create_result.query,
+            column_type_map=column_type_map,
+            verified_at=time.time()
+        )
+        self.entries[table] = entry
+        return entry
+
+    def _verify_entry(self, table, entry):
+        new_entry = self._load_entry(table)
+        if new_entry is None:
+            self.entries.pop(table, None)
+        elif new_entry.create_table_stmt != entry.create_table_stmt:
+            log.warning(
+                "Schema catalog entry of {} diverged from the schema tracker, "
+                "replacing it".format(table)
+            )
+        return new_entry
+
+    def _apply_statement(self, statement, database_name):
+        if isinstance(statement, CreateTableStatement) or (
+            isinstance(statement, AlterTableStatement) and
+            not statement.does_rename_table()
+        ):
+            table = Table(
+                cluster_name=self.db_connections.source_cluster_name,
+                database_name=statement.database_name or database_name,
+                table_name=statement.table
+            )
+            self.entries.pop(table, None)
+        else:
+            self.clear()
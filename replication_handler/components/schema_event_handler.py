@@ -17,17 +17,28 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import logging
+import re
+from collections import namedtuple
 
 from replication_handler.components.base_event_handler import BaseEventHandler
 from replication_handler.components.base_event_handler import Table
 from replication_handler.components.mysql_dump_handler import MySQLDumpHandler
+from replication_handler.components.schema_catalog import SchemaCatalog
 from replication_handler.components.schema_tracker import SchemaTracker
+from replication_handler.components.schema_tracker import ShowCreateResult
 from replication_handler.components.sql_handler import AlterTableStatement
 from replication_handler.components.sql_handler import CreateDatabaseStatement
+from replication_handler.components.sql_handler import DropTableStatement
+from replication_handler.components.sql_handler import IndexStatementBase
 from replication_handler.components.sql_handler import mysql_statement_factory
+from replication_handler.components.sql_handler import ParseError
 from replication_handler.components.sql_handler import RenameTableStatement
+from replication_handler.components.sql_handler import TableStatementBase
+from replication_handler.components.sql_handler import UnparseableTableNameError
+from replication_handler.config import env_config
 from replication_handler.models.global_event_state import EventType
 from replication_handler.models.global_event_state import GlobalEventState
+from replication_handler.util.misc import REFRESH_TABLE_SUFFIX
 from replication_handler.util.misc import save_position
 
 
@@ -35,16 +46,77 @@ logger = logging.getLogger(
     'replication_handler.components.schema_event_handler'
 )
 
+SchemaEventCheckpoint = namedtuple(
+    'SchemaEventCheckpoint',
+    ('position', 'event_type', 'cluster_name', 'database_name', 'table_name')
+)
+
+# A schema event checkpoint waiting for the first published_count messages
+# to be delivered.
+PendingCheckpoint = namedtuple(
+    'PendingCheckpoint',
+    ('published_count', 'checkpoint')
+)
+
 
 class SchemaEventHandler(BaseEventHandler):
     """Process all incoming schema changes
+
+    With in_flight_tables, the producer is only flushed before schema changes
+    of tables that still have messages in flight, which are tracked by
+    published_messages.  The checkpoint of a schema
+    change made while messages of other tables are in flight is held back
+    until the producer delivers them, see save_position.
+
+    With skip_ddl_for_unwhitelisted_tables, statements on tables that are not
+    replicated are skipped like unsupported statements, so those tables are
+    missing from the schema tracker.  A skipped table renamed to a whitelisted
+    name, as online schema change tools do, is created first from the source,
+    see _get_tracked_rename_query.
+
+    With batch_schema_event_checkpoints, a run of schema events without data
+    events in between is checkpointed once, with a single schema dump, when
+    the run ends, see save_deferred_checkpoint.  Until then the last saved
+    checkpoint and dump are from before the run, so a restart replays the
+    whole run.
+
+    With newest_position_info_callback, the position saved once every
+    published message is delivered is the one it returns, since rows
+    published out of binlog order can leave the last published message
+    behind rows already delivered, see DataEventHandler.
     """
 
     def __init__(self, *args, **kwargs):
         self.register_dry_run = kwargs.pop('register_dry_run')
+        self.in_flight_tables = kwargs.pop('in_flight_tables', None)
+        self.published_messages = kwargs.pop('published_messages', None)
+        self.newest_position_info_callback = kwargs.pop(
+            'newest_position_info_callback',
+            None
+        )
         super(SchemaEventHandler, self).__init__(*args, **kwargs)
-        self.schema_tracker = SchemaTracker(self.db_connections)
+        self.pending_checkpoint = None
+        self.skip_ddl_for_unwhitelisted_tables = (
+            env_config.skip_ddl_for_unwhitelisted_tables
+        )
+        self.batch_checkpoints = env_config.batch_schema_event_checkpoints
+        self.max_batched_checkpoints = env_config.schema_event_checkpoint_max_batch_size
+        self.deferred_checkpoint = None
+        self.deferred_checkpoint_count = 0
+        self.schema_tracker = self._get_schema_tracker()
         self.mysql_dump_handler = MySQLDumpHandler(self.db_connections)
+        # The last event checked by changes_schema, with its statement and
+        # whether it can be skipped, so handle_event does not check it again.
+        self._checked_event = None
+        self._checked_statement = None
+        self._checked_can_be_skipped = None
+
+    def _get_schema_tracker(self):
+        # The catalog has to be shared with the schema wrapper, so the entries
+        # dropped for a DDL are dropped for both.
+        if isinstance(self.schema_wrapper.schema_tracker, SchemaCatalog):
+            return self.schema_wrapper.schema_tracker
+        return SchemaTracker(self.db_connections)
 
     def handle_event(self, event, position):
         """Handles schema change queries. For queries that alter schema,
@@ -55,8 +127,9 @@ class SchemaEventHandler(BaseEventHandler):
             event: The event containing the query
             position: The current position (for saving state)
         """
-        statement = mysql_statement_factory(event.query)
-        if self._event_can_be_skipped(event, statement):
+        statement, can_be_skipped = self._check_event(event)
+        self._checked_event = None
+        if can_be_skipped:
             return
         query = event.query
         schema = event.schema
@@ -66,12 +139,18 @@ class SchemaEventHandler(BaseEventHandler):
         if self.stats_counter:
             self.stats_counter.increment(query)
 
-        logger.info("Flushing all messages from producer and saving position")
-        self.producer.flush()
-        save_position(
-            position_data=self.producer.get_checkpoint_position_data(),
-            state_session=self.db_connections.state_session
-        )
+        if self.in_flight_tables is not None:
+            self._flush_in_flight_tables(statement, schema)
+        elif self.deferred_checkpoint is None:
+            # Within a run of schema events, nothing was published since the
+            # flush of the first one.
+            logger.info("Flushing all messages from producer and saving position")
+            self.producer.flush()
+            save_position(
+                position_data=self.producer.get_checkpoint_position_data(),
+                state_session=self.db_connections.state_session,
+                position_info=self._get_newest_position_info()
+            )
 
         if not self.mysql_dump_handler.mysql_dump_exists():
             # For first time schema event backup
@@ -121,7 +200,11 @@ class SchemaEventHandler(BaseEventHandler):
                 self.schema_wrapper.reset_cache()
 
             database_name = self._get_db_for_statement(statement, schema)
-            self._execute_query(query=query, database_name=database_name)
+            renamed_tables = self._get_renamed_tables(statement, schema)
+            if renamed_tables is not None:
+                query = self._get_tracked_rename_query(renamed_tables)
+            if query is not None:
+                self._execute_query(query=query, database_name=database_name)
 
             self._checkpoint(
                 position=position.to_dict(),
@@ -131,11 +214,83 @@ class SchemaEventHandler(BaseEventHandler):
                 table_name=None
             )
 
+    def save_position(self, position_data, is_clean_shutdown=False, position_info=None):
+        """Saves the position of the last message the producer delivered, or
+        position_info when given, and the held back schema event checkpoint
+        once the messages before it are delivered.  The one further in the
+        stream is saved last, so the schema dump always matches the saved
+        position.
+        """
+        pending_checkpoint = self.pending_checkpoint
+        if (
+            pending_checkpoint is not None and
+            self.in_flight_tables.delivered_count > pending_checkpoint.published_count
+        ):
+            self._save_pending_checkpoint()
+            pending_checkpoint = None
+        save_position(
+            position_data=position_data,
+            is_clean_shutdown=is_clean_shutdown,
+            state_session=self.db_connections.state_session,
+            position_info=position_info
+        )
+        if pending_checkpoint is not None and (
+            self.in_flight_tables.delivered_count == pending_checkpoint.published_count
+        ):
+            self._save_pending_checkpoint()
+
+    def _flush_in_flight_tables(self, statement, schema):
+        """Flushes the producer when the statement touches a table with
+        messages in flight, or when a held back checkpoint is still waiting for
+        its messages, since there is only one.
+        """
+        if self._touches_in_flight_table(statement, schema) or (
+            self.pending_checkpoint is not None and
+            self.in_flight_tables.delivered_count < self.pending_checkpoint.published_count
+        ):
+            logger.info("Flushing all messages from producer and saving position")
+            self.producer.flush()
+            self.published_messages.mark_all_delivered()
+        else:
+            logger.info("Saving position without flushing the producer")
+        self.save_position(
+            self.producer.get_checkpoint_position_data(),
+            position_info=None if self.in_flight_tables else self._get_newest_position_info()
+        )
+
+    def _get_newest_position_info(self):
+        """Only valid once every published message is delivered."""
+        if self.newest_position_info_callback is None:
+            return None
+        return self.newest_position_info_callback()
+
+    def _touches_in_flight_table(self, statement, schema):
+        if isinstance(statement, CreateDatabaseStatement):
+            return False
+        if isinstance(statement, TableStatementBase):
+            return (statement.database_name or schema, statement.table) in self.in_flight_tables
+        # The tables of index, rename and database statements are not parsed.
+        return bool(self.in_flight_tables)
+
     def _get_db_for_statement(self, statement, schema):
         database_name = None if isinstance(statement, CreateDatabaseStatement) \
             else schema
         return database_name
 
+    def changes_schema(self, event):
+        """Returns whether handle_event would process the event, rather than
+        skip it as BEGIN, COMMIT, blacklisted, unsupported or unwhitelisted.
+        """
+        return not self._check_event(event)[1]
+
+    def _check_event(self, event):
+        if event is not self._checked_event:
+            statement = mysql_statement_factory(event.query)
+            self._checked_can_be_skipped = self._event_can_be_skipped(event, statement)
+            self._checked_statement = statement
+            self._checked_event = event
+        return self._checked_statement, self._checked_can_be_skipped
+
     def _event_can_be_skipped(self, event, statement):
         skippable_queries = {'BEGIN', 'COMMIT'}
         if event.query in skippable_queries:
@@ -149,8 +304,149 @@ class SchemaEventHandler(BaseEventHandler):
                 s=type(statement)
             ))
             return True
+
+        if self._is_unwhitelisted_table_statement(statement, event.schema):
+            logger.debug("Query {q} is on a table that is not whitelisted".format(
+                q=event.query
+            ))
+            return True
         return False
 
+    def _is_unwhitelisted_table_statement(self, statement, schema):
+        if not self.skip_ddl_for_unwhitelisted_tables:
+            return False
+        if isinstance(statement, RenameTableStatement):
+            renamed_tables = self._get_renamed_tables(statement, schema)
+            return renamed_tables is not None and not any(
+                self._is_table_whitelisted(table)
+                for rename in renamed_tables
+                for table in rename
+            )
+        if isinstance(statement, IndexStatementBase):
+            # The tables of skipped statements are missing from the tracker.
+            return statement.table is not None and not self._is_table_whitelisted(
+                self._get_table(statement, schema)
+            )
+        if (
+            not isinstance(statement, TableStatementBase) or
+            # The new name of a renamed table could be whitelisted.
+            self._does_query_rename_table(statement)
+        ):
+            return False
+        table = self._get_table(statement, schema)
+        if self._is_table_whitelisted(table):
+            return False
+        # Tables renamed from a whitelisted name are in the tracker, and have
+        # to be dropped from it so the name can be used again.
+        return not (
+            isinstance(statement, DropTableStatement) and
+            self._is_table_tracked(table)
+        )
+
+    def _is_table_whitelisted(self, table):
+        table_name = table.table_name
+        if table_name.endswith(REFRESH_TABLE_SUFFIX):
+            table_name = table_name[:-len(REFRESH_TABLE_SUFFIX)]
+        return env_config.snapshot.is_table_whitelisted(table_name)
+
+    def _is_table_tracked(self, table):
+        return bool(self.schema_tracker.get_show_create_statement(table).query)
+
+    def _get_table(self, statement, schema):
+        return Table(
+            cluster_name=self.db_connections.source_cluster_name,
+            database_name=statement.database_name or schema,
+            table_name=statement.table
+        )
+
+    def _get_renamed_tables(self, statement, schema):
+        """Returns the (old, new) Table pairs of a RENAME TABLE statement when
+        unwhitelisted tables are skipped, and None otherwise or when they
+        cannot be parsed.
+        """
+        if (
+            not self.skip_ddl_for_unwhitelisted_tables or
+            not isinstance(statement, RenameTableStatement)
+        ):
+            return None
+        try:
+            renamed_tables = statement.get_renamed_tables()
+        except (ParseError, UnparseableTableNameError):
+            logger.warning("Could not parse the tables of {}".format(statement.statement))
+            return None
+        return [
+            tuple(
+                Table(
+                    cluster_name=self.db_connections.source_cluster_name,
+                    database_name=database_name or schema,
+                    table_name=table_name
+                )
+                for database_name, table_name in rename
+            )
+            for rename in renamed_tables
+        ]
+
+    def _get_tracked_rename_query(self, renamed_tables):
+        """Returns the rename query to run on the schema tracker, which is
+        missing the tables whose statements were skipped.  Those renamed to a
+        whitelisted name are created first, from the SHOW CREATE on the source
+        of the table they end up as.  The renames of the others are left out,
+        and None is returned when no rename is left.
+        """
+        is_tracked = {}
+        tracked_renames = []
+        for index, (old_table, new_table) in enumerate(renamed_tables):
+            if old_table not in is_tracked:
+                is_tracked[old_table] = self._is_table_tracked(old_table)
+            if not is_tracked[old_table]:
+                if not self._is_table_whitelisted(new_table):
+                    continue
+                self._create_table_from_source(
+                    table=old_table,
+                    source_table=self._get_final_table(renamed_tables, index)
+                )
+            is_tracked[old_table] = False
+            is_tracked[new_table] = True
+            tracked_renames.append((old_table, new_table))
+        if not tracked_renames:
+            return None
+        return "RENAME TABLE {}".format(', '.join(
+            "`{0}`.`{1}` TO `{2}`.`{3}`".format(
+                old_table.database_name,
+                old_table.table_name,
+                new_table.database_name,
+                new_table.table_name
+            )
+            for old_table, new_table in tracked_renames
+        ))
+
+    def _get_final_table(self, renamed_tables, index):
+        table = renamed_tables[index][1]
+        for old_table, new_table in renamed_tables[index + 1:]:
+            if old_table == table:
+                table = new_table
+        return table
+
+    def _create_table_from_source(self, table, source_table):
+        logger.info("Creating {} in the schema tracker from {} on the source".format(
+            table,
+            source_table
+        ))
+        with self.db_connections.get_source_cursor() as cursor:
+            cursor.execute("SHOW CREATE TABLE `{0}`.`{1}`".format(
+                source_table.database_name,
+                source_table.table_name
+            ))
+            show_create_result = ShowCreateResult(*cursor.fetchone())
+        # SHOW CREATE TABLE names the table unqualified, right after CREATE TABLE.
+        create_table_stmt = re.sub(
+            r'^CREATE TABLE `(?:[^`]|``)+`',
+            lambda match: "CREATE TABLE `{0}`".format(table.table_name),
+            show_create_result.query,
+            count=1
+        )
+        self._execute_query(query=create_table_stmt, database_name=table.database_name)
+
     def _process_alter_table_event(self, query, table):
         """
         This executes the alter table query and registers the query with
@@ -188,17 +484,62 @@ class SchemaEventHandler(BaseEventHandler):
         database_name,
         table_name,
     ):
+        checkpoint = SchemaEventCheckpoint(
+            position=position,
+            event_type=event_type,
+            cluster_name=cluster_name,
+            database_name=database_name,
+            table_name=table_name
+        )
+        if self.batch_checkpoints:
+            self.deferred_checkpoint = checkpoint
+            self.deferred_checkpoint_count += 1
+            if self.deferred_checkpoint_count < self.max_batched_checkpoints:
+                return
+            return self.save_deferred_checkpoint()
+        return self._dump_and_save_checkpoint(checkpoint)
+
+    def save_deferred_checkpoint(self):
+        """Saves the checkpoint of the last schema event of the current run,
+        if any.  Called once the run ends, before the next data event.
+        """
+        if self.deferred_checkpoint is None:
+            return
+        logger.info("Saving the checkpoint of {} schema events".format(
+            self.deferred_checkpoint_count
+        ))
+        checkpoint = self.deferred_checkpoint
+        self.deferred_checkpoint = None
+        self.deferred_checkpoint_count = 0
+        return self._dump_and_save_checkpoint(checkpoint)
+
+    def _dump_and_save_checkpoint(self, checkpoint):
         # Split creating and persisting dump to minimize time between updated
         # global event state and new dump being saved.
         self.mysql_dump_handler.create_schema_dump()
+        if self.in_flight_tables:
+            # Resuming after this event would lose the messages in flight.
+            self.pending_checkpoint = PendingCheckpoint(
+                published_count=self.in_flight_tables.published_count,
+                checkpoint=checkpoint
+            )
+            return
+        return self._save_checkpoint(checkpoint)
+
+    def _save_pending_checkpoint(self):
+        checkpoint = self.pending_checkpoint.checkpoint
+        self.pending_checkpoint = None
+        return self._save_checkpoint(checkpoint)
+
+    def _save_checkpoint(self, checkpoint):
         with self.db_connections.state_session.connect_begin(ro=False) as session:
             GlobalEventState.upsert(
                 session=session,
-                position=position,
-                event_type=event_type,
-                cluster_name=cluster_name,
-                database_name=database_name,
-                table_name=table_name
+                position=checkpoint.position,
+                event_type=checkpoint.event_type,
+                cluster_name=checkpoint.cluster_name,
+                database_name=checkpoint.database_name,
+                table_name=checkpoint.table_name
             )
         return self.mysql_dump_handler.persist_schema_dump()
 
@@ -19,6 +19,10 @@ from __future__ import unicode_literals
 import logging
 from collections import namedtuple
 
+from concurrent.futures import ThreadPoolExecutor
+
+from replication_handler.components.column_projection import ColumnProjection
+from replication_handler.components.schema_catalog import SchemaCatalog
 from replication_handler.components.schema_tracker import SchemaTracker
 from replication_handler.config import env_config
 
@@ -52,15 +56,23 @@ class SchemaWrapper(object):
 
     __metaclass__ = SchemaWrapperSingleton
     _notify_email = "bam+replication+handler@yelp.com"
+    _executor = None
 
     def __init__(self, db_connections, schematizer_client):
         self.reset_cache()
         self.schematizer_client = schematizer_client
-        self.schema_tracker = SchemaTracker(
-            db_connections
-        )
+        self.schema_tracker = self._get_schema_tracker(db_connections)
+        self.column_projection = ColumnProjection(env_config.column_projection)
         self._set_pii_identifier()
 
+    def _get_schema_tracker(self, db_connections):
+        if env_config.schema_catalog_enabled:
+            return SchemaCatalog(
+                db_connections,
+                verify_interval_seconds=env_config.schema_catalog_verify_interval_seconds
+            )
+        return SchemaTracker(db_connections)
+
     @classmethod
     def is_pii_supported(cls):
         try:
@@ -78,10 +90,53 @@ class SchemaWrapper(object):
 
     def __getitem__(self, table):
         if table not in self.cache:
-            log.info("table '{}' is not in the cache".format(table))
-            self._fetch_schema_for_table(table)
+            pending_fetch = self._pending_fetches.pop(table, None)
+            if pending_fetch is not None:
+                # Raises if the background fetch failed, the same way a
+                # synchronous fetch would.
+                pending_fetch.result()
+            else:
+                log.info("table '{}' is not in the cache".format(table))
+                self._fetch_schema_for_table(table)
         return self.cache[table]
 
+    def prefetch(self, table):
+        """Starts fetching the schema of the table in the background, unless it
+        is cached or already being fetched.  The result is picked up by the
+        next lookup of the table.
+        """
+        if table in self.cache or table in self._pending_fetches:
+            return
+        log.info("prefetching schema for table '{}'".format(table))
+        self._pending_fetches[table] = self._get_executor().submit(
+            self._fetch_schema_for_table,
+            table
+        )
+
+    def is_ready(self, table):
+        """Whether looking up the table would return without waiting on the
+        schema tracker or the schematizer.
+        """
+        if table in self.cache:
+            return True
+        pending_fetch = self._pending_fetches.get(table)
+        return pending_fetch is not None and pending_fetch.done()
+
+    def wait_for_pending_fetches(self):
+        """Blocks until every background fetch has finished. Has to be called
+        before the cache is changed by schema events, so a fetch started
+        before the change cannot write a stale entry after it.
+        """
+        for table in list(self._pending_fetches):
+            self[table]
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=env_config.schema_resolution_workers
+            )
+        return self._executor
+
     def _fetch_schema_for_table(self, table):
         """The schematizer registers schemas idempotently, so this will either
         create a new schema if one hasn't been created before, or populate
@@ -103,12 +158,24 @@ class SchemaWrapper(object):
     ):
         """Register with schema store and populate cache
            with response, one interface for both create and alter
-           statements.
+           statements.  Tables with a column projection are registered
+           without the columns that are projected out.
         """
         log.info("registering {} with schema store".format(table))
         if env_config.register_dry_run:
             self.cache[table] = self._dry_run_schema
             return
+        table_projection = self.column_projection.get(
+            table.database_name,
+            table.table_name
+        )
+        if table_projection is not None:
+            new_create_table_stmt = table_projection.project_create_table_stmt(
+                new_create_table_stmt
+            )
+            old_create_table_stmt = table_projection.project_create_table_stmt(
+                old_create_table_stmt
+            )
         table_stmt_kwargs = {
             'namespace': "{0}.{1}.{2}".format(
                 env_config.namespace,
@@ -142,13 +209,18 @@ class SchemaWrapper(object):
 
     def reset_cache(self):
         self.cache = {}
+        self._pending_fetches = {}
 
     def _populate_schema_cache(self, table, resp):
         column_type_map = self.schema_tracker.get_column_type_map(table)
+        table_projection = self.column_projection.get(
+            table.database_name,
+            table.table_name
+        )
         transformation_map = {
             column_name: column_type
             for column_name, column_type in column_type_map.iteritems()
-            if (
+            if (table_projection is None or table_projection.keeps(column_name)) and (
                 column_type.startswith('set') or
                 column_type.startswith('timestamp') or
                 column_type.startswith('datetime') or
@@ -19,6 +19,7 @@ from __future__ import unicode_literals
 import calendar
 import datetime
 import logging
+import time
 
 import pytz
 from dateutil.tz import tzlocal
@@ -28,6 +29,8 @@ from pymysqlreplication.event import GtidEvent
 from replication_handler import config
 from replication_handler.components.base_binlog_stream_reader_wrapper import BaseBinlogStreamReaderWrapper
 from replication_handler.components.low_level_binlog_stream_reader_wrapper import LowLevelBinlogStreamReaderWrapper
+from replication_handler.components.low_level_binlog_stream_reader_wrapper import SkippedRows
+from replication_handler.util.misc import DataEvent
 from replication_handler.util.misc import HEARTBEAT_DB
 from replication_handler.util.misc import ReplicationHandlerEvent
 from replication_handler.util.position import GtidPosition
@@ -45,10 +48,18 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
     focusing on dealing with offsets, and providing the ability to iterate through
     events with position information attached.
 
+    The rows of skipped row events do not count towards the offsets, unless
+    skip_blacklisted_row_decoding is turned off, which counts them as they
+    were counted when they were handed out as DataEvents.  Positions record
+    which way their offset was counted, and the saved offset is replayed that
+    way, switching to the configured way at the next position update.
+
     Args:
       source_database_config(dict): source database connection configuration.
       position(Position object): use to specify where the stream should resume.
       gtid_enabled(bool): use to indicate if gtid is enabled in the system.
+      backlog_sampler(BinlogBacklogSampler object, optional): sampled with the
+        position of every event read, and reported in the progress log.
     """
 
     def __init__(
@@ -56,15 +67,33 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
         source_database_config,
         tracker_database_config,
         position,
-        gtid_enabled=False
+        gtid_enabled=False,
+        backlog_sampler=None
     ):
         super(SimpleBinlogStreamReaderWrapper, self).__init__()
         self.stream = LowLevelBinlogStreamReaderWrapper(
-            source_database_config, tracker_database_config, position
+            source_database_config,
+            tracker_database_config,
+            position,
+            gtid_enabled=gtid_enabled
         )
         self.gtid_enabled = gtid_enabled
+        self.backlog_sampler = backlog_sampler
+        # The read time of data events is only used by the message latency
+        # tracing and the table heavy hitters.
+        self.stamp_read_at = bool(
+            config.env_config.message_latency_tracing or
+            config.env_config.table_heavy_hitters_capacity
+        )
         self._upstream_position = position
         self._offset = 0
+        if position.offset is not None:
+            self.stream.count_skipped_rows = position.counts_skipped_rows
+        else:
+            self.stream.count_skipped_rows = self._configured_count_skipped_rows()
+        # Replication delay as of the last heartbeat, or as of the last
+        # GtidEvent when gtid is enabled.
+        self.delay_seconds = None
         self._set_sensu_alert_manager()
         self._set_meteorite_gauge_manager()
         self._seek(self._upstream_position.offset)
@@ -138,7 +167,8 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
         """This method advances the internal dequeue to provided offset.
         """
         original_offset = offset
-        while offset >= 0:
+        # Skipped rows advance the offset without being popped.
+        while offset >= 0 and self._offset <= original_offset:
             self.pop()
             offset -= 1
 
@@ -164,6 +194,9 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
             self._upstream_position = GtidPosition(
                 gtid=event.gtid
             )
+            # There are no heartbeats with gtid, binlog event timestamps only
+            # have a precision of a second.
+            self.delay_seconds = time.time() - event.timestamp
         elif (not self.gtid_enabled) and event.schema == HEARTBEAT_DB and hasattr(event, 'row'):
             # row['after_values']['timestamp'] should be a datetime object without tzinfo.
             # we need to give it a local timezone.
@@ -181,6 +214,10 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
                 hb_timestamp=calendar.timegm(timestamp.utctimetuple()),
             )
         self._offset = 0
+        self.stream.count_skipped_rows = self._configured_count_skipped_rows()
+
+    def _configured_count_skipped_rows(self):
+        return not config.env_config.skip_blacklisted_row_decoding
 
     def _add_tz_info_to_tz_naive_timestamp(self, timestamp):
         if timestamp.tzinfo is None:
@@ -191,12 +228,20 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
         # Change the timezone of timestamp to PST(local timezone in SF)
         now = datetime.datetime.now(tzutc())
         delay_seconds = (now - timestamp).total_seconds()
+        self.delay_seconds = delay_seconds
+        backlog_gauges = self.backlog_sampler.gauges() if self.backlog_sampler else {}
         log.info(
-            "Processing timestamp is {timestamp}, delay is {delay_seconds} seconds, log position is {log_file}: {log_pos}".format(
+            "Processing timestamp is {timestamp}, delay is {delay_seconds} seconds, log position is {log_file}: {log_pos}, "
+            "skipped {skipped_row_events} blacklisted row events ({skipped_bytes} bytes), "
+            "backlog is {backlog_bytes} bytes, catch up eta is {catch_up_eta_seconds} seconds".format(
                 timestamp=timestamp.replace(tzinfo=pytz.timezone('US/Pacific')),
                 log_file=log_file,
                 log_pos=log_pos,
                 delay_seconds=delay_seconds,
+                skipped_row_events=self.stream.skipped_row_events,
+                skipped_bytes=self.stream.skipped_bytes,
+                backlog_bytes=backlog_gauges.get('backlog_bytes'),
+                catch_up_eta_seconds=backlog_gauges.get('catch_up_eta_seconds'),
             )
         )
 
@@ -207,6 +252,13 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
             while self._is_position_update(self.stream.peek()):
                 self._update_upstream_position(self.stream.pop())
             event = self.stream.pop()
+            if isinstance(event, SkippedRows):
+                self._offset += event.row_count
+                return
+            if self.stamp_read_at and isinstance(event, DataEvent):
+                event.read_at = time.time()
+            if self.backlog_sampler:
+                self.backlog_sampler.periodic_process(self.stream.log_file, self.stream.log_pos)
             replication_handler_event = ReplicationHandlerEvent(
                 position=self._build_position(),
                 event=event
@@ -219,13 +271,15 @@ class SimpleBinlogStreamReaderWrapper(BaseBinlogStreamReaderWrapper):
         if self.gtid_enabled:
             return GtidPosition(
                 gtid=self._upstream_position.gtid,
-                offset=self._offset
+                offset=self._offset,
+                counts_skipped_rows=self.stream.count_skipped_rows
             )
         else:
             return LogPosition(
                 log_pos=self._upstream_position.log_pos,
                 log_file=self._upstream_position.log_file,
                 offset=self._offset,
+                counts_skipped_rows=self.stream.count_skipped_rows,
                 hb_serial=self._upstream_position.hb_serial,
                 hb_timestamp=self._upstream_position.hb_timestamp,
             )
@@ -25,15 +25,22 @@ from sqlparse.sql import Comment
 from sqlparse.sql import Identifier
 from sqlparse.sql import Token as TK
 
+from replication_handler.components.mysql_lexer import LexedStatement
+from replication_handler.components.mysql_lexer import LexerToken
+from replication_handler.config import env_config
+
 
 log = logging.getLogger('replication_handler.components.sql_handler')
 
 
 def mysql_statement_factory(query):
     log.info("Parsing incoming query: {}".format(query))
-    parsed_query = sqlparse.parse(query, dialect='mysql')
-    assert len(parsed_query) == 1
-    statement = parsed_query[0]
+    if env_config.snapshot.ddl_lexer_enabled:
+        statement = LexedStatement(query)
+    else:
+        parsed_query = sqlparse.parse(query, dialect='mysql')
+        assert len(parsed_query) == 1
+        statement = parsed_query[0]
 
     # The order here matters - the first match will be returned.
     # UnsupportedStatement is intentionally at the end, as a catch-all.
@@ -91,6 +98,12 @@ class MysqlStatement(object):
         return True
 
 
+def is_keyword(token, value):
+    if isinstance(token, LexerToken):
+        return token.is_keyword(value)
+    return token.match(Token.Keyword, value)
+
+
 class TokenMatcher(object):
     def __init__(self, tokens):
         self.tokens = tokens
@@ -343,7 +356,6 @@ class CreateTableStatement(TableStatementBase):
             ) and
             self.token_matcher.has_next()
         ):
-            self.database_name = None
             if self.token_matcher.has_matches(Compound([Any(), '.', Any()])):
                 db = self.token_matcher.pop().value
                 self.token_matcher.pop()
@@ -351,11 +363,13 @@ class CreateTableStatement(TableStatementBase):
                     db,
                     identifier_qualified=False
                 ).parse()
-
-            self.table = MysqlQualifiedIdentifierParser(
-                self.token_matcher.pop().value,
-                identifier_qualified=False
-            ).parse()
+                self.table = MysqlQualifiedIdentifierParser(
+                    self.token_matcher.pop().value,
+                    identifier_qualified=False
+                ).parse()
+            else:
+                # The lexer keeps a qualified table name in a single token.
+                self.set_db_and_table_name()
         else:
             raise IncompatibleStatementError()
 
@@ -377,7 +391,7 @@ class AlterTableStatement(TableStatementBase):
 
     def does_rename_table(self):
         return any(
-            token.match(Token.Keyword, 'rename')
+            is_keyword(token, 'rename')
             for token in self.token_matcher.get_remaining_tokens()
         )
 
@@ -427,7 +441,27 @@ class DropDatabaseStatement(DatabaseStatementBase):
 
 
 class IndexStatementBase(MysqlStatement):
-    pass
+    def __init__(self, statement):
+        super(IndexStatementBase, self).__init__(statement)
+        self.database_name, self.table = self._get_db_and_table_name()
+
+    def _get_db_and_table_name(self):
+        """Returns the database and table names after ON, or None for both
+        when they cannot be parsed.
+        """
+        while self.token_matcher.has_next():
+            if self.token_matcher.matches('on'):
+                if not self.token_matcher.has_next():
+                    break
+                # SQLParse can group the table name with the column list.
+                token_value = self.token_matcher.pop().value.split('(')[0]
+                try:
+                    return TableStatementBase.extract_db_and_table_name(token_value)
+                except (ParseError, UnparseableTableNameError):
+                    break
+            else:
+                self.token_matcher.pop()
+        return None, None
 
 
 class CreateIndexStatement(IndexStatementBase):
@@ -454,6 +488,24 @@ class RenameTableStatement(MysqlStatement):
         'table'
     ]
 
+    def get_renamed_tables(self):
+        """Returns the renames as (old, new) pairs of (database_name, table)
+        tuples, in the order they are applied, with a None database name for
+        unqualified table names.
+        """
+        query = re.sub(r'/\*.*?\*/', ' ', unicode(self.statement), flags=re.S)
+        query = re.sub(r'^\s*rename\s+table\s+', '', query, flags=re.I)
+        renamed_tables = []
+        for rename in query.strip().rstrip(';').split(','):
+            names = re.split(r'\s+to\s+', rename.strip(), flags=re.I)
+            if len(names) != 2:
+                raise UnparseableTableNameError()
+            renamed_tables.append(tuple(
+                TableStatementBase.extract_db_and_table_name(name)
+                for name in names
+            ))
+        return renamed_tables
+
 
 class UnsupportedStatement(MysqlStatement):
     matchers = []
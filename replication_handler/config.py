@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import logging
 import os
+from collections import namedtuple
 
 import staticconf
 from cached_property import cached_property_with_ttl
@@ -29,6 +30,36 @@ from replication_handler.servlib.config_util import load_default_config
 log = logging.getLogger('replication_handler.config')
 
 
+class ConfigSnapshot(namedtuple('ConfigSnapshot', (
+    'schema_blacklist',
+    'table_whitelist',
+    'ddl_lexer_enabled',
+))):
+    """Immutable copy of the settings read on the hot path. Reading a
+    staticconf value goes through a ValueProxy lookup each time, so per row
+    code should read from EnvConfig.snapshot instead.
+
+    Args:
+      schema_blacklist(frozenset): names of the blacklisted schemas.
+      table_whitelist(frozenset or None): names of the whitelisted tables,
+        None when every table is replicated.
+      ddl_lexer_enabled(bool): whether DDL is parsed with the lexer.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_env_config(cls, env_config):
+        table_whitelist = env_config.table_whitelist
+        return cls(
+            schema_blacklist=frozenset(env_config.schema_blacklist or []),
+            table_whitelist=frozenset(table_whitelist) if table_whitelist else None,
+            ddl_lexer_enabled=env_config.ddl_lexer_enabled,
+        )
+
+    def is_table_whitelisted(self, table_name):
+        return self.table_whitelist is None or table_name in self.table_whitelist
+
+
 class BaseConfig(object):
     """Staticconf base object for managing config
     TODO: (cheng|DATAPIPE-88) Removed the config reloading code, will work on that later.
@@ -47,6 +78,24 @@ class EnvConfig(BaseConfig):
     """When we do staticconf.get(), we will get a ValueProxy object, sometimes it is
     not accepted, so by calling value on that we will get its original value."""
 
+    _snapshot = None
+
+    @property
+    def snapshot(self):
+        """The current ConfigSnapshot, built on first use."""
+        if self._snapshot is None:
+            self.reload_snapshot()
+        return self._snapshot
+
+    def reload_snapshot(self):
+        """Builds a new ConfigSnapshot from the loaded configuration and swaps
+        it in. Has to be called whenever the configuration is reloaded.  The
+        swap is a single attribute assignment, so readers always see either
+        the old or the new snapshot as a whole.
+        """
+        self._snapshot = ConfigSnapshot.from_env_config(self)
+        return self._snapshot
+
     @property
     def container_name(self):
         return os.environ.get(
@@ -229,5 +278,434 @@ class EnvConfig(BaseConfig):
         """
         return staticconf.get_bool('gtid_enabled', default=False).value
 
+    @property
+    def continuous_profiling_enabled(self):
+        """When set, a low rate vmprof profiler keeps running in the background
+        and rotates its output into timestamped files, instead of relying on
+        SIGUSR2 to toggle profiling by hand.
+        """
+        return staticconf.get_bool(
+            'continuous_profiling_enabled',
+            default=False
+        ).value
+
+    @property
+    def profiler_directory(self):
+        return staticconf.get('profiler_directory', default='profiles').value
+
+    @property
+    def profiler_sampling_period_seconds(self):
+        """Interval between two profiler samples. vmprof defaults to roughly
+        1ms, which is too expensive to leave on all the time.
+        """
+        return staticconf.get_float(
+            'profiler_sampling_period_seconds',
+            default=0.01
+        ).value
+
+    @property
+    def profiler_rotation_interval_seconds(self):
+        return staticconf.get_int(
+            'profiler_rotation_interval_seconds',
+            default=300
+        ).value
+
+    @property
+    def profiler_max_files(self):
+        """Number of rotated profile files to retain, oldest are removed first.
+        """
+        return staticconf.get_int('profiler_max_files', default=12).value
+
+    @property
+    def profiler_delay_threshold_seconds(self):
+        """If given, continuous profiling only samples while the replication
+        delay is above this many seconds, so the retained profiles cover the
+        periods where we fall behind.  The delay is taken from heartbeats, or
+        from the timestamps of GTID events with gtid_enabled, which only have
+        a precision of a second.
+        """
+        return staticconf.get_float(
+            'profiler_delay_threshold_seconds',
+            default=None
+        ).value
+
+    @property
+    def async_schema_resolution(self):
+        """When set, schemas of tables missing from the schema cache are
+        resolved in the background, and rows of those tables are held back
+        while rows of other tables keep being published.  No checkpoint is
+        saved while rows are held back.  Once held back rows are published
+        after rows further in the binlog, the producer is flushed and the
+        position of the newest published row is saved, so recovery does not
+        publish the rows in between again.
+        """
+        return staticconf.get_bool(
+            'async_schema_resolution',
+            default=False
+        ).value
+
+    @property
+    def schema_resolution_workers(self):
+        return staticconf.get_int('schema_resolution_workers', default=2).value
+
+    @property
+    def schema_resolution_max_deferred_rows(self):
+        """Number of rows that can be held back waiting for schemas before the
+        stream blocks on the oldest pending schema.
+        """
+        return staticconf.get_int(
+            'schema_resolution_max_deferred_rows',
+            default=1000
+        ).value
+
+    @property
+    def schema_resolution_max_wait_seconds(self):
+        """How long a row can be held back waiting for its schema before the
+        stream blocks on it.
+        """
+        return staticconf.get_float(
+            'schema_resolution_max_wait_seconds',
+            default=5.0
+        ).value
+
+    @property
+    def schema_catalog_enabled(self):
+        """When set, table definitions are kept in memory after they are read
+        from the schema tracker database, see SchemaCatalog.  Schema changes
+        are still executed on the schema tracker database and read back from
+        it, only the repeated reads between them are served from memory.
+        """
+        return staticconf.get_bool('schema_catalog_enabled', default=False).value
+
+    @property
+    def schema_catalog_verify_interval_seconds(self):
+        return staticconf.get_int(
+            'schema_catalog_verify_interval_seconds',
+            default=3600
+        ).value
+
+    @property
+    def ddl_lexer_enabled(self):
+        """When set, query events are classified with the hand written lexer
+        in mysql_lexer instead of sqlparse.
+        """
+        return staticconf.get_bool('ddl_lexer_enabled', default=False).value
+
+    @property
+    def publish_workers(self):
+        """Number of threads that look up schemas and build messages, each
+        owning the tables hashed onto it.  Messages are still published in
+        binlog order.  0 builds messages on the main thread.  When set, it
+        takes precedence over async_schema_resolution, since schema lookups
+        already happen off the main thread.
+        """
+        return staticconf.get_int('publish_workers', default=0).value
+
+    @property
+    def publish_max_in_flight_rows(self):
+        """Number of rows handed to the publish workers but not published yet
+        above which the stream waits for the oldest one.
+        """
+        return staticconf.get_int('publish_max_in_flight_rows', default=5000).value
+
+    @property
+    def max_in_flight_bytes(self):
+        """Estimated bytes of rows between the binlog reader and Kafka above
+        which reading from the binlog pauses until the producer catches up,
+        see InFlightMemory.  0 turns the accounting off.
+        """
+        return staticconf.get_int('max_in_flight_bytes', default=0).value
+
+    @property
+    def column_projection(self):
+        """Columns to replicate per table, as a mapping from
+        "database.table" to either {'include': [columns]} or
+        {'exclude': [columns]}, see ColumnProjection.  Tables that are not
+        listed replicate every column.
+        """
+        return staticconf.get('column_projection', default={}).value
+
+    @property
+    def noise_columns(self):
+        """Columns per table whose changes alone are not worth publishing, as
+        a mapping from "database.table" to a list of columns.  Updates that
+        change no other column are dropped.
+        """
+        return staticconf.get('noise_columns', default={}).value
+
+    @property
+    def changelog_coalesce_window_seconds(self):
+        """In changelog_mode, changes to the same row id within this many
+        seconds are published as a single changelog message.  0 publishes
+        every change.
+        """
+        return staticconf.get_float(
+            'changelog_coalesce_window_seconds',
+            default=0.0
+        ).value
+
+    @property
+    def changelog_coalesce_max_rows(self):
+        """Number of distinct row ids after which the coalescing window is
+        published early.
+        """
+        return staticconf.get_int(
+            'changelog_coalesce_max_rows',
+            default=10000
+        ).value
+
+    @property
+    def catch_up_enter_delay_seconds(self):
+        """Replication delay at or above which the replication handler
+        switches to catch up mode, see CatchUpMode.  None turns catch up mode
+        off.  The delay is taken from heartbeats, or from the timestamps of
+        GTID events with gtid_enabled.  Catch up mode only reduces per event
+        logging and saves position checkpoints less often, publishing is
+        unchanged, as the data_pipeline producer's buffer size and flush
+        interval are fixed once it is constructed.
+        """
+        return staticconf.get(
+            'catch_up_enter_delay_seconds',
+            default=None
+        ).value
+
+    @property
+    def catch_up_exit_delay_seconds(self):
+        """Replication delay below which catch up mode is left again."""
+        return staticconf.get_int(
+            'catch_up_exit_delay_seconds',
+            default=60
+        ).value
+
+    @property
+    def catch_up_checkpoint_interval_seconds(self):
+        """Minimum time between two position checkpoints in catch up mode.
+        """
+        return staticconf.get_int(
+            'catch_up_checkpoint_interval_seconds',
+            default=30
+        ).value
+
+    @property
+    def skip_ddl_for_unwhitelisted_tables(self):
+        """When True and table_whitelist is set, table statements on tables
+        that are neither whitelisted nor the refresh table of a whitelisted
+        table are skipped, including their execution on the schema tracker.
+        Rows of those tables are never decoded, so the tracker doesn't need
+        their schema, but it goes stale for them: a table that is whitelisted
+        later has to be recreated on the tracker first.
+        """
+        return staticconf.get_bool(
+            'skip_ddl_for_unwhitelisted_tables',
+            default=False
+        ).value
+
+    @property
+    def schema_restore_workers(self):
+        """Number of databases of the schema dump restored concurrently when
+        recovering the schema tracker.  1 restores the whole dump through a
+        single mysql client.
+        """
+        return staticconf.get_int('schema_restore_workers', default=1).value
+
+    @property
+    def batch_schema_event_checkpoints(self):
+        """When True, a run of schema events with no data events in between,
+        such as a migration, saves its schema dump and checkpoint once at the
+        end of the run instead of after every schema event.
+        """
+        return staticconf.get_bool(
+            'batch_schema_event_checkpoints',
+            default=False
+        ).value
+
+    @property
+    def schema_event_checkpoint_max_batch_size(self):
+        """Number of schema events after which the checkpoint of a run is
+        saved even though the run goes on, bounding what a restart replays.
+        """
+        return staticconf.get_int(
+            'schema_event_checkpoint_max_batch_size',
+            default=100
+        ).value
+
+    @property
+    def ddl_flush_in_flight_tables_only(self):
+        """When True, schema changes only flush the producer when they touch a
+        table with messages that are not delivered yet.  Otherwise every
+        supported schema change flushes the producer.
+        """
+        return staticconf.get_bool(
+            'ddl_flush_in_flight_tables_only',
+            default=False
+        ).value
+
+    @property
+    def transaction_scoped_checkpoints(self):
+        """When True, positions are checkpointed at binlog transaction
+        boundaries, so a restart resumes with the transaction after the last
+        checkpointed one.  The producer is flushed at the end of a transaction
+        to take the checkpoint, at most every
+        transaction_checkpoint_interval_seconds.  With gtid_enabled the
+        checkpoint holds the gtid of the transaction without a row offset,
+        heartbeat positions keep their offset, as it counts from the last
+        heartbeat.  A transaction with more rows since the last checkpoint
+        than recovery_queue_size minus the producer buffer size is still
+        checkpointed in its middle, so recovery finds every row published
+        after the checkpoint.
+        """
+        return staticconf.get_bool(
+            'transaction_scoped_checkpoints',
+            default=False
+        ).value
+
+    @property
+    def transaction_checkpoint_interval_seconds(self):
+        """Minimum time between two transaction boundary checkpoints.  0
+        checkpoints at the end of every transaction with rows.
+        """
+        return staticconf.get_float(
+            'transaction_checkpoint_interval_seconds',
+            default=1.0
+        ).value
+
+    @property
+    def start_timestamp(self):
+        """Wall-clock time to start tailing from when there is no saved
+        position, either unix seconds or a date time string (UTC unless it
+        has a time zone).  The binlogs are searched for the first transaction
+        started at or after it.
+        """
+        return staticconf.get(
+            'start_timestamp',
+            default=None
+        ).value
+
+    @property
+    def binlog_backlog_sample_interval_seconds(self):
+        """Interval between two samples of the binlog bytes left to read,
+        from SHOW BINARY LOGS, for the backlog and catch up eta gauges.  0
+        turns sampling off.
+        """
+        return staticconf.get_float(
+            'binlog_backlog_sample_interval_seconds',
+            default=30
+        ).value
+
+    @property
+    def message_latency_tracing(self):
+        """When True, every published message is traced from its binlog event
+        to the producer reporting it as published, into per table latency
+        histograms that are logged at debug level.
+        """
+        return staticconf.get_bool(
+            'message_latency_tracing',
+            default=False
+        ).value
+
+    @property
+    def slow_message_latency_seconds(self):
+        """End to end latency above which a traced message is kept as a
+        slow message trace.
+        """
+        return staticconf.get_float(
+            'slow_message_latency_seconds',
+            default=10
+        ).value
+
+    @property
+    def max_slow_message_traces(self):
+        return staticconf.get_int(
+            'max_slow_message_traces',
+            default=20
+        ).value
+
+    @property
+    def table_heavy_hitters_capacity(self):
+        """Number of (database, table, message type) keys counted to find the
+        tables with the most published rows, bytes and time, which bounds
+        the memory used.  Tables whose share of the total is above 1 /
+        capacity are always found.  0 turns the tracking off.
+        """
+        return staticconf.get_int(
+            'table_heavy_hitters_capacity',
+            default=0
+        ).value
+
+    @property
+    def table_heavy_hitters_top_n(self):
+        return staticconf.get_int(
+            'table_heavy_hitters_top_n',
+            default=10
+        ).value
+
+    @property
+    def table_heavy_hitters_log_interval_seconds(self):
+        return staticconf.get_float(
+            'table_heavy_hitters_log_interval_seconds',
+            default=60
+        ).value
+
+    @property
+    def heap_snapshot_file(self):
+        """File heap snapshots are written to, on SIGUSR1 or every
+        heap_snapshot_interval_seconds.
+        """
+        return staticconf.get(
+            'heap_snapshot_file',
+            default='repl_heap_snapshot.log'
+        ).value
+
+    @property
+    def heap_snapshot_max_bytes(self):
+        return staticconf.get_int(
+            'heap_snapshot_max_bytes',
+            default=10 * 1024 * 1024
+        ).value
+
+    @property
+    def heap_snapshot_backup_count(self):
+        return staticconf.get_int(
+            'heap_snapshot_backup_count',
+            default=5
+        ).value
+
+    @property
+    def heap_snapshot_top_n(self):
+        return staticconf.get_int(
+            'heap_snapshot_top_n',
+            default=25
+        ).value
+
+    @property
+    def heap_snapshot_interval_seconds(self):
+        """Time between two periodic heap snapshots.  0 only writes them on
+        SIGUSR1.
+        """
+        return staticconf.get_float(
+            'heap_snapshot_interval_seconds',
+            default=0
+        ).value
+
+    @property
+    def heap_snapshot_trace_allocations(self):
+        """When True, allocations are traced with tracemalloc, where it is
+        available, to write the top allocation sites in heap snapshots.
+        """
+        return staticconf.get_bool(
+            'heap_snapshot_trace_allocations',
+            default=False
+        ).value
+
+    @property
+    def skip_blacklisted_row_decoding(self):
+        """Drops row events of blacklisted schemas without decoding their rows,
+        so their rows do not count towards position offsets.  When False, their
+        rows are decoded to be counted, the way offsets were counted when they
+        were handed out as data events.  Checkpoints saved before switching
+        are replayed the way they were counted.
+        """
+        return staticconf.get_bool('skip_blacklisted_row_decoding', default=True).value
+
 
 env_config = EnvConfig()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+import time
+from collections import OrderedDict
+
+
+log = logging.getLogger('replication_handler.util.binlog_backlog')
+
+# Weight of the latest sample in the smoothed rates.
+RATE_SMOOTHING = 0.5
+
+
+def bytes_between(start, end, log_file_sizes):
+    """Returns the binlog bytes from the (log_file, log_pos) start to end, or
+    None when start is not in log_file_sizes anymore.
+    """
+    start_file, start_pos = start
+    end_file, end_pos = end
+    if start_file == end_file:
+        return end_pos - start_pos
+    total = None
+    for log_file, size in log_file_sizes.iteritems():
+        if log_file == start_file:
+            total = size - start_pos
+        elif total is not None and log_file == end_file:
+            return total + end_pos
+        elif total is not None:
+            total += size
+    return None
+
+
+class BinlogBacklogSampler(object):
+    """ This class periodically compares the position the binlog reader is at
+    with the binlog sizes reported by SHOW BINARY LOGS, for the bytes left to
+    read, the rate they are read at and the time left to catch up.
+
+    The time left to catch up is the backlog over the rate it shrinks at,
+    that is the read rate minus the rate the source writes binlogs at, and is
+    None while the backlog is not shrinking.
+
+    Args:
+      db_connections(BaseConnection object): a wrapper for communication with mysql db.
+      sample_interval_seconds(float): minimum time between two samples.
+    """
+
+    def __init__(self, db_connections, sample_interval_seconds):
+        self.db_connections = db_connections
+        self.sample_interval_seconds = sample_interval_seconds
+        self.backlog_bytes = None
+        self.read_bytes_per_second = None
+        self.write_bytes_per_second = None
+        self._last_sample = None
+        self._next_sample_at = 0
+
+    @property
+    def catch_up_eta_seconds(self):
+        if self.backlog_bytes is None or self.read_bytes_per_second is None:
+            return None
+        if self.backlog_bytes == 0:
+            return 0.0
+        shrink_bytes_per_second = self.read_bytes_per_second - self.write_bytes_per_second
+        if shrink_bytes_per_second <= 0:
+            return None
+        return self.backlog_bytes / shrink_bytes_per_second
+
+    def periodic_process(self, log_file, log_pos):
+        """Called for every event read, with the position of the reader."""
+        now = time.time()
+        if now < self._next_sample_at or log_file is None:
+            return
+        self._next_sample_at = now + self.sample_interval_seconds
+        try:
+            log_file_sizes = self._get_log_file_sizes()
+        except Exception:
+            log.exception("Failed to sample the binlog backlog")
+            return
+        self._sample(now, (log_file, log_pos), log_file_sizes)
+        log.info("Binlog backlog: {}".format(self.gauges()))
+
+    def gauges(self):
+        return {
+            'backlog_bytes': self.backlog_bytes,
+            'read_bytes_per_second': self.read_bytes_per_second,
+            'write_bytes_per_second': self.write_bytes_per_second,
+            'catch_up_eta_seconds': self.catch_up_eta_seconds,
+        }
+
+    def _get_log_file_sizes(self):
+        with self.db_connections.get_source_cursor() as cursor:
+            cursor.execute("SHOW BINARY LOGS")
+            return OrderedDict((row[0], row[1]) for row in cursor.fetchall())
+
+    def _sample(self, now, read_position, log_file_sizes):
+        last_log_file = next(reversed(log_file_sizes))
+        head_position = (last_log_file, log_file_sizes[last_log_file])
+        self.backlog_bytes = bytes_between(read_position, head_position, log_file_sizes)
+        if self._last_sample is not None:
+            last_time, last_read_position, last_head_position = self._last_sample
+            elapsed = float(now - last_time)
+            read_bytes = bytes_between(last_read_position, read_position, log_file_sizes)
+            written_bytes = bytes_between(last_head_position, head_position, log_file_sizes)
+            if elapsed > 0 and read_bytes is not None and written_bytes is not None:
+                self.read_bytes_per_second = self._smooth(
+                    self.read_bytes_per_second,
+                    read_bytes / elapsed
+                )
+                self.write_bytes_per_second = self._smooth(
+                    self.write_bytes_per_second,
+                    written_bytes / elapsed
+                )
+        self._last_sample = (now, read_position, head_position)
+
+    def _smooth(self, rate, sampled_rate):
+        if rate is None:
+            return sampled_rate
+        return RATE_SMOOTHING * sampled_rate + (1 - RATE_SMOOTHING) * rate
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+import time
+
+
+log = logging.getLogger('replication_handler.util.catch_up_mode')
+
+# Loggers writing a line per query event, per heartbeat or per skipped row
+# event.  They are raised to WARNING while catching up.
+PER_EVENT_LOGGERS = (
+    'replication_handler.component.base_event_handler',
+    'replication_handler.components.simple_binlog_stream_reader_wrapper',
+    'replication_handler.components.sql_handler',
+)
+
+# While catching up, the progress the per event loggers no longer report is
+# logged here instead, at most this often.
+PROGRESS_LOG_INTERVAL_SECONDS = 60
+
+
+class CatchUpMode(object):
+    """ This class decides whether the replication handler is catching up,
+    based on the replication delay.  Catch up mode turns on once the delay
+    reaches enter_delay_seconds, and only turns off again once the delay
+    drops below exit_delay_seconds, so a delay hovering around a single
+    threshold doesn't flip it back and forth.
+
+    Per event logging is reduced while catching up, and callers save position
+    checkpoints less often while it is on.  The levels the per event loggers
+    had on entering are restored on exit.
+
+    Args:
+      enter_delay_seconds(int): delay at or above which catch up mode turns on.
+      exit_delay_seconds(int): delay below which catch up mode turns off.
+    """
+
+    def __init__(self, enter_delay_seconds, exit_delay_seconds):
+        if exit_delay_seconds > enter_delay_seconds:
+            raise ValueError(
+                "catch up exit delay {} is above the enter delay {}".format(
+                    exit_delay_seconds,
+                    enter_delay_seconds
+                )
+            )
+        self.enter_delay_seconds = enter_delay_seconds
+        self.exit_delay_seconds = exit_delay_seconds
+        self.active = False
+        self.enter_count = 0
+        self.exit_count = 0
+        self._entered_at = None
+        self._next_progress_log_at = 0
+        self._saved_logger_levels = {}
+
+    def update(self, delay_seconds):
+        """Called with the latest replication delay, which is None while it
+        is not known.  Returns True when catch up mode was switched on or off.
+        """
+        if delay_seconds is None:
+            return False
+        if not self.active and delay_seconds >= self.enter_delay_seconds:
+            self._enter(delay_seconds)
+            return True
+        if self.active and delay_seconds < self.exit_delay_seconds:
+            self._exit(delay_seconds)
+            return True
+        if self.active:
+            self._log_progress(delay_seconds)
+        return False
+
+    def _enter(self, delay_seconds):
+        self.active = True
+        self.enter_count += 1
+        self._entered_at = time.time()
+        self._next_progress_log_at = self._entered_at + PROGRESS_LOG_INTERVAL_SECONDS
+        log.info(
+            "Replication delay is {delay} seconds, entering catch up mode "
+            "(entered {count} times)".format(
+                delay=delay_seconds,
+                count=self.enter_count
+            )
+        )
+        for logger_name in PER_EVENT_LOGGERS:
+            logger = logging.getLogger(logger_name)
+            self._saved_logger_levels[logger_name] = logger.level
+            logger.setLevel(logging.WARNING)
+
+    def _exit(self, delay_seconds):
+        self.active = False
+        self.exit_count += 1
+        for logger_name, level in self._saved_logger_levels.iteritems():
+            logging.getLogger(logger_name).setLevel(level)
+        self._saved_logger_levels = {}
+        log.info(
+            "Replication delay is {delay} seconds, leaving catch up mode after "
+            "{duration:.0f} seconds (left {count} times)".format(
+                delay=delay_seconds,
+                duration=time.time() - self._entered_at,
+                count=self.exit_count
+            )
+        )
+        self._entered_at = None
+
+    def _log_progress(self, delay_seconds):
+        now = time.time()
+        if now < self._next_progress_log_at:
+            return
+        self._next_progress_log_at = now + PROGRESS_LOG_INTERVAL_SECONDS
+        log.info("Catching up, replication delay is {} seconds".format(
+            delay_seconds
+        ))
@@ -35,16 +35,25 @@ class ChangeLogMessageBuilder(MessageBuilder):
       transaction_id_schema_id(int): schema id for transaction id meta attribute.
       position(Position object): contains position information for this event in binlog.
       resgiter_dry_run(boolean): whether a schema has to be registered for a message to be published.
+      transaction_id_cache(TransactionIdCache object, optional): memoizes the transaction id and
+      position dict shared by the rows of a transaction.
     """
 
     def __init__(
-        self, schema_info, event, transaction_id_schema_id, position, register_dry_run=True
+        self,
+        schema_info,
+        event,
+        transaction_id_schema_id,
+        position,
+        register_dry_run=True,
+        transaction_id_cache=None
     ):
         self.schema_info = schema_info
         self.event = event
         self.transaction_id_schema_id = transaction_id_schema_id
         self.position = position
         self.register_dry_run = register_dry_run
+        self.transaction_id_cache = transaction_id_cache
 
     def _create_payload(self, data):
         payload_data = {"table_schema": self.event.schema,
@@ -55,7 +64,7 @@ class ChangeLogMessageBuilder(MessageBuilder):
 
     def build_message(self, source_cluster_name):
         upstream_position_info = {
-            "position": self.position.to_dict(),
+            "position": self._get_position_dict(source_cluster_name),
             "cluster_name": source_cluster_name,
             "database_name": self.event.schema,
             "table_name": self.event.table,
@@ -66,10 +75,7 @@ class ChangeLogMessageBuilder(MessageBuilder):
             "upstream_position_info": upstream_position_info,
             "dry_run": self.register_dry_run,
             "timestamp": self.event.timestamp,
-            "meta": [self.position.get_transaction_id(
-                self.transaction_id_schema_id,
-                source_cluster_name
-            )],
+            "meta": [self._get_transaction_id(source_cluster_name)],
         }
 
         if self.event.message_type == UpdateMessage:
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+import logging
+import os
+import time
+
+import vmprof
+
+from replication_handler.util.misc import delete_file_if_exists
+
+
+log = logging.getLogger('replication_handler.util.continuous_profiler')
+
+PROFILE_FILE_PREFIX = 'repl-'
+
+PROFILE_FILE_SUFFIX = '.vmprof'
+
+# Deciding whether to start, stop or rotate only needs to happen about once a
+# second, so the per event cost of periodic_process stays a clock read.
+CHECK_INTERVAL_SECONDS = 1
+
+
+class ContinuousProfiler(object):
+    """ This class keeps vmprof sampling at a low rate, and rotates the output
+    into timestamped files in profile_dir, retaining only the newest max_files.
+
+    Args:
+      profile_dir(str): directory the profile files are written to.
+      sampling_period_seconds(float): interval between two vmprof samples.
+      rotation_interval_seconds(int): time span covered by one profile file.
+      max_files(int): number of profile files to retain.
+      delay_threshold_seconds(int, optional): replication delay above which
+        the profiler is turned on. When None, the profiler always runs.
+    """
+
+    def __init__(
+        self,
+        profile_dir,
+        sampling_period_seconds,
+        rotation_interval_seconds,
+        max_files,
+        delay_threshold_seconds=None
+    ):
+        self.profile_dir = profile_dir
+        self.sampling_period_seconds = sampling_period_seconds
+        self.rotation_interval_seconds = rotation_interval_seconds
+        self.max_files = max_files
+        self.delay_threshold_seconds = delay_threshold_seconds
+        self._fd = None
+        self._file_name = None
+        self._file_started_at = None
+        self._next_check_at = 0
+
+    @property
+    def running(self):
+        return self._fd is not None
+
+    def periodic_process(self, delay_seconds=None):
+        """Called for every processed event. Starts, stops or rotates the
+        profiler depending on the current replication delay and the age of
+        the current profile file.
+        """
+        now = time.time()
+        if now < self._next_check_at:
+            return
+        self._next_check_at = now + CHECK_INTERVAL_SECONDS
+
+        should_run = self._should_profile(delay_seconds)
+        if self.running and not should_run:
+            log.info("Replication delay is {} seconds, stopping profiler".format(
+                delay_seconds
+            ))
+            self.stop()
+        elif should_run and not self.running:
+            log.info("Replication delay is {} seconds, starting profiler".format(
+                delay_seconds
+            ))
+            self.start()
+        elif self.running and now - self._file_started_at >= self.rotation_interval_seconds:
+            self.rotate()
+
+    def start(self):
+        if self.running:
+            return
+        if not os.path.isdir(self.profile_dir):
+            os.makedirs(self.profile_dir)
+        self._file_started_at = time.time()
+        self._file_name = os.path.join(
+            self.profile_dir,
+            self._build_file_name(self._file_started_at)
+        )
+        self._fd = os.open(
+            self._file_name,
+            os.O_RDWR | os.O_CREAT | os.O_TRUNC
+        )
+        vmprof.enable(self._fd, period=self.sampling_period_seconds)
+        log.info("Continuous profiler writing to {}".format(self._file_name))
+        self._remove_expired_files()
+
+    def stop(self):
+        if not self.running:
+            return
+        vmprof.disable()
+        os.close(self._fd)
+        log.info("Continuous profiler wrote to {}".format(self._file_name))
+        self._fd = None
+        self._file_name = None
+        self._file_started_at = None
+
+    def rotate(self):
+        if self.running:
+            self.stop()
+            self.start()
+
+    def _should_profile(self, delay_seconds):
+        if self.delay_threshold_seconds is None:
+            return True
+        return (
+            delay_seconds is not None and
+            delay_seconds >= self.delay_threshold_seconds
+        )
+
+    def _build_file_name(self, timestamp):
+        return "{prefix}{timestamp}{suffix}".format(
+            prefix=PROFILE_FILE_PREFIX,
+            timestamp=datetime.datetime.utcfromtimestamp(
+                timestamp
+            ).strftime('%Y%m%dT%H%M%S.%f'),
+            suffix=PROFILE_FILE_SUFFIX
+        )
+
+    def _remove_expired_files(self):
+        # The timestamp format sorts lexicographically, so the oldest files
+        # come first.
+        profile_files = sorted(
+            file_name for file_name in os.listdir(self.profile_dir)
+            if file_name.startswith(PROFILE_FILE_PREFIX) and
+            file_name.endswith(PROFILE_FILE_SUFFIX)
+        )
+        for file_name in profile_files[:-self.max_files]:
+            log.info("Removing expired profile {}".format(file_name))
+            delete_file_if_exists(os.path.join(self.profile_dir, file_name))
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import gc
+import logging
+import resource
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+try:
+    # Only available on interpreters with the pytracemalloc patch.
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+log = logging.getLogger('replication_handler.util.heap_snapshot')
+
+# Number of frames kept per allocation traceback.
+TRACEMALLOC_FRAMES = 5
+
+
+def get_rss_bytes():
+    """Returns the current resident set size, or None where /proc is not
+    available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        return None
+
+
+class HeapSnapshot(object):
+    """ This class writes summaries of the heap to a rotating file: the
+    resident set size, the object counts by type, the sizes of the caches
+    passed in, and the top allocation sites when allocations are traced.
+
+    Object counts only cover the objects tracked by the garbage collector,
+    which are the containers and instances holding the strings and numbers.
+    Allocations can only be traced where the tracemalloc module is available.
+
+    Args:
+      file_path(str): path of the file the summaries are written to.
+      max_bytes(int): size of the file above which it is rotated.
+      backup_count(int): number of rotated files to retain.
+      top_n(int): number of types and allocation sites written.
+      interval_seconds(float): time between two periodic summaries, 0 only
+        writes them on demand.
+      trace_allocations(bool): trace allocations to write the top sites.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        max_bytes,
+        backup_count,
+        top_n,
+        interval_seconds=0,
+        trace_allocations=False
+    ):
+        self.top_n = top_n
+        self.interval_seconds = interval_seconds
+        self._handler = RotatingFileHandler(
+            file_path,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            delay=True
+        )
+        self._next_snapshot_at = time.time() + interval_seconds
+        self.trace_allocations = trace_allocations and tracemalloc is not None
+        if trace_allocations and not self.trace_allocations:
+            log.warning("tracemalloc is not available, allocations are not traced")
+        if self.trace_allocations:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def periodic_process(self, get_cache_sizes):
+        """Called for every processed event, get_cache_sizes is only called
+        when a summary is due."""
+        if not self.interval_seconds:
+            return
+        now = time.time()
+        if now < self._next_snapshot_at:
+            return
+        self._next_snapshot_at = now + self.interval_seconds
+        self.write(get_cache_sizes())
+
+    def write(self, cache_sizes):
+        started_at = time.time()
+        lines = [
+            "Heap snapshot at {}".format(time.strftime('%Y-%m-%dT%H:%M:%S')),
+            "rss_bytes: {}".format(get_rss_bytes()),
+            "max_rss_kb: {}".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+            "Cache sizes:",
+        ]
+        lines.extend(
+            "  {}: {}".format(name, size)
+            for name, size in sorted(cache_sizes.iteritems())
+        )
+        lines.append("Objects by type:")
+        lines.extend(
+            "  {}: {}".format(type_name, count)
+            for type_name, count in self._get_object_counts()
+        )
+        if self.trace_allocations:
+            lines.append("Top allocation sites:")
+            lines.extend("  {}".format(stat) for stat in self._get_allocation_sites())
+        self._handler.emit(logging.makeLogRecord({'msg': '\n'.join(lines)}))
+        self._handler.flush()
+        log.info("Wrote heap snapshot to {} in {:.3f} seconds".format(
+            self._handler.baseFilename,
+            time.time() - started_at
+        ))
+
+    def stop(self):
+        if self.trace_allocations:
+            tracemalloc.stop()
+        self._handler.close()
+
+    def _get_object_counts(self):
+        return Counter(
+            type(obj).__name__ for obj in gc.get_objects()
+        ).most_common(self.top_n)
+
+    def _get_allocation_sites(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.statistics('lineno')[:self.top_n]
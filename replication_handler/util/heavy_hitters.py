@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import heapq
+import logging
+import time
+from collections import namedtuple
+
+
+log = logging.getLogger('replication_handler.util.heavy_hitters')
+
+HeavyHitter = namedtuple('HeavyHitter', ('key', 'count', 'error'))
+
+
+class SpaceSaving(object):
+    """ This class is a Space-Saving sketch, which finds the keys with the
+    largest total weight in a stream while keeping at most capacity counters.
+
+    A key that is not counted replaces the key with the smallest count, and
+    inherits that count as its error, so every reported count is at most
+    error above the real total of its key.  Any key whose total is above
+    the total weight over capacity is always counted.
+
+    The smallest count is found with a min heap holding one entry per key.
+    Entries are not updated when their count grows, but refreshed when they
+    reach the top of the heap, so every eviction takes amortized logarithmic
+    time.
+
+    Args:
+      capacity(int): maximum number of keys counted.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # key -> [count, error]
+        self._counters = {}
+        # (count, key) entries, with counts that can be behind the counters.
+        self._heap = []
+
+    def add(self, key, weight=1):
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self._counters) < self.capacity:
+            self._counters[key] = [weight, 0]
+            heapq.heappush(self._heap, (weight, key))
+        else:
+            min_count, min_key = self._get_min()
+            del self._counters[min_key]
+            self._counters[key] = [min_count + weight, min_count]
+            heapq.heapreplace(self._heap, (min_count + weight, key))
+
+    def _get_min(self):
+        """Returns the smallest (count, key), once it is at the top of the
+        heap."""
+        while True:
+            count, key = self._heap[0]
+            current_count = self._counters[key][0]
+            if count == current_count:
+                return count, key
+            heapq.heapreplace(self._heap, (current_count, key))
+
+    def top(self, n):
+        return [
+            HeavyHitter(key=key, count=count, error=error)
+            for key, (count, error) in sorted(
+                self._counters.iteritems(),
+                key=lambda item: item[1][0],
+                reverse=True
+            )[:n]
+        ]
+
+
+class TableHeavyHitters(object):
+    """ This class tracks the (database, table, message type) keys with the
+    most published rows, row bytes and seconds from being read to being
+    published, each with a SpaceSaving sketch, and logs the top_n of each
+    every log_interval_seconds.
+
+    Args:
+      capacity(int): maximum number of keys counted per sketch.
+      top_n(int): number of keys logged per sketch.
+      log_interval_seconds(float): time between two logs of the top keys.
+    """
+
+    def __init__(self, capacity, top_n, log_interval_seconds):
+        self.top_n = top_n
+        self.log_interval_seconds = log_interval_seconds
+        self.rows = SpaceSaving(capacity)
+        self.bytes = SpaceSaving(capacity)
+        self.seconds = SpaceSaving(capacity)
+        self._next_log_at = time.time() + log_interval_seconds
+
+    def record(self, event, published_at):
+        key = (event.schema, event.table, event.message_type.__name__)
+        self.rows.add(key)
+        self.bytes.add(key, event.row_size)
+        if event.read_at is not None:
+            self.seconds.add(key, published_at - event.read_at)
+        if published_at >= self._next_log_at:
+            self._next_log_at = published_at + self.log_interval_seconds
+            self.log_top()
+
+    def top(self):
+        return {
+            'rows': self.rows.top(self.top_n),
+            'bytes': self.bytes.top(self.top_n),
+            'seconds': self.seconds.top(self.top_n),
+        }
+
+    def log_top(self):
+        for name, heavy_hitters in sorted(self.top().iteritems()):
+            log.info("Top tables by {}: {}".format(
+                name,
+                ', '.join(
+                    "{}: {:g} (+/-{:g})".format(
+                        '.'.join(heavy_hitter.key),
+                        heavy_hitter.count,
+                        heavy_hitter.error
+                    )
+                    for heavy_hitter in heavy_hitters
+                )
+            ))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+
+log = logging.getLogger('replication_handler.util.in_flight_memory')
+
+# Size charged for values that are not strings, and on top of every value for
+# the dict entry and the boxed value.
+VALUE_OVERHEAD_BYTES = 8
+
+GAUGE_LOG_INTERVAL_SECONDS = 30
+
+
+def estimate_row_size(row):
+    """Estimates the bytes held by the values of a decoded row, which are
+    dominated by its string and blob columns.
+    """
+    size = 0
+    for key in ('values', 'before_values', 'after_values'):
+        values = row.get(key)
+        if not values:
+            continue
+        for value in values.itervalues():
+            size += VALUE_OVERHEAD_BYTES
+            if isinstance(value, (bytes, unicode)):
+                size += len(value)
+    return size
+
+
+class InFlightMemory(object):
+    """ This class accounts for the estimated bytes of the rows between the
+    binlog reader and Kafka: rows held back for their schema, rows handed to
+    the publish workers, and messages buffered by the producer.
+
+    Rows are added when the data event handler receives them, and released
+    once the published messages ledger reports them delivered, see
+    PublishedMessages.
+
+    Args:
+      max_bytes(int): number of in flight bytes above which the binlog reader
+        should pause.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_flight_bytes = 0
+        self.peak_in_flight_bytes = 0
+        # Bytes of the published messages the producer has not reported yet.
+        self.published_bytes = 0
+        self.pause_count = 0
+        self.paused_seconds = 0.0
+        self._lock = threading.Lock()
+        self._next_gauge_log_at = 0
+
+    @property
+    def is_over_limit(self):
+        return self.in_flight_bytes >= self.max_bytes
+
+    def add(self, size):
+        with self._lock:
+            self.in_flight_bytes += size
+            if self.in_flight_bytes > self.peak_in_flight_bytes:
+                self.peak_in_flight_bytes = self.in_flight_bytes
+
+    def remove(self, size):
+        """Removes rows that were received but will never be published."""
+        with self._lock:
+            self.in_flight_bytes -= size
+
+    def mark_published(self, event):
+        with self._lock:
+            self.published_bytes += event.row_size
+        return event.row_size
+
+    def mark_delivered(self, sizes):
+        size = sum(sizes)
+        with self._lock:
+            self.published_bytes -= size
+            self.in_flight_bytes -= size
+
+    def record_pause(self, paused_seconds):
+        self.pause_count += 1
+        self.paused_seconds += paused_seconds
+
+    def gauges(self):
+        return {
+            'in_flight_bytes': self.in_flight_bytes,
+            'peak_in_flight_bytes': self.peak_in_flight_bytes,
+            'producer_buffered_bytes': self.published_bytes,
+            'pause_count': self.pause_count,
+            'paused_seconds': self.paused_seconds,
+        }
+
+    def log_gauges_periodically(self):
+        now = time.time()
+        if now < self._next_gauge_log_at:
+            return
+        self._next_gauge_log_at = now + GAUGE_LOG_INTERVAL_SECONDS
+        log.info("In flight memory: {gauges}, limit {max_bytes} bytes".format(
+            gauges=self.gauges(),
+            max_bytes=self.max_bytes
+        ))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import Counter
+
+
+class InFlightTables(object):
+    """ This class tracks the tables of the messages handed to the producer
+    that it has not reported as delivered yet, so schema events only need to
+    flush the producer when they touch one of them.  Messages are marked
+    published and delivered by the published messages ledger, see
+    PublishedMessages.
+
+    published_count and delivered_count count the messages ever published and
+    delivered, and tell whether the messages published before some point are
+    all delivered.
+    """
+
+    def __init__(self):
+        self.published_count = 0
+        self.delivered_count = 0
+        self._table_counts = Counter()
+
+    def __contains__(self, table):
+        """table is a (database_name, table_name) tuple."""
+        return table in self._table_counts
+
+    def __nonzero__(self):
+        return self.published_count > self.delivered_count
+
+    def mark_published(self, event):
+        table = (event.schema, event.table)
+        self.published_count += 1
+        self._table_counts[table] += 1
+        return table
+
+    def mark_delivered(self, tables):
+        for table in tables:
+            self._table_counts[table] -= 1
+            if not self._table_counts[table]:
+                del self._table_counts[table]
+        self.delivered_count += len(tables)
@@ -37,20 +37,29 @@ class MessageBuilder(object):
       position(Position object): contains position information for this event in binlog.
       register_dry_run(boolean, optional): whether a schema has to be registered for a message to be published.
       Defaults to True.
+      transaction_id_cache(TransactionIdCache object, optional): memoizes the transaction id and
+      position dict shared by the rows of a transaction.
     """
 
     def __init__(
-        self, schema_info, event, transaction_id_schema_id, position, register_dry_run=True
+        self,
+        schema_info,
+        event,
+        transaction_id_schema_id,
+        position,
+        register_dry_run=True,
+        transaction_id_cache=None
     ):
         self.schema_info = schema_info
         self.event = event
         self.transaction_id_schema_id = transaction_id_schema_id
         self.position = position
         self.register_dry_run = register_dry_run
+        self.transaction_id_cache = transaction_id_cache
 
     def build_message(self, source_cluster_name):
         upstream_position_info = {
-            "position": self.position.to_dict(),
+            "position": self._get_position_dict(source_cluster_name),
             "cluster_name": source_cluster_name,
             "database_name": self.event.schema,
             "table_name": self.event.table,
@@ -64,10 +73,7 @@ class MessageBuilder(object):
             "upstream_position_info": upstream_position_info,
             "dry_run": self.register_dry_run,
             "timestamp": self.event.timestamp,
-            "meta": [self.position.get_transaction_id(
-                self.transaction_id_schema_id,
-                source_cluster_name
-            )],
+            "meta": [self._get_transaction_id(source_cluster_name)],
         }
 
         if self.event.message_type == UpdateMessage:
@@ -77,6 +83,25 @@ class MessageBuilder(object):
             message_params["previous_payload_data"] = previous_payload_data
         return self.event.message_type(**message_params)
 
+    def _get_position_dict(self, source_cluster_name):
+        if self.transaction_id_cache is None:
+            return self.position.to_dict()
+        return self.transaction_id_cache.get_position_dict(
+            self.position,
+            source_cluster_name
+        )
+
+    def _get_transaction_id(self, source_cluster_name):
+        if self.transaction_id_cache is None:
+            return self.position.get_transaction_id(
+                self.transaction_id_schema_id,
+                source_cluster_name
+            )
+        return self.transaction_id_cache.get_meta_attribute(
+            self.position,
+            source_cluster_name
+        )
+
     def _get_values(self, row):
         """Gets the new value of the row changed.  If add row occurs,
            row['values'] contains the data.
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections import deque
+from collections import namedtuple
+
+
+log = logging.getLogger('replication_handler.util.message_latency')
+
+# Upper bounds of the histogram buckets, the last bucket has no upper bound.
+LATENCY_BUCKETS_SECONDS = (0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+STATS_LOG_INTERVAL_SECONDS = 60
+
+MessageTrace = namedtuple(
+    'MessageTrace',
+    ('table', 'timestamp', 'read_at', 'published_at')
+)
+
+
+class LatencyHistogram(object):
+    """Counts latencies into LATENCY_BUCKETS_SECONDS."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_SECONDS) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds):
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_SECONDS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given fraction of
+        the latencies, or the max latency for the last bucket.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index == len(LATENCY_BUCKETS_SECONDS):
+                    return self.max_seconds
+                return LATENCY_BUCKETS_SECONDS[index]
+        return None
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total_seconds / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.max_seconds,
+        }
+
+
+class MessageLatency(object):
+    """ This class traces every published message from its binlog event to the
+    producer reporting it as published, and keeps per table histograms of the
+    time spent from the commit on the source to being read from the binlog,
+    from being read to being published, and from being published to being
+    acknowledged.  Messages are marked published and delivered by the
+    published messages ledger, see PublishedMessages.
+
+    Binlog event timestamps only have a precision of a second, and so do the
+    commit_to_read and end_to_end latencies.  The most recent messages slower
+    than slow_threshold_seconds end to end are kept in slow_traces.
+
+    Args:
+      slow_threshold_seconds(float): end to end latency above which a message
+        is traced.
+      max_slow_traces(int): number of slow message traces to retain.
+    """
+
+    def __init__(self, slow_threshold_seconds, max_slow_traces):
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.histograms = defaultdict(lambda: defaultdict(LatencyHistogram))
+        self.slow_traces = deque(maxlen=max_slow_traces)
+        self._lock = threading.Lock()
+        self._next_stats_log_at = 0
+
+    def mark_published(self, event):
+        return MessageTrace(
+            table=(event.schema, event.table),
+            timestamp=event.timestamp,
+            read_at=event.read_at,
+            published_at=time.time()
+        )
+
+    def mark_delivered(self, traces):
+        acked_at = time.time()
+        with self._lock:
+            for trace in traces:
+                self._record(trace, acked_at)
+
+    def stats(self):
+        with self._lock:
+            return {
+                '.'.join(table): {
+                    stage: histogram.to_dict()
+                    for stage, histogram in histograms.iteritems()
+                }
+                for table, histograms in self.histograms.iteritems()
+            }
+
+    def log_stats_periodically(self):
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        now = time.time()
+        if now < self._next_stats_log_at:
+            return
+        self._next_stats_log_at = now + STATS_LOG_INTERVAL_SECONDS
+        log.debug("Message latency per table: {}".format(self.stats()))
+        for trace in list(self.slow_traces):
+            log.debug("Slow message: {}".format(trace))
+
+    def _record(self, trace, acked_at):
+        latencies = {'publish_to_ack': acked_at - trace.published_at}
+        if trace.read_at is not None:
+            latencies['read_to_publish'] = trace.published_at - trace.read_at
+            latencies['commit_to_read'] = max(trace.read_at - trace.timestamp, 0)
+        latencies['end_to_end'] = max(acked_at - trace.timestamp, 0)
+        histograms = self.histograms[trace.table]
+        for stage, seconds in latencies.iteritems():
+            histograms[stage].add(seconds)
+        if latencies['end_to_end'] >= self.slow_threshold_seconds:
+            self.slow_traces.append(dict(latencies, table='.'.join(trace.table)))
@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import logging
 import os
+import threading
 
 import simplejson
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
@@ -34,6 +35,8 @@ REPLICATION_HANDLER_TEAM_NAME = env_config.team_name
 
 HEARTBEAT_DB = "yelp_heartbeat"
 
+REFRESH_TABLE_SUFFIX = '_data_pipeline_refresh'
+
 LOG_TRANSACTION_ID_SCHEMA_FILEPATH = os.path.join(
     os.path.dirname(__file__),
     '../../schema/avro_schema/log_transaction_id_v1.avsc')
@@ -43,9 +46,18 @@ GLOBAL_TRANSACTION_ID_SCHEMA_FILEPATH = os.path.join(
 
 log = logging.getLogger('replication_handler.util.misc.data_event')
 
+# Transaction id schema ids by gtid_enabled, registered once per process.
+_transaction_id_schema_ids = {}
+_transaction_id_schema_ids_lock = threading.Lock()
+
 
 class ReplicationHandlerEvent(object):
-    """ Class to associate an event and its position."""
+    """ Class to associate an event and its position.
+
+    Args:
+        event: the binlog event.
+        position(Position object): position of the event.
+    """
 
     def __init__(self, event, position):
         self.event = event
@@ -65,6 +77,11 @@ class DataEvent(object):
         timestamp(int): timestamp of event, in epoch time format.
         message_type(data_pipeline.message_type): the type of event, can be CreateMessage,
           UpdateMessage, DeleteMessage or RefreshMessage.
+
+    read_at is the time the event was read from the binlog stream, set by the
+    stream once the event is read when message latency tracing or table heavy
+    hitters need it.  row_size is the estimated size of row, set
+    by the data event handler when it is needed.
     """
 
     def __init__(
@@ -84,9 +101,14 @@ class DataEvent(object):
         self.row = row
         self.timestamp = timestamp
         self.message_type = message_type
+        self.read_at = None
+        self.row_size = None
 
 
-def save_position(position_data, state_session, is_clean_shutdown=False):
+def save_position(position_data, state_session, is_clean_shutdown=False, position_info=None):
+    """position_info, when given, is saved in place of the upstream position
+    info of the last published message.
+    """
     if not position_data or not position_data.last_published_message_position_info:
         log.info(
             "Unable to save position with invalid position_data: ".format(
@@ -95,7 +117,8 @@ def save_position(position_data, state_session, is_clean_shutdown=False):
         )
         return
     log.info("Saving position with position data {}.".format(position_data))
-    position_info = position_data.last_published_message_position_info
+    if position_info is None:
+        position_info = position_data.last_published_message_position_info
     topic_to_kafka_offset_map = position_data.topic_to_kafka_offset_map
     with state_session.connect_begin(ro=False) as session:
         GlobalEventState.upsert(
@@ -115,6 +138,15 @@ def save_position(position_data, state_session, is_clean_shutdown=False):
 
 
 def get_transaction_id_schema_id(gtid_enabled):
+    with _transaction_id_schema_ids_lock:
+        if gtid_enabled not in _transaction_id_schema_ids:
+            _transaction_id_schema_ids[gtid_enabled] = _register_transaction_id_schema(
+                gtid_enabled
+            )
+        return _transaction_id_schema_ids[gtid_enabled]
+
+
+def _register_transaction_id_schema(gtid_enabled):
     if gtid_enabled:
         file_name = GLOBAL_TRANSACTION_ID_SCHEMA_FILEPATH
         source = 'global_transaction_id'
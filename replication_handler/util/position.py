@@ -29,6 +29,7 @@ class Position(object):
     Primarily gtid or log position.
     """
     offset = None
+    counts_skipped_rows = True
 
     def to_dict(self):
         """This function turns the position object into a dict
@@ -42,6 +43,24 @@ class Position(object):
         """
         return {}
 
+    def to_transaction_dict(self):
+        """This function returns the part of to_dict shared by every position
+        with the same transaction_key, that is everything but the offset.
+        """
+        return {}
+
+    def add_offset(self, position_dict):
+        """This function adds the offset to a dict built by
+        to_transaction_dict, completing it into the to_dict result.
+        """
+        pass
+
+    def transaction_key(self):
+        """Positions with the same transaction key only differ by offset,
+        and share the same transaction id.
+        """
+        return None
+
     def get_transaction_id(self, transaction_id_schema_id, cluster_name):
         raise NotImplemented()
 
@@ -52,20 +71,39 @@ class GtidPosition(Position):
     Args:
       gtid(str): gtid formatted string.
       offset(int): offset within a pymysqlreplication RowEvent.
+      counts_skipped_rows(bool): whether the rows of skipped row events
+        count towards the offset.
+      executed_gtid_set(str): gtid set, formatted like gtid_executed, of the
+        transactions before the position, to start tailing from instead of a
+        gtid.  It is not part of the position dict.
     """
 
-    def __init__(self, gtid=None, offset=None):
+    def __init__(self, gtid=None, offset=None, counts_skipped_rows=True, executed_gtid_set=None):
         super(GtidPosition, self).__init__()
         self.gtid = gtid
         self.offset = offset
+        self.counts_skipped_rows = counts_skipped_rows
+        self.executed_gtid_set = executed_gtid_set
 
     def to_dict(self):
+        position_dict = self.to_transaction_dict()
+        self.add_offset(position_dict)
+        return position_dict
+
+    def to_transaction_dict(self):
         position_dict = {}
         if self.gtid:
             position_dict["gtid"] = self.gtid
+        return position_dict
+
+    def add_offset(self, position_dict):
         if self.offset:
             position_dict["offset"] = self.offset
-        return position_dict
+            if not self.counts_skipped_rows:
+                position_dict["counts_skipped_rows"] = False
+
+    def transaction_key(self):
+        return self.gtid
 
     def to_replication_dict(self):
         """Turn gtid into auto_position which the param to init pymysqlreplication
@@ -74,7 +112,11 @@ class GtidPosition(Position):
         to still be "sid:1-13", skip 10 rows and then resume tailing.
         """
         position_dict = {}
-        if self.gtid and self.offset:
+        if self.executed_gtid_set:
+            position_dict["auto_position"] = self._format_executed_gtid_set(
+                self.executed_gtid_set
+            )
+        elif self.gtid and self.offset:
             position_dict["auto_position"] = self._format_gtid_set(self.gtid)
         elif self.gtid:
             position_dict["auto_position"] = self._format_next_gtid_set(self.gtid)
@@ -106,6 +148,24 @@ class GtidPosition(Position):
             next_transaction_id=int(transaction_id) + 1
         )
 
+    def _format_executed_gtid_set(self, gtid_set):
+        """The intervals of gtid_executed include their last transaction,
+        unlike the ones of auto_position, see _format_gtid_set, so
+        "sid:1-13,sid2:7" turns into "sid:1-14,sid2:7-8".
+        """
+        gtids = []
+        for gtid in gtid_set.split(","):
+            intervals = gtid.strip().split(":")
+            sid = intervals.pop(0)
+            for index, interval in enumerate(intervals):
+                start, _, end = interval.partition("-")
+                intervals[index] = "{start}-{next_transaction_id}".format(
+                    start=start,
+                    next_transaction_id=int(end or start) + 1
+                )
+            gtids.append(":".join([sid] + intervals))
+        return ",".join(gtids)
+
     def get_transaction_id(self, transaction_id_schema_id, cluster_name):
         return get_gtid_meta_attribute(
             transaction_id_schema_id,
@@ -123,6 +183,8 @@ class LogPosition(Position):
       log_pos(int): the log position on binlog.
       log_file(string): binlog name.
       offset(int): offset within a pymysqlreplication RowEvent.
+      counts_skipped_rows(bool): whether the rows of skipped row events
+        count towards the offset.
       hb_serial(int): the serial number of this heartbeat.
       hb_timestamp(int): the utc timestamp when the hearbeat is inserted.
 
@@ -136,26 +198,40 @@ class LogPosition(Position):
         log_file=None,
         offset=None,
         hb_serial=None,
-        hb_timestamp=None
+        hb_timestamp=None,
+        counts_skipped_rows=True
     ):
         self.log_pos = log_pos
         self.log_file = log_file
         self.offset = offset
+        self.counts_skipped_rows = counts_skipped_rows
         self.hb_serial = hb_serial
         self.hb_timestamp = hb_timestamp
 
     def to_dict(self):
+        position_dict = self.to_transaction_dict()
+        self.add_offset(position_dict)
+        return position_dict
+
+    def to_transaction_dict(self):
         position_dict = {}
         if self.log_pos and self.log_file:
             position_dict["log_pos"] = self.log_pos
             position_dict["log_file"] = self.log_file
-        if self.offset is not None:
-            position_dict["offset"] = self.offset
         if self.hb_serial and self.hb_timestamp:
             position_dict["hb_serial"] = self.hb_serial
             position_dict["hb_timestamp"] = self.hb_timestamp
         return position_dict
 
+    def add_offset(self, position_dict):
+        if self.offset is not None:
+            position_dict["offset"] = self.offset
+            if not self.counts_skipped_rows:
+                position_dict["counts_skipped_rows"] = False
+
+    def transaction_key(self):
+        return (self.log_file, self.log_pos, self.hb_serial, self.hb_timestamp)
+
     def to_replication_dict(self):
         position_dict = {}
         if self.log_pos and self.log_file:
@@ -176,7 +252,8 @@ def construct_position(position_dict):
     if "gtid" in position_dict:
         return GtidPosition(
             gtid=position_dict.get("gtid"),
-            offset=position_dict.get("offset", None)
+            offset=position_dict.get("offset", None),
+            counts_skipped_rows=position_dict.get("counts_skipped_rows", True)
         )
     elif "log_pos" in position_dict and "log_file" in position_dict:
         return LogPosition(
@@ -185,6 +262,7 @@ def construct_position(position_dict):
             offset=position_dict.get("offset", None),
             hb_serial=position_dict.get("hb_serial", None),
             hb_timestamp=position_dict.get("hb_timestamp", None),
+            counts_skipped_rows=position_dict.get("counts_skipped_rows", True),
         )
     else:
         raise InvalidPositionDictException
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+from collections import deque
+from collections import namedtuple
+
+
+PublishedMessage = namedtuple(
+    'PublishedMessage',
+    ('sequence_number', 'key', 'payloads')
+)
+
+
+def get_position_key(upstream_position_info):
+    return (
+        upstream_position_info['table_name'],
+        tuple(sorted(upstream_position_info['position'].items()))
+    )
+
+
+class PublishedMessages(object):
+    """ This class remembers the messages handed to the producer that it has
+    not reported as published yet, by upstream position, for the trackers
+    that need to know when they are delivered.
+
+    Every tracker gets to keep a payload per message, returned by its
+    mark_published(event), and gets the payloads back in publish order in its
+    mark_delivered(payloads) once the producer reports a position at or past
+    their messages, or is flushed.  Trackers are called under the lock of
+    this class.
+
+    Messages are delivered in the order they were published, so the producer
+    reporting the position of a message delivers every message before it too.
+
+    Args:
+      trackers(list): objects with mark_published and mark_delivered methods.
+    """
+
+    def __init__(self, trackers):
+        self.trackers = trackers
+        self._lock = threading.Lock()
+        self._messages = deque()
+        self._sequence_numbers = {}
+        self._next_sequence_number = 0
+
+    def mark_published(self, upstream_position_info, event):
+        key = get_position_key(upstream_position_info)
+        with self._lock:
+            sequence_number = self._next_sequence_number
+            self._next_sequence_number += 1
+            self._messages.append(PublishedMessage(
+                sequence_number=sequence_number,
+                key=key,
+                payloads=tuple(tracker.mark_published(event) for tracker in self.trackers)
+            ))
+            self._sequence_numbers[key] = sequence_number
+
+    def mark_delivered_through(self, upstream_position_info):
+        """Delivers the messages published up to and including the one at
+        upstream_position_info.  Positions that are unknown, or were already
+        delivered, deliver nothing.
+        """
+        if not upstream_position_info:
+            return
+        key = get_position_key(upstream_position_info)
+        with self._lock:
+            last_sequence_number = self._sequence_numbers.get(key)
+            if last_sequence_number is None or not self._messages:
+                return
+            self._deliver(last_sequence_number - self._messages[0].sequence_number + 1)
+
+    def mark_all_delivered(self):
+        with self._lock:
+            self._deliver(len(self._messages))
+
+    def _deliver(self, count):
+        messages = [self._messages.popleft() for _ in xrange(count)]
+        for message in messages:
+            if self._sequence_numbers.get(message.key) == message.sequence_number:
+                del self._sequence_numbers[message.key]
+        for index, tracker in enumerate(self.trackers):
+            tracker.mark_delivered([message.payloads[index] for message in messages])
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+log = logging.getLogger('replication_handler.util.startup_timeline')
+
+Phase = namedtuple('Phase', ('name', 'started_at', 'seconds'))
+
+
+class StartupTimeline(object):
+    """ This class records the phases of the startup, which may run on
+    several threads, with their start relative to the creation of the
+    timeline and their duration.
+    """
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            # list.append is atomic, so phases can end on any thread.
+            self.phases.append(Phase(
+                name=name,
+                started_at=started_at - self.created_at,
+                seconds=time.time() - started_at
+            ))
+
+    def log(self):
+        log.info("Startup took {:.3f} seconds: {}".format(
+            time.time() - self.created_at,
+            ', '.join(
+                "{} at +{:.3f}s took {:.3f}s".format(phase.name, phase.started_at, phase.seconds)
+                for phase in sorted(self.phases, key=lambda phase: phase.started_at)
+            )
+        ))
+
+
+# Created on import, so the timeline starts with the process.
+startup_timeline = StartupTimeline()
@@ -66,3 +66,42 @@ def get_gtid_meta_attribute(transaction_id_schema_id, cluster_name, gtid):
             'gtid': gtid
         }
     )
+
+
+class TransactionIdCache(object):
+    """Memoizes the transaction id MetaAttribute and the offset independent
+    part of the position dict of the latest transaction. Every row of the same
+    GTID transaction, or between the same two heartbeats, shares those, so
+    only the offset has to be filled in per row.
+
+    Args:
+        transaction_id_schema_id (int): schema_id for transaction_id Meta Attribute
+    """
+
+    def __init__(self, transaction_id_schema_id):
+        self.transaction_id_schema_id = transaction_id_schema_id
+        self._key = None
+        self._transaction_dict = None
+        self._meta_attribute = None
+
+    def get_position_dict(self, position, cluster_name):
+        """Returns a dict equal to position.to_dict()"""
+        self._refresh(position, cluster_name)
+        position_dict = dict(self._transaction_dict)
+        position.add_offset(position_dict)
+        return position_dict
+
+    def get_meta_attribute(self, position, cluster_name):
+        """Returns a MetaAttribute equal to position.get_transaction_id()"""
+        self._refresh(position, cluster_name)
+        return self._meta_attribute
+
+    def _refresh(self, position, cluster_name):
+        key = (type(position), cluster_name, position.transaction_key())
+        if key != self._key:
+            self._transaction_dict = position.to_transaction_dict()
+            self._meta_attribute = position.get_transaction_id(
+                self.transaction_id_schema_id,
+                cluster_name
+            )
+            self._key = key
@@ -49,7 +49,7 @@ class BaseParseReplicationStreamTest(object):
 
     @pytest.fixture
     def schema_event(self):
-        return mock.Mock(spec=QueryEvent)
+        return mock.Mock(spec=QueryEvent, schema='yelp', query='BEGIN')
 
     @pytest.fixture
     def data_event(self):
@@ -179,6 +179,22 @@ class BaseParseReplicationStreamTest(object):
             mock_config.disable_meteorite = False
             mock_config.changelog_mode = False
             mock_config.topology_path = 'topology.yaml'
+            mock_config.continuous_profiling_enabled = False
+            mock_config.async_schema_resolution = False
+            mock_config.publish_workers = 0
+            mock_config.max_in_flight_bytes = 0
+            mock_config.catch_up_enter_delay_seconds = None
+            mock_config.transaction_scoped_checkpoints = False
+            mock_config.ddl_flush_in_flight_tables_only = False
+            mock_config.batch_schema_event_checkpoints = False
+            mock_config.message_latency_tracing = False
+            mock_config.table_heavy_hitters_capacity = 0
+            mock_config.heap_snapshot_file = 'repl_heap_snapshot.log'
+            mock_config.heap_snapshot_max_bytes = 1024
+            mock_config.heap_snapshot_backup_count = 1
+            mock_config.heap_snapshot_top_n = 10
+            mock_config.heap_snapshot_interval_seconds = 0
+            mock_config.heap_snapshot_trace_allocations = False
             yield mock_config
 
     @pytest.yield_fixture
@@ -190,6 +206,7 @@ class BaseParseReplicationStreamTest(object):
             mock_config.publish_dry_run = False
             mock_config.namespace = "test_namespace"
             mock_config.recovery_queue_size = 1
+            mock_config.catch_up_enter_delay_seconds = None
             yield mock_config
 
     @pytest.yield_fixture
@@ -352,6 +369,276 @@ class BaseParseReplicationStreamTest(object):
         handler_info = replication_stream._build_handler_map()[DataEvent]
         assert isinstance(handler_info.handler, DataEventHandler)
 
+    def test_checkpoint_skipped_while_rows_are_deferred(
+        self,
+        patch_config,
+        producer,
+        patch_db_connections,
+        patch_save_position
+    ):
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream._build_handler_map()
+        position_data = mock.Mock()
+        with mock.patch.object(
+            DataEventHandler,
+            'has_deferred_rows',
+            new_callable=mock.PropertyMock
+        ) as mock_has_deferred_rows:
+            mock_has_deferred_rows.return_value = True
+            replication_stream._save_position_callback(position_data)
+            assert patch_save_position.call_count == 0
+
+            mock_has_deferred_rows.return_value = False
+            replication_stream._save_position_callback(position_data)
+            assert patch_save_position.call_args_list == [mock.call(
+                position_data=position_data,
+                is_clean_shutdown=False,
+                state_session=patch_db_connections.return_value.state_session,
+                position_info=None
+            )]
+
+    def test_checkpoint_newest_row_after_rows_published_out_of_order(
+        self,
+        patch_config,
+        producer,
+        patch_db_connections,
+        patch_save_position
+    ):
+        patch_config.async_schema_resolution = True
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream._build_handler_map()
+        data_event_handler = replication_stream._data_event_handler
+        data_event_handler.published_out_of_order = True
+        data_event_handler.newest_published_position_info = mock.sentinel.newest_position_info
+        position_data = mock.Mock()
+        replication_stream._save_position_callback(position_data)
+        assert patch_save_position.call_count == 0
+
+        replication_stream._publish_deferred_data_events(wait=True)
+        assert producer.flush.call_count == 1
+        assert patch_save_position.call_args_list == [mock.call(
+            position_data=producer.get_checkpoint_position_data.return_value,
+            is_clean_shutdown=False,
+            state_session=patch_db_connections.return_value.state_session,
+            position_info=mock.sentinel.newest_position_info
+        )]
+        assert not data_event_handler.published_out_of_order
+
+    def test_reading_pauses_while_in_flight_memory_exceeded(
+        self,
+        patch_config,
+        producer,
+        patch_db_connections,
+        patch_save_position
+    ):
+        patch_config.max_in_flight_bytes = 100
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream._build_handler_map()
+        in_flight_memory = replication_stream._in_flight_memory
+        published_messages = replication_stream._published_messages
+        event = mock.Mock(row_size=60)
+        first_position_info = {'table_name': 'biz', 'position': {'offset': 0}}
+        second_position_info = {'table_name': 'biz', 'position': {'offset': 1}}
+        for position_info in (first_position_info, second_position_info):
+            in_flight_memory.add(60)
+            published_messages.mark_published(position_info, event)
+
+        replication_stream._save_position_callback(
+            mock.Mock(last_published_message_position_info=first_position_info)
+        )
+        assert in_flight_memory.in_flight_bytes == 60
+        replication_stream._wait_for_in_flight_memory()
+        assert producer.flush.call_count == 0
+
+        in_flight_memory.add(60)
+        published_messages.mark_published(
+            {'table_name': 'biz', 'position': {'offset': 2}},
+            event
+        )
+        replication_stream._wait_for_in_flight_memory()
+        assert producer.flush.call_count == 1
+        assert in_flight_memory.in_flight_bytes == 0
+        assert in_flight_memory.pause_count == 1
+
+    @pytest.yield_fixture
+    def patch_get_config(self):
+        with mock.patch.object(
+            replication_handler.batch.base_parse_replication_stream,
+            'get_config'
+        ) as mock_get_config:
+            yield mock_get_config
+
+    def test_catch_up_mode_lowers_checkpoint_frequency(
+        self,
+        patch_config,
+        patch_get_config,
+        producer,
+        patch_db_connections,
+        patch_save_position
+    ):
+        patch_config.catch_up_enter_delay_seconds = 600
+        patch_config.catch_up_exit_delay_seconds = 60
+        patch_config.catch_up_checkpoint_interval_seconds = 30
+        patch_config.recovery_queue_size = 10000
+        patch_get_config.return_value.kafka_producer_buffer_size = 1000
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream._build_handler_map()
+        replication_stream.stream = mock.Mock(delay_seconds=3600)
+        position_data = mock.Mock()
+
+        with mock.patch.object(
+            replication_handler.batch.base_parse_replication_stream.time,
+            'time'
+        ) as mock_time:
+            mock_time.return_value = 1000
+            replication_stream._update_catch_up_mode()
+            for _ in range(3):
+                replication_stream._save_position_callback(position_data)
+            assert patch_save_position.call_count == 1
+
+            mock_time.return_value += 30
+            replication_stream._save_position_callback(position_data)
+            assert patch_save_position.call_count == 2
+
+            replication_stream.stream.delay_seconds = 10
+            replication_stream._update_catch_up_mode()
+            replication_stream._save_position_callback(position_data)
+            assert patch_save_position.call_count == 3
+        assert replication_stream._catch_up_mode.enter_count == 1
+        assert replication_stream._catch_up_mode.exit_count == 1
+
+    @pytest.fixture
+    def last_published_position_info(self):
+        return {
+            'position': {'gtid': 'sid:5', 'offset': 3},
+            'cluster_name': 'yelp_main',
+            'database_name': 'yelp',
+            'table_name': 'business'
+        }
+
+    def test_transaction_scoped_checkpoints(
+        self,
+        patch_config,
+        patch_get_config,
+        producer,
+        mock_db_connections,
+        patch_db_connections,
+        patch_data_handle_event,
+        patch_schema_handle_event,
+        patch_save_position,
+        schema_event,
+        data_event,
+        position_gtid_1,
+        position_gtid_2,
+        last_published_position_info
+    ):
+        patch_config.transaction_scoped_checkpoints = True
+        patch_config.transaction_checkpoint_interval_seconds = 0
+        patch_config.recovery_queue_size = 10000
+        patch_get_config.return_value.kafka_producer_buffer_size = 1000
+        position_data = producer.get_checkpoint_position_data.return_value
+        position_data.last_published_message_position_info = (
+            last_published_position_info
+        )
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream.handler_map = replication_stream._build_handler_map()
+        begin_event = ReplicationHandlerEvent(position_gtid_1, schema_event)
+        row_event = ReplicationHandlerEvent(position_gtid_2, data_event)
+
+        replication_stream.process_event(begin_event)
+        replication_stream.process_event(row_event)
+        replication_stream._save_position_callback(mock.Mock())
+        assert patch_save_position.call_count == 0
+
+        replication_stream.process_event(begin_event)
+        assert producer.flush.call_count == 1
+        # The checkpoint resumes after the transaction, not at its last row.
+        patch_save_position.assert_called_once_with(
+            position_data=position_data,
+            is_clean_shutdown=False,
+            state_session=mock_db_connections.state_session,
+            position_info=dict(last_published_position_info, position={'gtid': 'sid:5'})
+        )
+
+        # Nothing to checkpoint without rows since the last checkpoint.
+        replication_stream.process_event(begin_event)
+        assert patch_save_position.call_count == 1
+
+    def test_transaction_scoped_checkpoints_bounded_by_recovery_queue_size(
+        self,
+        patch_config,
+        patch_get_config,
+        producer,
+        mock_db_connections,
+        patch_db_connections,
+        patch_data_handle_event,
+        patch_save_position,
+        data_event,
+        position_gtid_2
+    ):
+        patch_config.transaction_scoped_checkpoints = True
+        patch_config.transaction_checkpoint_interval_seconds = 0
+        patch_config.recovery_queue_size = 10
+        patch_get_config.return_value.kafka_producer_buffer_size = 4
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream.handler_map = replication_stream._build_handler_map()
+        row_event = ReplicationHandlerEvent(position_gtid_2, data_event)
+
+        for _ in range(5):
+            replication_stream.process_event(row_event)
+            replication_stream._save_position_callback(mock.Mock())
+        assert patch_save_position.call_count == 0
+
+        # A single transaction reaching recovery_queue_size minus the producer
+        # buffer is checkpointed at its last published row.
+        replication_stream.process_event(row_event)
+        assert producer.flush.call_count == 1
+        patch_save_position.assert_called_once_with(
+            position_data=producer.get_checkpoint_position_data.return_value,
+            is_clean_shutdown=False,
+            state_session=mock_db_connections.state_session,
+            position_info=None
+        )
+        for _ in range(5):
+            replication_stream.process_event(row_event)
+        assert patch_save_position.call_count == 1
+
+    def test_deferred_rows_published_before_schema_changes(
+        self,
+        patch_config,
+        producer,
+        patch_db_connections,
+        patch_schema_handle_event,
+        position_gtid_1
+    ):
+        replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.counters = mock.MagicMock()
+        replication_stream.handler_map = replication_stream._build_handler_map()
+        with mock.patch.object(
+            replication_stream,
+            '_publish_deferred_data_events'
+        ) as mock_publish_deferred_data_events:
+            for query in ('BEGIN', 'CREATE TABLE `business` (`a_number` int)'):
+                replication_stream.process_event(ReplicationHandlerEvent(
+                    position_gtid_1,
+                    mock.Mock(spec=QueryEvent, schema='yelp', query=query)
+                ))
+        # Only the CREATE TABLE changes the schemas.
+        assert mock_publish_deferred_data_events.call_args_list == [mock.call(wait=True)]
+
     def test_handle_graceful_termination_data_event(
         self,
         producer,
@@ -397,6 +684,7 @@ class BaseParseReplicationStreamTest(object):
         ) as mock_config:
             mock_config.register_dry_run = True
             mock_config.publish_dry_run = False
+            mock_config.catch_up_enter_delay_seconds = None
             replication_stream = self._get_parse_replication_stream()
             assert replication_stream.register_dry_run is True
             assert replication_stream.publish_dry_run is False
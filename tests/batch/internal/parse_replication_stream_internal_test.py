@@ -133,6 +133,55 @@ class TestParseReplicationStreamInternal(BaseParseReplicationStreamTest):
                 os_mock.open.return_value
             )
 
+    def test_continuous_profiler_checked_while_idle(
+        self,
+        patch_config,
+        patch_db_connections,
+        producer
+    ):
+        patch_config.continuous_profiling_enabled = True
+        with mock.patch.object(
+            replication_handler.batch.parse_replication_stream_internal,
+            'ContinuousProfiler'
+        ) as mock_profiler:
+            replication_stream = self._get_parse_replication_stream()
+        replication_stream.producer = producer
+        replication_stream.stream = mock.Mock(delay_seconds=40)
+        replication_stream._handle_idle_stream()
+        mock_profiler.return_value.periodic_process.assert_called_once_with(40)
+
+    def test_heap_snapshot_signal(
+        self,
+        patch_config,
+        patch_db_connections
+    ):
+        replication_stream = self._get_parse_replication_stream()
+        with mock.patch.object(
+            replication_stream._heap_snapshot,
+            'write'
+        ) as mock_write:
+            replication_stream._handle_heap_snapshot_signal(None, None)
+        mock_write.assert_called_once_with({
+            'schema_wrapper_cache': len(replication_stream.schema_wrapper.cache),
+        })
+
+    def test_heap_snapshot_signal_failure_logged(
+        self,
+        patch_config,
+        patch_db_connections
+    ):
+        replication_stream = self._get_parse_replication_stream()
+        with mock.patch.object(
+            replication_stream._heap_snapshot,
+            'write',
+            side_effect=IOError
+        ), mock.patch.object(
+            replication_handler.batch.parse_replication_stream_internal.log,
+            'exception'
+        ) as mock_log_exception:
+            replication_stream._handle_heap_snapshot_signal(None, None)
+        assert mock_log_exception.call_count == 1
+
     def test_register_signal_handler(
         self,
         patch_config,
@@ -150,6 +199,7 @@ class TestParseReplicationStreamInternal(BaseParseReplicationStreamTest):
             mock.call(signal.SIGINT, replication_stream._handle_shutdown_signal),
             mock.call(signal.SIGTERM, replication_stream._handle_shutdown_signal),
             mock.call(signal.SIGUSR2, replication_stream._handle_profiler_signal),
+            mock.call(signal.SIGUSR1, replication_stream._handle_heap_snapshot_signal),
         ] in patch_signal.call_args_list
 
     def _get_parse_replication_stream(self):
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+from pymysqlreplication.event import FormatDescriptionEvent
+from pymysqlreplication.event import GtidEvent
+
+from replication_handler.components.binlog_timestamp_searcher import BinlogTimestampSearcher
+from replication_handler.components.binlog_timestamp_searcher import parse_timestamp
+
+
+class TestBinlogTimestampSearcher(object):
+
+    @pytest.fixture
+    def log_files(self):
+        return ['mysql-bin.000001', 'mysql-bin.000002', 'mysql-bin.000003']
+
+    @pytest.fixture
+    def binlog_events(self):
+        """Events per log file, starting with the FormatDescriptionEvent."""
+        return {
+            'mysql-bin.000001': [
+                mock.Mock(timestamp=100),
+                mock.Mock(timestamp=100, gtid='sid:1', query='BEGIN', packet=mock.Mock(log_pos=300, event_size=80)),
+                mock.Mock(timestamp=150, gtid='sid:2', query='BEGIN', packet=mock.Mock(log_pos=500, event_size=80)),
+            ],
+            'mysql-bin.000002': [
+                mock.Mock(timestamp=200),
+                mock.Mock(timestamp=210, gtid='sid:3', query='BEGIN', packet=mock.Mock(log_pos=300, event_size=80)),
+                mock.Mock(timestamp=220, gtid='sid:4', query='COMMIT', packet=mock.Mock(log_pos=400, event_size=30)),
+                mock.Mock(timestamp=240, gtid='sid:5', query='BEGIN', packet=mock.Mock(log_pos=500, event_size=80)),
+            ],
+            'mysql-bin.000003': [
+                mock.Mock(timestamp=300),
+            ],
+        }
+
+    @pytest.fixture
+    def searcher(self, log_files, binlog_events, gtid_enabled):
+        def iter_events(log_file, only_events):
+            events = binlog_events[log_file]
+            if only_events == [FormatDescriptionEvent]:
+                return iter(events[:1])
+            return iter(events[1:])
+
+        searcher = BinlogTimestampSearcher(mock.Mock(), gtid_enabled)
+        searcher._get_log_files = mock.Mock(return_value=log_files)
+        searcher._get_gtid_executed = mock.Mock(return_value='sid:1-5')
+        searcher._iter_events = mock.Mock(side_effect=iter_events)
+        return searcher
+
+    @pytest.mark.parametrize('timestamp, expected_index', [
+        (50, 0),
+        (100, 0),
+        (199, 0),
+        (200, 1),
+        (299, 1),
+        (1000, 2),
+    ])
+    def test_find_log_file_index(self, searcher, log_files, timestamp, expected_index):
+        assert searcher._find_log_file_index(log_files, timestamp) == expected_index
+
+    @pytest.mark.parametrize('timestamp, gtid_position, log_position', [
+        (
+            50,
+            {'log_pos': 220, 'log_file': 'mysql-bin.000001'},
+            {'log_pos': 220, 'log_file': 'mysql-bin.000001'}
+        ),
+        (120, {'auto_position': 'sid:1-2'}, {'log_pos': 420, 'log_file': 'mysql-bin.000001'}),
+        (160, {'auto_position': 'sid:1-3'}, {'log_pos': 220, 'log_file': 'mysql-bin.000002'}),
+        (215, {'auto_position': 'sid:1-4'}, {'log_pos': 420, 'log_file': 'mysql-bin.000002'}),
+    ])
+    def test_get_position(self, searcher, gtid_enabled, timestamp, gtid_position, log_position):
+        position = searcher.get_position(timestamp)
+        if gtid_enabled:
+            # Tailing starts right before the first transaction found, which
+            # for sid:1 is the start of the binlogs.
+            assert position.to_replication_dict() == gtid_position
+            assert searcher._iter_events.call_args[0][1] == [GtidEvent]
+        else:
+            assert position.to_dict() == log_position
+
+    @pytest.mark.parametrize('timestamp, auto_position', [
+        (50, 'other:1-21:31-32'),
+        (160, 'other:1-21:31-32,sid:1-3'),
+        (215, 'other:1-21:31-32,sid:1-4'),
+    ])
+    def test_get_position_keeps_other_servers_gtids(self, searcher, timestamp, auto_position):
+        searcher.gtid_enabled = True
+        searcher._get_gtid_executed.return_value = 'other:1-20:31,\nsid:1-5:7-9'
+        position = searcher.get_position(timestamp)
+        assert position.to_replication_dict() == {'auto_position': auto_position}
+
+    def test_no_event_after_timestamp(self, searcher):
+        with pytest.raises(ValueError):
+            searcher.get_position(250)
+
+    @pytest.mark.parametrize('value', [
+        1464739200,
+        '1464739200',
+        '2016-06-01T00:00:00',
+        '2016-06-01 02:00:00+02:00',
+    ])
+    def test_parse_timestamp(self, value):
+        assert parse_timestamp(value) == 1464739200
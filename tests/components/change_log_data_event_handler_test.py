@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import mock
 import pytest
+from data_pipeline.message import UpdateMessage
 
 from replication_handler.components.change_log_data_event_handler import ChangeLogDataEventHandler
 
@@ -72,6 +73,22 @@ class TestChangeLogDataEventHandler(object):
         event_handler.handle_event(event, "position")
         mock_row.assert_called_once_with(event_handler.schema_wrapper_entry, event, "position")
 
+    @mock.patch.object(ChangeLogDataEventHandler, '_handle_row')
+    def test_noise_updates_dropped(self, mock_row, event_handler):
+        event_handler.noise_columns = {('schema', 'table'): frozenset(['time_updated'])}
+        noise_update = mock.Mock(
+            schema='schema',
+            table='table',
+            message_type=UpdateMessage,
+            row={
+                'before_values': {'id': 1, 'time_updated': 1},
+                'after_values': {'id': 1, 'time_updated': 2},
+            }
+        )
+        event_handler.handle_event(noise_update, 'position')
+        assert mock_row.call_count == 0
+        assert event_handler.noise_update_counts == {('schema', 'table'): 1}
+
     @mock.patch(
         'replication_handler.components.change_log_data_event_handler.ChangeLogMessageBuilder',
         autospec=True
@@ -89,5 +106,50 @@ class TestChangeLogDataEventHandler(object):
             event,
             fake_transaction_id_schema_id,
             "position",
-            False
+            False,
+            transaction_id_cache=event_handler.transaction_id_cache
         )
+
+    def _make_event(self, row_id, table='table'):
+        return mock.Mock(
+            schema='schema',
+            table=table,
+            row={'after_values': {'id': row_id}}
+        )
+
+    @mock.patch.object(ChangeLogDataEventHandler, '_handle_row')
+    def test_changes_coalesced_in_order_of_latest_change(self, mock_row, event_handler):
+        event_handler.coalesce_window_seconds = 60
+        event_handler.coalesce_max_rows = 3
+        events = [
+            (self._make_event(1), 'position_1'),
+            (self._make_event(2), 'position_2'),
+            (self._make_event(1), 'position_3'),
+            (self._make_event(1, table='other_table'), 'position_4'),
+        ]
+        for event, position in events[:3]:
+            event_handler.handle_event(event, position)
+        assert mock_row.call_count == 0
+        assert event_handler.coalesced_row_count == 1
+
+        event_handler.handle_event(*events[3])
+        assert mock_row.call_args_list == [
+            mock.call(event_handler.schema_wrapper_entry, event, position)
+            for event, position in (events[1], events[2], events[3])
+        ]
+        assert not event_handler.coalescing_rows
+
+    @mock.patch.object(ChangeLogDataEventHandler, '_handle_row')
+    def test_coalesced_rows_published_when_window_is_over(self, mock_row, event_handler):
+        event_handler.coalesce_window_seconds = 60
+        with mock.patch(
+            'replication_handler.components.change_log_data_event_handler.time.time'
+        ) as mock_time:
+            mock_time.return_value = 1000
+            event_handler.handle_event(self._make_event(1), 'position_1')
+            event_handler.publish_deferred_rows()
+            assert mock_row.call_count == 0
+
+            mock_time.return_value += 60
+            event_handler.publish_deferred_rows()
+            assert mock_row.call_count == 1
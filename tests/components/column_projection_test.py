@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+
+from replication_handler.components.column_projection import ColumnProjection
+from replication_handler.components.column_projection import TableProjection
+
+
+class TestColumnProjection(object):
+
+    @pytest.fixture
+    def create_table_stmt(self):
+        return (
+            "CREATE TABLE `business` (\n"
+            "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `name` varchar(64) DEFAULT NULL,\n"
+            "  `description` text,\n"
+            "  `photo` blob,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `name_idx` (`name`),\n"
+            "  FULLTEXT KEY `description_idx` (`description`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+        )
+
+    def test_get(self):
+        column_projection = ColumnProjection({
+            'yelp.business': {'exclude': ['photo']},
+        })
+        assert column_projection.get('yelp', 'business').exclude == {'photo'}
+        assert column_projection.get('yelp', 'review') is None
+        assert not ColumnProjection({})
+
+    @pytest.mark.parametrize('table_config', [{}, {'include': ['id'], 'exclude': ['name']}])
+    def test_include_or_exclude_required(self, table_config):
+        with pytest.raises(ValueError):
+            ColumnProjection({'yelp.business': table_config})
+
+    def test_project_row_exclude(self):
+        row = {
+            'before_values': {'id': 1, 'name': 'a', 'photo': b'before'},
+            'after_values': {'id': 1, 'name': 'b', 'photo': b'after'},
+        }
+        TableProjection(exclude=['photo', 'missing']).project_row(row)
+        assert row == {
+            'before_values': {'id': 1, 'name': 'a'},
+            'after_values': {'id': 1, 'name': 'b'},
+        }
+
+    def test_project_row_include(self):
+        row = {'values': {'id': 1, 'name': 'a', 'photo': b'photo'}}
+        TableProjection(include=['id', 'name']).project_row(row)
+        assert row == {'values': {'id': 1, 'name': 'a'}}
+
+    def test_project_create_table_stmt(self, create_table_stmt):
+        projection = TableProjection(exclude=['description', 'photo'])
+        assert projection.project_create_table_stmt(create_table_stmt) == (
+            "CREATE TABLE `business` (\n"
+            "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `name` varchar(64) DEFAULT NULL,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `name_idx` (`name`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+        )
+        assert projection.project_create_table_stmt('') == ''
+
+    def test_primary_key_can_not_be_projected_out(self, create_table_stmt):
+        projection = TableProjection(include=['name'])
+        with pytest.raises(ValueError):
+            projection.project_create_table_stmt(create_table_stmt)
@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import json
+import threading
 from collections import namedtuple
 
 import mock
@@ -31,8 +32,13 @@ from replication_handler.components.data_event_handler import DataEventHandler
 from replication_handler.components.schema_tracker import SchemaTracker
 from replication_handler.components.schema_wrapper import SchemaWrapper
 from replication_handler.components.schema_wrapper import SchemaWrapperEntry
+from replication_handler.util.heavy_hitters import TableHeavyHitters
+from replication_handler.util.in_flight_memory import estimate_row_size
+from replication_handler.util.in_flight_memory import InFlightMemory
+from replication_handler.util.message_latency import MessageLatency
 from replication_handler.util.position import GtidPosition
 from replication_handler.util.position import LogPosition
+from replication_handler.util.published_messages import PublishedMessages
 from replication_handler_testing.events import make_data_create_event
 from replication_handler_testing.events import make_data_update_event
 
@@ -389,11 +395,353 @@ class TestDataEventHandler(object):
             new_callable=mock.PropertyMock
         ) as mock_blacklist:
             mock_blacklist.return_value = ['fake_database']
+            config.env_config.reload_snapshot()
             for data_event in data_create_events:
                 position = mock.Mock()
                 data_event_handler.handle_event(data_event, position)
                 assert producer.publish.call_count == 0
 
+    @pytest.fixture
+    def async_schema_wrapper(self, schema_wrapper_entry):
+        schema_wrapper = mock.MagicMock()
+        schema_wrapper.is_ready.return_value = False
+        schema_wrapper.__getitem__.return_value = schema_wrapper_entry
+        return schema_wrapper
+
+    @pytest.fixture
+    def async_data_event_handler(
+        self,
+        mock_source_cluster_name,
+        mock_db_connections,
+        async_schema_wrapper,
+        producer,
+        gtid_enabled
+    ):
+        handler = DataEventHandler(
+            mock_db_connections,
+            producer,
+            schema_wrapper=async_schema_wrapper,
+            register_dry_run=False,
+            gtid_enabled=gtid_enabled,
+            async_schema_resolution=True
+        )
+        handler.max_deferred_rows = 3
+        handler.max_deferral_seconds = 60
+        return handler
+
+    @pytest.yield_fixture
+    def patch_handle_row(self):
+        with mock.patch.object(DataEventHandler, '_handle_row') as mock_handle_row:
+            yield mock_handle_row
+
+    def _make_table_events(self, table_name, count=1):
+        data_events = make_data_create_event()[:count]
+        for data_event in data_events:
+            data_event.table = table_name
+        return data_events
+
+    def test_rows_deferred_until_schema_ready(
+        self,
+        async_data_event_handler,
+        async_schema_wrapper,
+        schema_wrapper_entry,
+        patch_handle_row
+    ):
+        position = LogPosition(log_file='binlog', log_pos=100)
+        data_events = self._make_table_events('fake_table', count=2)
+        for data_event in data_events:
+            async_data_event_handler.handle_event(data_event, position)
+        assert async_schema_wrapper.prefetch.call_count == 2
+        assert patch_handle_row.call_count == 0
+        assert async_data_event_handler.has_deferred_rows
+
+        async_schema_wrapper.is_ready.return_value = True
+        async_data_event_handler.publish_deferred_rows()
+        assert patch_handle_row.call_args_list == [
+            mock.call(schema_wrapper_entry, data_event, position)
+            for data_event in data_events
+        ]
+        assert not async_data_event_handler.has_deferred_rows
+
+    def test_ready_table_published_while_other_table_waits(
+        self,
+        async_data_event_handler,
+        async_schema_wrapper,
+        patch_handle_row
+    ):
+        async_schema_wrapper.is_ready.side_effect = (
+            lambda table: table.table_name == 'ready_table'
+        )
+        position = LogPosition(log_file='binlog', log_pos=100)
+        async_data_event_handler.handle_event(
+            self._make_table_events('pending_table')[0],
+            position
+        )
+        ready_event = self._make_table_events('ready_table')[0]
+        async_data_event_handler.handle_event(ready_event, position)
+        assert [c[0][1] for c in patch_handle_row.call_args_list] == [ready_event]
+        assert async_data_event_handler.deferred_row_count == 1
+
+    def test_rows_published_out_of_order(
+        self,
+        async_data_event_handler,
+        async_schema_wrapper,
+        patch_handle_row
+    ):
+        patch_handle_row.side_effect = lambda schema_wrapper_entry, event, position: (
+            mock.Mock(upstream_position_info=event.table)
+        )
+        async_schema_wrapper.is_ready.side_effect = (
+            lambda table: table.table_name == 'ready_table'
+        )
+        position = LogPosition(log_file='binlog', log_pos=100)
+        for table_name in ('pending_table', 'ready_table'):
+            async_data_event_handler.handle_event(
+                self._make_table_events(table_name)[0],
+                position
+            )
+        assert async_data_event_handler.newest_published_position_info == 'ready_table'
+        assert not async_data_event_handler.published_out_of_order
+
+        async_data_event_handler.publish_deferred_rows(wait=True)
+        assert async_data_event_handler.published_out_of_order
+        assert async_data_event_handler.newest_published_position_info == 'ready_table'
+
+    def test_blocks_on_oldest_table_when_too_many_rows_deferred(
+        self,
+        async_data_event_handler,
+        patch_handle_row
+    ):
+        position = LogPosition(log_file='binlog', log_pos=100)
+        for table_name in ('first_table', 'second_table', 'first_table'):
+            async_data_event_handler.handle_event(
+                self._make_table_events(table_name)[0],
+                position
+            )
+        published_tables = [
+            c[0][1].table for c in patch_handle_row.call_args_list
+        ]
+        assert published_tables == ['first_table', 'first_table']
+        assert async_data_event_handler.deferred_row_count == 1
+
+        async_data_event_handler.publish_deferred_rows(wait=True)
+        assert patch_handle_row.call_count == 3
+        assert not async_data_event_handler.has_deferred_rows
+
+    @pytest.fixture
+    def worker_data_event_handler(
+        self,
+        mock_source_cluster_name,
+        mock_db_connections,
+        schema_wrapper,
+        producer,
+        gtid_enabled
+    ):
+        handler = DataEventHandler(
+            mock_db_connections,
+            producer,
+            schema_wrapper=schema_wrapper,
+            register_dry_run=False,
+            gtid_enabled=gtid_enabled,
+            publish_workers=2
+        )
+        handler.max_in_flight_rows = 100
+        return handler
+
+    def test_workers_publish_in_binlog_order(
+        self,
+        worker_data_event_handler,
+        producer,
+        schema_wrapper_entry,
+        patches,
+        patch_message_topic
+    ):
+        first_table_released = threading.Event()
+
+        def get_payload_schema(table):
+            if table.table_name == 'first_table':
+                first_table_released.wait()
+            return schema_wrapper_entry
+
+        position = LogPosition(log_file='binlog', log_pos=100)
+        data_events = (
+            self._make_table_events('first_table') +
+            self._make_table_events('second_table', count=3)
+        )
+        with mock.patch.object(
+            DataEventHandler,
+            '_get_payload_schema',
+            side_effect=get_payload_schema
+        ):
+            for data_event in data_events:
+                worker_data_event_handler.handle_event(data_event, position)
+            assert producer.publish.call_count == 0
+
+            first_table_released.set()
+            worker_data_event_handler.publish_deferred_rows(wait=True)
+
+        published_rows = [
+            (c[0][0].upstream_position_info['table_name'], c[0][0].payload_data)
+            for c in producer.publish.call_args_list
+        ]
+        assert published_rows == [
+            (data_event.table, data_event.row['values'])
+            for data_event in data_events
+        ]
+        assert not worker_data_event_handler.in_flight_rows
+
+    def test_in_flight_memory_accounted_until_released(
+        self,
+        mock_db_connections,
+        schema_wrapper,
+        producer,
+        gtid_enabled,
+        data_create_events,
+        patches,
+        patch_get_payload_schema,
+        patch_message_topic
+    ):
+        in_flight_memory = InFlightMemory(max_bytes=10 ** 6)
+        published_messages = PublishedMessages([in_flight_memory])
+        data_event_handler = DataEventHandler(
+            mock_db_connections,
+            producer,
+            schema_wrapper=schema_wrapper,
+            register_dry_run=False,
+            gtid_enabled=gtid_enabled,
+            in_flight_memory=in_flight_memory,
+            published_messages=published_messages
+        )
+        with mock.patch(
+            'replication_handler.components.data_event_handler.estimate_row_size',
+            side_effect=estimate_row_size
+        ) as mock_estimate_row_size:
+            for offset, data_event in enumerate(data_create_events):
+                position = LogPosition(log_file='binlog', log_pos=100, offset=offset)
+                data_event_handler.handle_event(data_event, position)
+        # Sizes are estimated once per row, and carried to the publish.
+        assert mock_estimate_row_size.call_count == len(data_create_events)
+        expected_bytes = sum(
+            estimate_row_size(data_event.row) for data_event in data_create_events
+        )
+        assert in_flight_memory.in_flight_bytes == expected_bytes
+        assert in_flight_memory.published_bytes == expected_bytes
+
+        last_message = producer.publish.call_args[0][0]
+        published_messages.mark_delivered_through(last_message.upstream_position_info)
+        assert in_flight_memory.in_flight_bytes == 0
+        assert in_flight_memory.published_bytes == 0
+
+    def test_table_heavy_hitters_reuse_row_size(
+        self,
+        mock_db_connections,
+        schema_wrapper,
+        producer,
+        gtid_enabled,
+        data_create_events,
+        patches,
+        patch_get_payload_schema,
+        patch_message_topic
+    ):
+        table_heavy_hitters = TableHeavyHitters(capacity=10, top_n=10, log_interval_seconds=60)
+        data_event_handler = DataEventHandler(
+            mock_db_connections,
+            producer,
+            schema_wrapper=schema_wrapper,
+            register_dry_run=False,
+            gtid_enabled=gtid_enabled,
+            table_heavy_hitters=table_heavy_hitters
+        )
+        with mock.patch(
+            'replication_handler.components.data_event_handler.estimate_row_size',
+            side_effect=estimate_row_size
+        ) as mock_estimate_row_size:
+            for offset, data_event in enumerate(data_create_events):
+                position = LogPosition(log_file='binlog', log_pos=100, offset=offset)
+                data_event_handler.handle_event(data_event, position)
+        assert mock_estimate_row_size.call_count == len(data_create_events)
+        assert sum(
+            heavy_hitter.count for heavy_hitter in table_heavy_hitters.top()['bytes']
+        ) == sum(estimate_row_size(data_event.row) for data_event in data_create_events)
+
+    def test_message_latency_traced_until_acked(
+        self,
+        mock_db_connections,
+        schema_wrapper,
+        producer,
+        gtid_enabled,
+        data_create_events,
+        patches,
+        patch_get_payload_schema,
+        patch_message_topic
+    ):
+        message_latency = MessageLatency(slow_threshold_seconds=10, max_slow_traces=1)
+        published_messages = PublishedMessages([message_latency])
+        data_event_handler = DataEventHandler(
+            mock_db_connections,
+            producer,
+            schema_wrapper=schema_wrapper,
+            register_dry_run=False,
+            gtid_enabled=gtid_enabled,
+            published_messages=published_messages
+        )
+        for offset, data_event in enumerate(data_create_events):
+            data_event.read_at = data_event.timestamp
+            position = LogPosition(log_file='binlog', log_pos=100, offset=offset)
+            data_event_handler.handle_event(data_event, position)
+        assert not message_latency.stats()
+
+        last_message = producer.publish.call_args[0][0]
+        published_messages.mark_delivered_through(last_message.upstream_position_info)
+        stats = message_latency.stats()
+        assert sum(
+            table_stats['end_to_end']['count'] for table_stats in stats.values()
+        ) == len(data_create_events)
+
+    def test_noise_updates_dropped(
+        self,
+        mock_db_connections,
+        schema_wrapper,
+        producer,
+        gtid_enabled,
+        data_update_events,
+        patches,
+        patch_get_payload_schema,
+        patch_message_topic
+    ):
+        with mock.patch.object(
+            config.EnvConfig,
+            'noise_columns',
+            new_callable=mock.PropertyMock
+        ) as mock_noise_columns:
+            mock_noise_columns.return_value = {
+                'fake_database.fake_table': ['time_updated']
+            }
+            data_event_handler = DataEventHandler(
+                mock_db_connections,
+                producer,
+                schema_wrapper=schema_wrapper,
+                register_dry_run=False,
+                gtid_enabled=gtid_enabled
+            )
+        noise_update, real_update = data_update_events[:2]
+        noise_update.row['before_values'] = dict(
+            noise_update.row['after_values'],
+            time_updated=1
+        )
+        noise_update.row['after_values']['time_updated'] = 2
+        position = LogPosition(log_file='binlog', log_pos=100)
+        data_event_handler.handle_event(noise_update, position)
+        data_event_handler.handle_event(real_update, position)
+
+        published_payloads = [
+            c[0][0].payload_data for c in producer.publish.call_args_list
+        ]
+        assert published_payloads == [real_update.row['after_values']]
+        assert data_event_handler.noise_update_counts == {
+            ('fake_database', 'fake_table'): 1
+        }
+
     def _assert_messages_as_expected(self, expected, actual):
         for expected_message, actual_message in zip(expected, actual):
             assert expected_message.topic == actual_message.topic
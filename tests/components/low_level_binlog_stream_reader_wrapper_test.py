@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import time
+import weakref
 
 import mock
 import pytest
@@ -28,11 +29,47 @@ from pymysqlreplication.row_event import WriteRowsEvent
 
 from replication_handler import config
 from replication_handler.components.low_level_binlog_stream_reader_wrapper import LowLevelBinlogStreamReaderWrapper
+from replication_handler.components.low_level_binlog_stream_reader_wrapper import SkippedRows
 from replication_handler.util.position import GtidPosition
 from replication_handler.util.position import LogPosition
 from replication_handler_testing.events import RowsEvent
 
 
+class LargeValue(object):
+    __slots__ = ('data', '__weakref__')
+
+    def __init__(self, size):
+        self.data = b'x' * size
+
+
+class GiantWriteRowsEvent(WriteRowsEvent):
+    """A WriteRowsEvent that decodes row_count rows of row_size bytes the way
+    pymysqlreplication does, and records how many decoded rows are alive at
+    most at any point.
+    """
+
+    def __init__(self, row_count, row_size):
+        # The packet parsing of the pymysqlreplication constructor is skipped.
+        setattr(self, '_RowsEvent__rows', None)
+        self.schema = 'fake_schema'
+        self.table = 'fake_table'
+        self.event_type = WRITE_ROWS_EVENT_V2
+        self.timestamp = int(time.time())
+        self.complete = True
+        self.event_size = row_count + 1
+        self.packet = mock.Mock(read_bytes=0)
+        self.row_size = row_size
+        self.live_values = weakref.WeakSet()
+        self.max_live_values = 0
+
+    def _fetch_one_row(self):
+        self.packet.read_bytes += 1
+        value = LargeValue(self.row_size)
+        self.live_values.add(value)
+        self.max_live_values = max(self.max_live_values, len(self.live_values))
+        return {'values': {'id': self.packet.read_bytes, 'blob': value}}
+
+
 class TestLowLevelBinlogStreamReaderWrapper(object):
 
     @pytest.yield_fixture
@@ -110,12 +147,135 @@ class TestLowLevelBinlogStreamReaderWrapper(object):
         assert stream.pop().table == 'fake_table'
         assert stream.pop().message_type == RefreshMessage
 
-    def _prepare_data_event(self, table):
+    def test_projected_columns_dropped(self, mock_db_connections, patch_stream):
+        data_event = self._prepare_data_event('fake_table_data_pipeline_refresh')
+        for row in data_event.rows:
+            row['values']['photo'] = b'photo'
+        patch_stream.return_value.fetchone.side_effect = [data_event]
+        with mock.patch.object(
+            config.EnvConfig,
+            'column_projection',
+            new_callable=mock.PropertyMock
+        ) as mock_column_projection:
+            mock_column_projection.return_value = {
+                'fake_schema.fake_table': {'exclude': ['photo']}
+            }
+            stream = LowLevelBinlogStreamReaderWrapper(
+                mock_db_connections.source_database_config,
+                mock_db_connections.tracker_database_config,
+                LogPosition(
+                    log_pos=100,
+                    log_file="binlog.001",
+                )
+            )
+        assert [stream.pop().row for _ in range(3)] == [
+            {'values': {'a_number': 100}},
+            {'values': {'a_number': 200}},
+            {'values': {'a_number': 300}},
+        ]
+
+    def test_row_expansion_memory_high_water_mark(self, mock_db_connections, patch_stream):
+        row_count = 10000
+        row_size = 10000
+        giant_event = GiantWriteRowsEvent(row_count, row_size)
+        query_event = mock.Mock(spec=QueryEvent)
+        patch_stream.return_value.fetchone.side_effect = [
+            giant_event,
+            query_event,
+        ]
+        stream = LowLevelBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            LogPosition(
+                log_pos=100,
+                log_file="binlog.001",
+            )
+        )
+        for row_id in range(1, row_count + 1):
+            assert stream.peek().row['values']['id'] == row_id
+            assert stream.pop().row['values']['id'] == row_id
+        assert stream.pop() == query_event
+        # Only the row being handed out is decoded, instead of the
+        # 100MB the whole event holds.
+        assert giant_event.max_live_values * row_size <= 2 * row_size
+
+    def test_skip_blacklisted_row_events_counting_rows(
+        self,
+        mock_db_connections,
+        patch_stream
+    ):
+        blacklisted_event = self._prepare_data_event('fake_table', schema='test')
+        data_event = self._prepare_data_event('fake_table')
+        patch_stream.return_value.fetchone.side_effect = [
+            blacklisted_event,
+            data_event,
+        ]
+        stream = LowLevelBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            LogPosition(
+                log_pos=100,
+                log_file="binlog.001",
+            )
+        )
+        stream.count_skipped_rows = True
+        assert stream.pop() == SkippedRows(
+            schema='test',
+            table='fake_table',
+            row_count=len(blacklisted_event.rows)
+        )
+        assert stream.pop().schema == 'fake_schema'
+        assert stream.skipped_row_events == 1
+        assert stream.skipped_bytes == blacklisted_event.event_size
+
+    def test_skip_blacklisted_row_events(self, mock_db_connections, patch_stream):
+        blacklisted_event = GiantWriteRowsEvent(row_count=10, row_size=1)
+        blacklisted_event.schema = 'test'
+        data_event = self._prepare_data_event('fake_table')
+        patch_stream.return_value.fetchone.side_effect = [
+            blacklisted_event,
+            data_event,
+        ]
+        stream = LowLevelBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            LogPosition(
+                log_pos=100,
+                log_file="binlog.001",
+            )
+        )
+        assert stream.pop().schema == 'fake_schema'
+        assert blacklisted_event.max_live_values == 0
+        assert stream.skipped_row_events == 1
+        assert stream.skipped_bytes == blacklisted_event.event_size
+
+    @pytest.mark.parametrize('gtid_enabled, heartbeat_skipped', [
+        (False, False),
+        (True, True),
+    ])
+    def test_skipped_schemas_heartbeat(
+        self,
+        mock_db_connections,
+        patch_stream,
+        gtid_enabled,
+        heartbeat_skipped
+    ):
+        stream = LowLevelBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            GtidPosition(gtid="sid:5"),
+            gtid_enabled=gtid_enabled
+        )
+        assert 'test' in stream.skipped_schemas
+        assert ('yelp_heartbeat' in stream.skipped_schemas) == heartbeat_skipped
+
+    def _prepare_data_event(self, table, schema='fake_schema'):
         data_event = mock.Mock(spec=WriteRowsEvent)
         data_event.rows = RowsEvent.make_add_rows_event().rows
-        data_event.schema = 'fake_schema'
+        data_event.schema = schema
         data_event.table = table
         data_event.event_type = WRITE_ROWS_EVENT_V2
+        data_event.event_size = 1024
         data_event.log_pos = 100
         data_event.log_file = "binglog.001"
         data_event.timestamp = int(time.time())
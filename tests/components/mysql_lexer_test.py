@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+
+from replication_handler.components.mysql_lexer import LexedStatement
+from replication_handler.components.mysql_lexer import LexerToken
+from replication_handler.components.mysql_lexer import NAME
+from replication_handler.components.mysql_lexer import PUNCTUATION
+from replication_handler.components.mysql_lexer import STRING
+from replication_handler.components.mysql_lexer import tokenize
+from replication_handler.components.mysql_lexer import WORD
+
+
+class TestMysqlLexer(object):
+
+    def test_tokenize(self):
+        assert list(tokenize("ALTER TABLE `yelp`.biz ADD x int(11) DEFAULT 'a b'")) == [
+            LexerToken(WORD, 'ALTER'),
+            LexerToken(WORD, 'TABLE'),
+            LexerToken(NAME, '`yelp`.biz'),
+            LexerToken(WORD, 'ADD'),
+            LexerToken(WORD, 'x'),
+            LexerToken(WORD, 'int'),
+            LexerToken(PUNCTUATION, '('),
+            LexerToken(WORD, '11'),
+            LexerToken(PUNCTUATION, ')'),
+            LexerToken(WORD, 'DEFAULT'),
+            LexerToken(STRING, "'a b'"),
+        ]
+
+    @pytest.mark.parametrize('query', [
+        "/* leading */ DROP TABLE biz",
+        "DROP -- trailing\nTABLE biz",
+        "DROP # trailing\nTABLE biz",
+        "DROP/* inline */TABLE\n\tbiz",
+    ])
+    def test_comments_and_whitespace_skipped(self, query):
+        assert [token.value for token in tokenize(query)] == ['DROP', 'TABLE', 'biz']
+
+    def test_quoted_identifiers(self):
+        tokens = list(tokenize('RENAME TABLE `a b``c` TO "d.e"."f"'))
+        assert tokens[2] == LexerToken(NAME, '`a b``c`')
+        assert tokens[4] == LexerToken(NAME, '"d.e"."f"')
+
+    def test_keywords_in_strings_and_names(self):
+        tokens = list(tokenize("ALTER TABLE biz COMMENT 'rename' `rename`"))
+        assert not any(token.is_keyword('rename') for token in tokens)
+        assert tokens[0].is_keyword('alter')
+
+    def test_unicode(self):
+        assert [token.value for token in tokenize("DROP TABLE `yelp`.Ä")] == [
+            'DROP',
+            'TABLE',
+            '`yelp`.Ä'
+        ]
+
+    def test_lexed_statement(self):
+        query = 'DROP TABLE biz'
+        statement = LexedStatement(query)
+        assert len(statement.tokens) == 3
+        assert unicode(statement) == query
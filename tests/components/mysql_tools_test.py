@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.components import mysql_tools
+
+
+class TestMySQLTools(object):
+
+    @pytest.fixture
+    def header(self):
+        return (
+            "-- MySQL dump 10.13\n"
+            "/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;\n"
+            "\n"
+        )
+
+    def _database_section(self, database_name):
+        return (
+            "--\n"
+            "-- Current Database: `{0}`\n"
+            "--\n"
+            "\n"
+            "CREATE DATABASE /*!32312 IF NOT EXISTS*/ `{0}`;\n"
+            "\n"
+            "USE `{0}`;\n"
+            "CREATE TABLE `business` (`id` int(11) NOT NULL);\n"
+        ).format(database_name)
+
+    def _views_section(self, database_name):
+        return (
+            "--\n"
+            "-- Current Database: `{0}`\n"
+            "--\n"
+            "\n"
+            "USE `{0}`;\n"
+            "CREATE VIEW `business_view` AS SELECT `id` FROM `yelp`.`business`;\n"
+        ).format(database_name)
+
+    @pytest.fixture
+    def mysql_dump_with_views(self, header):
+        return (
+            header +
+            self._database_section('yelp') +
+            self._database_section('yelp_aux') +
+            self._views_section('yelp_aux') +
+            self._views_section('yelp')
+        )
+
+    @pytest.fixture
+    def mysql_dump(self, header):
+        return header + self._database_section('yelp') + self._database_section('yelp_aux')
+
+    @pytest.fixture
+    def db_creds(self):
+        return {'host': 'tracker', 'port': 3306, 'user': 'user', 'passwd': 'passwd'}
+
+    def test_split_mysql_dump(self, header, mysql_dump):
+        assert mysql_tools.split_mysql_dump(mysql_dump) == [
+            ('yelp', header + self._database_section('yelp')),
+            ('yelp_aux', header + self._database_section('yelp_aux')),
+        ]
+        assert mysql_tools.split_mysql_dump(header) == []
+
+    def test_restore_in_parallel(self, db_creds, mysql_dump):
+        restored_dumps = []
+
+        def restore(db_creds, dump_file):
+            with open(dump_file) as f:
+                restored_dumps.append(f.read())
+            # The first restore of yelp_aux fails, and is retried.
+            failed = '`yelp_aux`' in restored_dumps[-1] and restored_dumps.count(restored_dumps[-1]) == 1
+            return 1 if failed else 0
+
+        with mock.patch.object(mysql_tools, '_run_restore', side_effect=restore):
+            mysql_tools.restore_mysql_dump_in_parallel(db_creds, mysql_dump, workers=2)
+        assert len(restored_dumps) == 3
+        assert all(dump.count('Current Database') == 1 for dump in restored_dumps)
+        assert len([dump for dump in restored_dumps if '`yelp_aux`' in dump]) == 2
+
+    def test_views_restored_after_tables(self, db_creds, header, mysql_dump_with_views):
+        assert [
+            database_name for database_name, _ in mysql_tools.split_mysql_dump(mysql_dump_with_views)
+        ] == ['yelp', 'yelp_aux', 'yelp_aux', 'yelp']
+        restored_dumps = []
+
+        def restore(db_creds, dump_file):
+            with open(dump_file) as f:
+                restored_dumps.append(f.read())
+            return 0
+
+        with mock.patch.object(mysql_tools, '_run_restore', side_effect=restore):
+            mysql_tools.restore_mysql_dump_in_parallel(db_creds, mysql_dump_with_views, workers=2)
+        assert len(restored_dumps) == 4
+        assert sorted(restored_dumps[2:]) == sorted([
+            header + self._views_section('yelp'),
+            header + self._views_section('yelp_aux'),
+        ])
+
+    def test_restore_fails_after_retry(self, db_creds, mysql_dump):
+        with mock.patch.object(mysql_tools, '_run_restore', return_value=1), \
+                pytest.raises(RuntimeError):
+            mysql_tools.restore_mysql_dump_in_parallel(db_creds, mysql_dump, workers=2)
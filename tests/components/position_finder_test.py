@@ -54,3 +54,19 @@ class TestPositionFinder(object):
         )
         position = position_finder.get_position_to_resume_tailing_from()
         assert position.to_dict() == schema_event_position.to_dict()
+
+    def test_get_position_from_start_timestamp(self, gtid_enabled):
+        db_connections = mock.Mock()
+        with mock.patch(
+            'replication_handler.components.position_finder.BinlogTimestampSearcher'
+        ) as mock_searcher:
+            position_finder = PositionFinder(
+                gtid_enabled=gtid_enabled,
+                global_event_state=None,
+                start_timestamp='2016-06-01T00:00:00',
+                db_connections=db_connections,
+            )
+            position = position_finder.get_position_to_resume_tailing_from()
+        mock_searcher.assert_called_once_with(db_connections, gtid_enabled)
+        mock_searcher.return_value.get_position.assert_called_once_with(1464739200)
+        assert position == mock_searcher.return_value.get_position.return_value
@@ -21,6 +21,7 @@ import time
 import mock
 import pytest
 from data_pipeline.message import CreateMessage
+from data_pipeline.message import UpdateMessage
 from data_pipeline.producer import Producer
 from pymysqlreplication.event import QueryEvent
 
@@ -324,6 +325,49 @@ class TestRecoveryHandler(object):
         # after we encounter a supported query event.
         assert len(producer.ensure_messages_published.call_args[0][0]) == 3
 
+    def test_recovery_skips_noise_updates(
+        self,
+        stream,
+        producer,
+        rh_data_event_before_master_log_pos,
+        position_after_master,
+        mock_schema_wrapper,
+        mock_db_connections,
+        mock_source_cursor,
+        patch_get_topic_to_kafka_offset_map,
+        patch_save_position,
+        patch_message_topic,
+        patch_mysql_dump_handler
+    ):
+        noise_update = mock.Mock(DataEvent)
+        noise_update.row = {
+            'before_values': {'id': 42, 'time_updated': 1},
+            'after_values': {'id': 42, 'time_updated': 2},
+        }
+        noise_update.message_type = UpdateMessage
+        noise_update.table = 'business'
+        noise_update.schema = 'yelp'
+        event_list = [
+            rh_data_event_before_master_log_pos,
+            ReplicationHandlerEvent(noise_update, position_after_master),
+        ]
+        with mock.patch.object(
+            config.EnvConfig,
+            'noise_columns',
+            new_callable=mock.PropertyMock
+        ) as mock_noise_columns:
+            mock_noise_columns.return_value = {'yelp.business': ['time_updated']}
+            self._setup_stream_and_recover_for_unclean_shutdown(
+                event_list,
+                stream,
+                producer,
+                mock_schema_wrapper,
+                mock_db_connections,
+                mock_source_cursor,
+            )
+        # The noise update was never published, so it is not replayed.
+        assert len(producer.ensure_messages_published.call_args[0][0]) == 1
+
     def _setup_stream_and_recover_for_unclean_shutdown(
         self,
         event_list,
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.components import schema_catalog
+from replication_handler.components.base_event_handler import Table
+from replication_handler.components.schema_catalog import parse_column_type_map
+from replication_handler.components.schema_catalog import SchemaCatalog
+from replication_handler.components.schema_tracker import SchemaTracker
+from replication_handler.components.schema_tracker import ShowCreateResult
+
+
+class TestSchemaCatalog(object):
+
+    @pytest.fixture
+    def table(self, mock_source_cluster_name):
+        return Table(
+            cluster_name=mock_source_cluster_name,
+            database_name='yelp',
+            table_name='business'
+        )
+
+    @pytest.fixture
+    def create_table_stmt(self):
+        return (
+            "CREATE TABLE `business` (\n"
+            "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `name` varchar(64) DEFAULT NULL,\n"
+            "  `flags` set('a,b','c''d') DEFAULT NULL,\n"
+            "  `time_created` timestamp(6) NOT NULL,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `name_idx` (`name`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+        )
+
+    @pytest.fixture
+    def catalog(self, mock_db_connections):
+        return SchemaCatalog(mock_db_connections, verify_interval_seconds=60)
+
+    @pytest.yield_fixture
+    def patch_show_create(self, table, create_table_stmt):
+        with mock.patch.object(
+            SchemaTracker,
+            'get_show_create_statement'
+        ) as mock_show_create:
+            mock_show_create.return_value = ShowCreateResult(
+                table=table.table_name,
+                query=create_table_stmt
+            )
+            yield mock_show_create
+
+    @pytest.yield_fixture
+    def patch_execute_query(self):
+        with mock.patch.object(SchemaTracker, 'execute_query') as mock_execute_query:
+            yield mock_execute_query
+
+    @pytest.yield_fixture
+    def patch_time(self):
+        with mock.patch.object(schema_catalog.time, 'time') as mock_time:
+            mock_time.return_value = 1000
+            yield mock_time
+
+    def test_parse_column_type_map(self, create_table_stmt):
+        assert parse_column_type_map(create_table_stmt) == {
+            'id': 'int(11) unsigned',
+            'name': 'varchar(64)',
+            'flags': "set('a,b','c''d')",
+            'time_created': 'timestamp(6)',
+        }
+
+    def test_served_from_memory(
+        self,
+        catalog,
+        table,
+        create_table_stmt,
+        patch_show_create,
+        patch_time
+    ):
+        assert catalog.get_show_create_statement(table).query == create_table_stmt
+        assert catalog.get_column_type_map(table)['time_created'] == 'timestamp(6)'
+        assert catalog.get_show_create_statement(table).query == create_table_stmt
+        assert patch_show_create.call_count == 1
+
+    def test_missing_table_not_cached(self, catalog, table, patch_show_create):
+        patch_show_create.return_value = ShowCreateResult(
+            table=table.table_name,
+            query=''
+        )
+        catalog.get_show_create_statement(table)
+        assert table not in catalog.entries
+
+    def test_entry_verified_after_interval(
+        self,
+        catalog,
+        table,
+        create_table_stmt,
+        patch_show_create,
+        patch_time
+    ):
+        catalog.get_show_create_statement(table)
+        patch_time.return_value += 60
+        altered_stmt = create_table_stmt.replace('varchar(64)', 'varchar(128)')
+        patch_show_create.return_value = ShowCreateResult(
+            table=table.table_name,
+            query=altered_stmt
+        )
+        assert catalog.get_show_create_statement(table).query == altered_stmt
+        assert catalog.get_column_type_map(table)['name'] == 'varchar(128)'
+        assert patch_show_create.call_count == 2
+
+    def test_alter_table_drops_entry(
+        self,
+        catalog,
+        table,
+        patch_show_create,
+        patch_execute_query
+    ):
+        other_table = table._replace(table_name='biz')
+        catalog.get_show_create_statement(table)
+        catalog.get_show_create_statement(other_table)
+        catalog.execute_query(
+            'ALTER TABLE business ADD COLUMN bar int(11)',
+            database_name='yelp'
+        )
+        assert patch_execute_query.call_count == 1
+        assert set(catalog.entries) == {other_table}
+
+    @pytest.mark.parametrize('query', [
+        'RENAME TABLE business TO biz',
+        'ALTER TABLE business RENAME TO biz',
+        'DROP TABLE business, biz',
+        'DROP DATABASE yelp',
+    ])
+    def test_multi_table_statements_clear_catalog(
+        self,
+        catalog,
+        table,
+        query,
+        patch_show_create,
+        patch_execute_query
+    ):
+        catalog.get_show_create_statement(table)
+        catalog.execute_query(query, database_name='yelp')
+        assert catalog.entries == {}
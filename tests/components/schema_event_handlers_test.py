@@ -31,8 +31,11 @@ from replication_handler.components.schema_event_handler import SchemaEventHandl
 from replication_handler.components.schema_tracker import SchemaTracker
 from replication_handler.components.schema_tracker import ShowCreateResult
 from replication_handler.components.schema_wrapper import SchemaWrapper
+from replication_handler.components.sql_handler import mysql_statement_factory
 from replication_handler.models.global_event_state import GlobalEventState
+from replication_handler.util.in_flight_tables import InFlightTables
 from replication_handler.util.position import GtidPosition
+from replication_handler.util.published_messages import PublishedMessages
 from replication_handler_testing.events import QueryEvent
 
 
@@ -323,8 +326,21 @@ class TestSchemaEventHandler(object):
             new_callable=mock.PropertyMock
         ) as mock_blacklist:
             mock_blacklist.return_value = []
+            config.env_config.reload_snapshot()
             yield mock_blacklist
 
+    @pytest.yield_fixture
+    def patch_table_whitelist(self, patch_config_db):
+        with mock.patch.object(
+            config.EnvConfig,
+            'table_whitelist',
+            new_callable=mock.PropertyMock
+        ) as mock_whitelist:
+            mock_whitelist.return_value = ['business']
+            config.env_config.reload_snapshot()
+            yield mock_whitelist
+        config.env_config.reload_snapshot()
+
     @pytest.yield_fixture
     def patch_config_register_dry_run(self):
         with mock.patch.object(
@@ -600,6 +616,90 @@ class TestSchemaEventHandler(object):
         # And after
         assert external_patches.upsert_global_event_state.call_count == 1
 
+    def test_save_newest_position_info_after_flush(
+        self,
+        producer,
+        test_position,
+        save_position,
+        external_patches,
+        mock_db_connections,
+        schema_wrapper,
+        stats_counter,
+        mock_create_dump,
+        mock_persist_dump
+    ):
+        schema_event_handler = SchemaEventHandler(
+            db_connections=mock_db_connections,
+            producer=producer,
+            schema_wrapper=schema_wrapper,
+            stats_counter=stats_counter,
+            register_dry_run=False,
+            newest_position_info_callback=lambda: mock.sentinel.newest_position_info
+        )
+        schema_event_handler.handle_event(
+            QueryEvent(schema='yelp', query="CREATE TABLE `cold_table` (`a_number` int)"),
+            test_position
+        )
+        assert producer.flush.call_count == 1
+        save_position.assert_called_once_with(
+            position_data=producer.get_checkpoint_position_data.return_value,
+            state_session=mock_db_connections.state_session,
+            position_info=mock.sentinel.newest_position_info
+        )
+
+    def test_flush_only_for_in_flight_tables(
+        self,
+        producer,
+        test_position,
+        save_position,
+        external_patches,
+        mock_db_connections,
+        schema_wrapper,
+        stats_counter,
+        mock_create_dump,
+        mock_persist_dump
+    ):
+        in_flight_tables = InFlightTables()
+        published_messages = PublishedMessages([in_flight_tables])
+        schema_event_handler = SchemaEventHandler(
+            db_connections=mock_db_connections,
+            producer=producer,
+            schema_wrapper=schema_wrapper,
+            stats_counter=stats_counter,
+            register_dry_run=False,
+            in_flight_tables=in_flight_tables,
+            published_messages=published_messages
+        )
+        position_info = {
+            'table_name': 'business',
+            'position': {'gtid': 'sid:1', 'offset': 0},
+        }
+        business_event = mock.Mock(schema='yelp', table='business')
+        published_messages.mark_published(position_info, business_event)
+
+        schema_event_handler.handle_event(
+            QueryEvent(schema='yelp', query="CREATE TABLE `cold_table` (`a_number` int)"),
+            test_position
+        )
+        assert producer.flush.call_count == 0
+        assert save_position.call_count == 1
+        # The checkpoint waits for the message of yelp.business.
+        assert external_patches.upsert_global_event_state.call_count == 0
+
+        published_messages.mark_delivered_through(position_info)
+        schema_event_handler.save_position(mock.sentinel.position_data)
+        assert save_position.call_count == 2
+        assert external_patches.upsert_global_event_state.call_count == 1
+
+        published_messages.mark_published(position_info, business_event)
+        schema_event_handler.handle_event(
+            QueryEvent(schema='yelp', query="DROP TABLE `business`"),
+            test_position
+        )
+        assert producer.flush.call_count == 1
+        assert not in_flight_tables
+        assert external_patches.upsert_global_event_state.call_count == 2
+
     def test_unsupported_query(
         self,
         producer,
@@ -757,6 +857,194 @@ class TestSchemaEventHandler(object):
             )
             assert mock_statement_factory.call_count == 1
 
+    @pytest.mark.parametrize('query, changes_schema', [
+        ("BEGIN", False),
+        ("CREATE TABLE `business` (`a_number` int)", True),
+    ])
+    def test_changes_schema(self, query, changes_schema, schema_event_handler):
+        query_event = QueryEvent(schema='yelp', query=query)
+        assert schema_event_handler.changes_schema(query_event) == changes_schema
+
+    def test_changes_schema_parses_once(
+        self,
+        skippable,
+        test_position,
+        schema_event_handler
+    ):
+        with mock.patch(
+            'replication_handler.components.schema_event_handler.mysql_statement_factory',
+            mock.Mock()
+        ) as mock_statement_factory:
+            assert not schema_event_handler.changes_schema(skippable)
+            schema_event_handler.handle_event(skippable, test_position)
+            assert mock_statement_factory.call_count == 1
+
+    def test_batched_schema_event_checkpoints(
+        self,
+        producer,
+        test_position,
+        save_position,
+        external_patches,
+        schema_event_handler,
+        mock_create_dump,
+        mock_persist_dump
+    ):
+        schema_event_handler.batch_checkpoints = True
+        schema_event_handler.max_batched_checkpoints = 3
+        for table_name in ['a', 'b']:
+            schema_event_handler.handle_event(
+                QueryEvent(
+                    schema='yelp',
+                    query="CREATE TABLE `{}` (`a_number` int)".format(table_name)
+                ),
+                test_position
+            )
+        assert external_patches.execute_query.call_count == 2
+        assert producer.flush.call_count == 1
+        assert save_position.call_count == 1
+        assert external_patches.upsert_global_event_state.call_count == 0
+        assert schema_event_handler.deferred_checkpoint_count == 2
+
+        schema_event_handler.save_deferred_checkpoint()
+        assert mock_create_dump.call_count == 1
+        assert external_patches.upsert_global_event_state.call_count == 1
+        assert schema_event_handler.deferred_checkpoint is None
+
+        # A long run is checkpointed every max_batched_checkpoints events.
+        for table_name in ['c', 'd', 'e']:
+            schema_event_handler.handle_event(
+                QueryEvent(
+                    schema='yelp',
+                    query="DROP TABLE `{}`".format(table_name)
+                ),
+                test_position
+            )
+        assert external_patches.upsert_global_event_state.call_count == 2
+        assert producer.flush.call_count == 2
+
+    @pytest.mark.parametrize('query', [
+        "ALTER TABLE `user` ADD (`another_number` int)",
+        "DROP TABLE `user_data_pipeline_refresh`",
+        "CREATE INDEX `name_idx` ON `user` (`name`)",
+        "RENAME TABLE `user` TO `_user_old`",
+    ])
+    def test_unwhitelisted_table_statement_skipped(
+        self,
+        query,
+        producer,
+        stats_counter,
+        test_position,
+        save_position,
+        external_patches,
+        schema_event_handler,
+        patch_table_whitelist,
+        mock_create_dump,
+        mock_persist_dump
+    ):
+        schema_event_handler.skip_ddl_for_unwhitelisted_tables = True
+        external_patches.get_show_create_statement.return_value = ShowCreateResult(
+            table='user',
+            query=''
+        )
+        self._assert_query_skipped(
+            schema_event_handler,
+            QueryEvent(schema='yelp', query=query),
+            test_position,
+            external_patches,
+            producer,
+            stats_counter,
+            mock_persist_dump
+        )
+
+    @pytest.mark.parametrize('query', [
+        "CREATE TABLE `business` (`a_number` int)",
+        "DROP TABLE `business_data_pipeline_refresh`",
+        "ALTER TABLE `user` RENAME `business`",
+        "CREATE INDEX `name_idx` ON `business` (`name`)",
+        "RENAME TABLE `business` TO `_business_old`",
+    ])
+    def test_whitelisted_table_statement_not_skipped(
+        self,
+        query,
+        schema_event_handler,
+        patch_table_whitelist
+    ):
+        schema_event_handler.skip_ddl_for_unwhitelisted_tables = True
+        assert not schema_event_handler._is_unwhitelisted_table_statement(
+            mysql_statement_factory(query),
+            'yelp'
+        )
+
+    def test_drop_of_tracked_unwhitelisted_table_not_skipped(
+        self,
+        external_patches,
+        schema_event_handler,
+        patch_table_whitelist
+    ):
+        schema_event_handler.skip_ddl_for_unwhitelisted_tables = True
+        external_patches.get_show_create_statement.return_value = ShowCreateResult(
+            table='_business_old',
+            query="CREATE TABLE `_business_old` (`id` int)"
+        )
+        assert not schema_event_handler._is_unwhitelisted_table_statement(
+            mysql_statement_factory("DROP TABLE `_business_old`"),
+            'yelp'
+        )
+
+    def test_skipped_table_renamed_into_whitelist(
+        self,
+        producer,
+        test_position,
+        save_position,
+        external_patches,
+        schema_event_handler,
+        patch_table_whitelist,
+        mock_source_cursor,
+        mock_create_dump,
+        mock_persist_dump
+    ):
+        schema_event_handler.skip_ddl_for_unwhitelisted_tables = True
+        tracked_tables = {'business'}
+        external_patches.get_show_create_statement.side_effect = lambda table: ShowCreateResult(
+            table=table.table_name,
+            query=(
+                "CREATE TABLE `{}` (`id` int)".format(table.table_name)
+                if table.table_name in tracked_tables else ''
+            )
+        )
+        mock_source_cursor.fetchone.return_value = (
+            'business',
+            "CREATE TABLE `business` (`id` int, `name` varchar(64))"
+        )
+
+        schema_event_handler.handle_event(
+            QueryEvent(schema='yelp', query="CREATE TABLE `_business_new` (`id` int)"),
+            test_position
+        )
+        assert external_patches.execute_query.call_count == 0
+
+        schema_event_handler.handle_event(
+            QueryEvent(
+                schema='yelp',
+                query="RENAME TABLE `business` TO `_business_old`, `_business_new` TO `business`"
+            ),
+            test_position
+        )
+        mock_source_cursor.execute.assert_called_once_with(
+            "SHOW CREATE TABLE `yelp`.`business`"
+        )
+        assert external_patches.execute_query.call_args_list == [
+            mock.call(
+                query="CREATE TABLE `_business_new` (`id` int, `name` varchar(64))",
+                database_name='yelp'
+            ),
+            mock.call(
+                query="RENAME TABLE `yelp`.`business` TO `yelp`.`_business_old`, "
+                "`yelp`.`_business_new` TO `yelp`.`business`",
+                database_name='yelp'
+            ),
+        ]
+
     def _assert_query_skipped(
         self,
         schema_event_handler,
@@ -16,11 +16,15 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import threading
+
 import mock
 import pytest
 from data_pipeline.schematizer_clientlib.models.avro_schema import AvroSchema
 
+from replication_handler import config
 from replication_handler.components.base_event_handler import Table
+from replication_handler.components.column_projection import ColumnProjection
 from replication_handler.components.schema_wrapper import SchemaWrapper
 
 
@@ -237,3 +241,113 @@ class TestSchemaWrapper(object):
         base_schema_wrapper._populate_schema_cache(bar_table, mock.Mock())
         assert isinstance(base_schema_wrapper.cache[bar_table].transformation_map, dict)
         assert len(base_schema_wrapper.cache[bar_table].transformation_map) == 0
+
+    @pytest.fixture
+    def prefetch_table(self):
+        return Table(
+            cluster_name="yelp_main",
+            database_name='yelp',
+            table_name='prefetch_table'
+        )
+
+    @pytest.yield_fixture
+    def fetch_released(self, base_schema_wrapper, test_response):
+        released = threading.Event()
+
+        def fetch_schema(table):
+            released.wait()
+            base_schema_wrapper._populate_schema_cache(table, test_response)
+
+        with mock.patch.object(
+            base_schema_wrapper,
+            '_fetch_schema_for_table',
+            side_effect=fetch_schema
+        ):
+            yield released
+        released.set()
+        base_schema_wrapper.wait_for_pending_fetches()
+
+    def test_prefetch(self, base_schema_wrapper, prefetch_table, fetch_released):
+        base_schema_wrapper.prefetch(prefetch_table)
+        base_schema_wrapper.prefetch(prefetch_table)
+        assert not base_schema_wrapper.is_ready(prefetch_table)
+
+        fetch_released.set()
+        self._assert_expected_result(base_schema_wrapper[prefetch_table])
+        assert base_schema_wrapper.is_ready(prefetch_table)
+        assert base_schema_wrapper._fetch_schema_for_table.call_count == 1
+        del base_schema_wrapper.cache[prefetch_table]
+
+    def test_prefetch_failure_raises_on_lookup(
+        self,
+        base_schema_wrapper,
+        prefetch_table,
+        fetch_released
+    ):
+        base_schema_wrapper._fetch_schema_for_table.side_effect = ValueError()
+        base_schema_wrapper.prefetch(prefetch_table)
+        with pytest.raises(ValueError):
+            base_schema_wrapper[prefetch_table]
+        assert prefetch_table not in base_schema_wrapper._pending_fetches
+
+    @pytest.yield_fixture
+    def patch_column_projection(self, base_schema_wrapper):
+        with mock.patch.object(
+            base_schema_wrapper,
+            'column_projection',
+            ColumnProjection({'yelp.projected_table': {'exclude': ['photo', 'time_created']}})
+        ), mock.patch.object(
+            config.EnvConfig,
+            'register_dry_run',
+            new_callable=mock.PropertyMock,
+            return_value=False
+        ):
+            yield
+
+    def test_register_projected_schema(
+        self,
+        base_schema_wrapper,
+        test_response,
+        patch_column_projection
+    ):
+        projected_table = Table(
+            cluster_name="yelp_main",
+            database_name='yelp',
+            table_name='projected_table'
+        )
+        create_table_stmt = (
+            "CREATE TABLE `projected_table` (\n"
+            "  `id` int(11) NOT NULL,\n"
+            "  `photo` blob,\n"
+            "  `time_created` timestamp(6) NOT NULL,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `time_created_idx` (`time_created`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+        )
+        base_schema_wrapper.schema_tracker.get_column_type_map.return_value = {
+            'id': 'int(11)',
+            'photo': 'blob',
+            'time_created': 'timestamp(6)',
+        }
+        with mock.patch.object(
+            base_schema_wrapper,
+            'schematizer_client'
+        ) as mock_schematizer_client:
+            mock_schematizer_client.register_schema_from_mysql_stmts.return_value = (
+                test_response
+            )
+            base_schema_wrapper.register_with_schema_store(
+                projected_table,
+                new_create_table_stmt=create_table_stmt
+            )
+            register_kwargs = (
+                mock_schematizer_client.register_schema_from_mysql_stmts.call_args[1]
+            )
+        assert register_kwargs['new_create_table_stmt'] == (
+            "CREATE TABLE `projected_table` (\n"
+            "  `id` int(11) NOT NULL,\n"
+            "  PRIMARY KEY (`id`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+        )
+        assert base_schema_wrapper.cache[projected_table].transformation_map == {}
+        del base_schema_wrapper.cache[projected_table]
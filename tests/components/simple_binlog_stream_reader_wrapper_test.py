@@ -23,6 +23,8 @@ import pytest
 from pymysqlreplication.event import GtidEvent
 from pymysqlreplication.event import QueryEvent
 
+from replication_handler.components import simple_binlog_stream_reader_wrapper
+from replication_handler.components.low_level_binlog_stream_reader_wrapper import SkippedRows
 from replication_handler.components.simple_binlog_stream_reader_wrapper import SimpleBinlogStreamReaderWrapper
 from replication_handler.util.misc import DataEvent
 from replication_handler.util.misc import ReplicationHandlerEvent
@@ -40,10 +42,10 @@ class TestSimpleBinlogStreamReaderWrapper(object):
             yield mock_stream
 
     def test_yield_events_when_gtid_enabled(self, mock_db_connections, patch_stream):
-        gtid_event_0 = mock.Mock(spec=GtidEvent, gtid="sid:11")
+        gtid_event_0 = mock.Mock(spec=GtidEvent, gtid="sid:11", timestamp=1445429127)
         query_event_0 = mock.Mock(spec=QueryEvent)
         query_event_1 = mock.Mock(spec=QueryEvent)
-        gtid_event_1 = mock.Mock(spec=GtidEvent, gtid="sid:12")
+        gtid_event_1 = mock.Mock(spec=GtidEvent, gtid="sid:12", timestamp=1445429127)
         data_event_0 = mock.Mock(spec=DataEvent)
         data_event_1 = mock.Mock(spec=DataEvent)
         data_event_2 = mock.Mock(spec=DataEvent)
@@ -87,6 +89,70 @@ class TestSimpleBinlogStreamReaderWrapper(object):
             assert replication_event.position.gtid == result.position.gtid
             assert replication_event.position.offset == result.position.offset
 
+    def test_skipped_rows_count_towards_offsets(self, mock_db_connections, patch_stream):
+        gtid_event_0 = mock.Mock(spec=GtidEvent, gtid="sid:11", timestamp=1445429127)
+        skipped_rows = SkippedRows(schema='test', table='fake_table', row_count=3)
+        data_event_0 = mock.Mock(spec=DataEvent)
+        data_event_1 = mock.Mock(spec=DataEvent)
+        event_list = [gtid_event_0, skipped_rows, data_event_0, data_event_1]
+        patch_stream.return_value.peek.side_effect = event_list
+        patch_stream.return_value.pop.side_effect = event_list
+        # data_event_0 comes after the 3 skipped rows, at offset 3.
+        stream = SimpleBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            GtidPosition(gtid="sid:10", offset=3),
+            gtid_enabled=True
+        )
+        replication_event = stream.pop()
+        assert replication_event.event == data_event_1
+        assert replication_event.position.offset == 4
+
+    def test_replay_offsets_the_way_they_were_counted(
+        self,
+        mock_db_connections,
+        patch_stream
+    ):
+        data_event_0 = mock.Mock(spec=DataEvent)
+        data_event_1 = mock.Mock(spec=DataEvent)
+        gtid_event_1 = mock.Mock(spec=GtidEvent, gtid="sid:12", timestamp=1445429127)
+        query_event_1 = mock.Mock(spec=QueryEvent)
+        event_list = [data_event_0, data_event_1, gtid_event_1, query_event_1]
+        patch_stream.return_value.peek.side_effect = event_list
+        patch_stream.return_value.pop.side_effect = event_list
+        stream = SimpleBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            GtidPosition(gtid="sid:11", offset=0, counts_skipped_rows=True),
+            gtid_enabled=True
+        )
+        assert patch_stream.return_value.count_skipped_rows is True
+        assert stream.pop().position.counts_skipped_rows is True
+        # The configured way is used from the next position update on.
+        assert stream.pop().position.counts_skipped_rows is False
+        assert patch_stream.return_value.count_skipped_rows is False
+
+    def test_delay_from_gtid_event_timestamps(self, mock_db_connections, patch_stream):
+        gtid_event = mock.Mock(spec=GtidEvent, gtid="sid:11", timestamp=1445429127)
+        data_event = mock.Mock(spec=DataEvent)
+        event_list = [gtid_event, data_event]
+        patch_stream.return_value.peek.side_effect = event_list
+        patch_stream.return_value.pop.side_effect = event_list
+        stream = SimpleBinlogStreamReaderWrapper(
+            mock_db_connections.source_database_config,
+            mock_db_connections.tracker_database_config,
+            GtidPosition(gtid="sid:10"),
+            gtid_enabled=True
+        )
+        assert stream.delay_seconds is None
+        with mock.patch.object(
+            simple_binlog_stream_reader_wrapper.time,
+            'time',
+            return_value=1445429137
+        ):
+            stream.pop()
+        assert stream.delay_seconds == 10
+
     def test_meteorite_and_sensu_alert(
         self,
         mock_db_connections,
@@ -16,8 +16,10 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import mock
 import pytest
 
+from replication_handler import config
 from replication_handler.components.sql_handler import AlterDatabaseStatement
 from replication_handler.components.sql_handler import AlterTableStatement
 from replication_handler.components.sql_handler import CreateDatabaseStatement
@@ -33,6 +35,19 @@ from replication_handler.components.sql_handler import RenameTableStatement
 from replication_handler.components.sql_handler import UnsupportedStatement
 
 
+@pytest.yield_fixture(autouse=True, params=[False, True], ids=['sqlparse', 'lexer'])
+def ddl_lexer_enabled(request):
+    """Runs every test against both sqlparse and the hand written lexer."""
+    with mock.patch.object(
+        config.EnvConfig,
+        'ddl_lexer_enabled',
+        new_callable=mock.PropertyMock
+    ) as mock_ddl_lexer_enabled:
+        mock_ddl_lexer_enabled.return_value = request.param
+        config.env_config.reload_snapshot()
+        yield request.param
+
+
 class MysqlStatementBaseTest(object):
     @pytest.fixture
     def statement(self, query):
@@ -356,6 +371,19 @@ class DropIndexStatementTest(MysqlIndexStatementBaseTest):
         )
 
 
+class TestIndexStatementTable(object):
+    @pytest.mark.parametrize("query, database_name, table", [
+        ("CREATE INDEX `name_idx` ON `business` (`name`)", None, 'business'),
+        ("CREATE UNIQUE INDEX name_idx ON yelp.business (name)", 'yelp', 'business'),
+        ("DROP INDEX `name_idx` ON `yelp`.`business`", 'yelp', 'business'),
+        ("DROP INDEX name_idx", None, None),
+    ])
+    def test_table(self, query, database_name, table):
+        statement = mysql_statement_factory(query)
+        assert statement.database_name == database_name
+        assert statement.table == table
+
+
 class TestRenameTableStatement(MysqlStatementBaseTest):
     @pytest.fixture
     def statement_type(self):
@@ -366,6 +394,19 @@ class TestRenameTableStatement(MysqlStatementBaseTest):
     def query(self):
         return "RENAME TABLE `a` TO `b`"
 
+    def test_get_renamed_tables(self, statement):
+        assert statement.get_renamed_tables() == [((None, 'a'), (None, 'b'))]
+
+    def test_get_renamed_tables_of_swap(self):
+        statement = mysql_statement_factory(
+            "rename /* gh-ost */ table `yelp`.`business` to `yelp`.`_business_old`, "
+            "_business_new TO business;"
+        )
+        assert statement.get_renamed_tables() == [
+            (('yelp', 'business'), ('yelp', '_business_old')),
+            ((None, '_business_new'), (None, 'business')),
+        ]
+
 
 class TestUnsupportedStatement(MysqlStatementBaseTest):
     @pytest.fixture
@@ -2,8 +2,10 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import mock
 import pytest
 
+from replication_handler.config import ConfigSnapshot
 from replication_handler.config import EnvConfig
 
 
@@ -14,3 +16,33 @@ class TestConfig(object):
 
     def test_rbr_source_cluster_topology_name_default(self, config):
         assert config.rbr_source_cluster_topology_name is None
+
+    def test_snapshot(self, config):
+        snapshot = config.snapshot
+        assert isinstance(snapshot, ConfigSnapshot)
+        assert isinstance(snapshot.schema_blacklist, frozenset)
+        assert 'yelp_heartbeat' in snapshot.schema_blacklist
+        assert config.snapshot is snapshot
+
+    def test_reload_snapshot_swaps_snapshot(self, config):
+        old_snapshot = config.snapshot
+        with mock.patch.object(
+            EnvConfig,
+            'schema_blacklist',
+            new_callable=mock.PropertyMock
+        ) as mock_blacklist:
+            mock_blacklist.return_value = ['fake_database']
+            new_snapshot = config.reload_snapshot()
+        assert config.snapshot is new_snapshot
+        assert new_snapshot.schema_blacklist == frozenset(['fake_database'])
+        assert 'fake_database' not in old_snapshot.schema_blacklist
+
+    def test_table_whitelist(self):
+        snapshot = ConfigSnapshot(
+            schema_blacklist=frozenset(),
+            table_whitelist=frozenset(['business']),
+            ddl_lexer_enabled=False,
+        )
+        assert snapshot.is_table_whitelisted('business')
+        assert not snapshot.is_table_whitelisted('user')
+        assert snapshot._replace(table_whitelist=None).is_table_whitelisted('user')
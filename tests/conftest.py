@@ -31,6 +31,7 @@ from MySQLdb.cursors import Cursor
 
 from replication_handler.components import data_event_handler
 from replication_handler.components import recovery_handler
+from replication_handler.config import env_config
 from replication_handler.environment_configs import is_envvar_set
 from replication_handler.models.connections.base_connection import BaseConnection
 from replication_handler.testing_helper.util import db_health_check
@@ -343,3 +344,12 @@ def patch_transaction_id_schema_id(fake_transaction_id_schema_id):
         mock_data_event_transaction_id_schema_id.return_value = fake_transaction_id_schema_id
         mock_recovery_transaction_id_schema_id.return_value = fake_transaction_id_schema_id
         yield
+
+
+@pytest.yield_fixture(autouse=True)
+def reset_config_snapshot():
+    """Tests patch EnvConfig properties and rebuild the snapshot, so it's
+    rebuilt from the unpatched config after every test.
+    """
+    yield
+    env_config.reload_snapshot()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import mock
+import pytest
+
+from replication_handler.util.binlog_backlog import BinlogBacklogSampler
+from replication_handler.util.binlog_backlog import bytes_between
+
+
+class TestBinlogBacklogSampler(object):
+
+    @pytest.fixture
+    def log_file_sizes(self):
+        return OrderedDict([
+            ('mysql-bin.000001', 1000),
+            ('mysql-bin.000002', 2000),
+            ('mysql-bin.000003', 500),
+        ])
+
+    @pytest.fixture
+    def sampler(self):
+        return BinlogBacklogSampler(mock.Mock(), sample_interval_seconds=10)
+
+    @pytest.mark.parametrize('start, end, expected', [
+        (('mysql-bin.000002', 100), ('mysql-bin.000002', 400), 300),
+        (('mysql-bin.000001', 400), ('mysql-bin.000003', 100), 2700),
+        (('mysql-bin.000000', 400), ('mysql-bin.000003', 100), None),
+    ])
+    def test_bytes_between(self, log_file_sizes, start, end, expected):
+        assert bytes_between(start, end, log_file_sizes) == expected
+
+    def test_sample(self, sampler, log_file_sizes):
+        sampler._sample(100, ('mysql-bin.000001', 400), log_file_sizes)
+        assert sampler.gauges() == {
+            'backlog_bytes': 3100,
+            'read_bytes_per_second': None,
+            'write_bytes_per_second': None,
+            'catch_up_eta_seconds': None,
+        }
+
+        log_file_sizes['mysql-bin.000003'] = 600
+        sampler._sample(110, ('mysql-bin.000002', 400), log_file_sizes)
+        assert sampler.gauges() == {
+            'backlog_bytes': 2200,
+            'read_bytes_per_second': 100.0,
+            'write_bytes_per_second': 10.0,
+            'catch_up_eta_seconds': 2200 / 90.0,
+        }
+
+    def test_no_eta_when_backlog_grows(self, sampler, log_file_sizes):
+        sampler._sample(100, ('mysql-bin.000003', 100), log_file_sizes)
+        log_file_sizes['mysql-bin.000003'] = 700
+        sampler._sample(110, ('mysql-bin.000003', 200), log_file_sizes)
+        assert sampler.backlog_bytes == 500
+        assert sampler.catch_up_eta_seconds is None
+
+    def test_periodic_process_samples_once_per_interval(self, sampler, log_file_sizes):
+        with mock.patch.object(
+            sampler,
+            '_get_log_file_sizes',
+            return_value=log_file_sizes
+        ) as mock_get_log_file_sizes:
+            sampler.periodic_process('mysql-bin.000003', 100)
+            sampler.periodic_process('mysql-bin.000003', 200)
+        assert mock_get_log_file_sizes.call_count == 1
+        assert sampler.backlog_bytes == 400
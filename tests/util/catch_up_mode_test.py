@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import logging
+
+import pytest
+
+from replication_handler.components import base_event_handler
+from replication_handler.components import simple_binlog_stream_reader_wrapper
+from replication_handler.components import sql_handler
+from replication_handler.util.catch_up_mode import CatchUpMode
+from replication_handler.util.catch_up_mode import PER_EVENT_LOGGERS
+
+
+class TestCatchUpMode(object):
+
+    @pytest.yield_fixture
+    def catch_up_mode(self):
+        catch_up_mode = CatchUpMode(enter_delay_seconds=600, exit_delay_seconds=60)
+        yield catch_up_mode
+        if catch_up_mode.active:
+            catch_up_mode.update(0)
+
+    def test_hysteresis(self, catch_up_mode):
+        assert not catch_up_mode.update(599)
+        assert catch_up_mode.update(600)
+        assert catch_up_mode.active
+        assert not catch_up_mode.update(300)
+        assert not catch_up_mode.update(None)
+        assert catch_up_mode.active
+        assert catch_up_mode.update(59)
+        assert not catch_up_mode.active
+        assert not catch_up_mode.update(300)
+        assert (catch_up_mode.enter_count, catch_up_mode.exit_count) == (1, 1)
+
+    @pytest.yield_fixture
+    def per_event_loggers(self):
+        loggers = [
+            base_event_handler.log,
+            simple_binlog_stream_reader_wrapper.log,
+            sql_handler.log,
+        ]
+        levels = [logger.level for logger in loggers]
+        yield loggers
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+    def test_per_event_logging_reduced(self, catch_up_mode, per_event_loggers):
+        assert [logger.name for logger in per_event_loggers] == list(PER_EVENT_LOGGERS)
+        base_event_handler.log.setLevel(logging.DEBUG)
+        catch_up_mode.update(600)
+        for logger in per_event_loggers:
+            assert logger.level == logging.WARNING
+        catch_up_mode.update(0)
+        assert base_event_handler.log.level == logging.DEBUG
+        assert simple_binlog_stream_reader_wrapper.log.level == logging.NOTSET
+
+    def test_exit_delay_above_enter_delay(self):
+        with pytest.raises(ValueError):
+            CatchUpMode(enter_delay_seconds=60, exit_delay_seconds=600)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+
+import mock
+import pytest
+
+from replication_handler.util import continuous_profiler
+from replication_handler.util.continuous_profiler import ContinuousProfiler
+
+
+class TestContinuousProfiler(object):
+
+    @pytest.yield_fixture
+    def patch_vmprof(self):
+        with mock.patch.object(continuous_profiler, 'vmprof') as mock_vmprof:
+            yield mock_vmprof
+
+    @pytest.yield_fixture
+    def patch_time(self):
+        with mock.patch.object(continuous_profiler.time, 'time') as mock_time:
+            mock_time.return_value = 1445429127.0
+            yield mock_time
+
+    @pytest.fixture
+    def profile_dir(self, tmpdir):
+        return tmpdir.join('profiles').strpath
+
+    def _build_profiler(self, profile_dir, delay_threshold_seconds=None, max_files=2):
+        return ContinuousProfiler(
+            profile_dir=profile_dir,
+            sampling_period_seconds=0.01,
+            rotation_interval_seconds=60,
+            max_files=max_files,
+            delay_threshold_seconds=delay_threshold_seconds
+        )
+
+    def test_always_on_without_threshold(self, profile_dir, patch_vmprof, patch_time):
+        profiler = self._build_profiler(profile_dir)
+        profiler.periodic_process(delay_seconds=None)
+        assert profiler.running
+        assert patch_vmprof.enable.call_count == 1
+        assert patch_vmprof.enable.call_args[1] == {'period': 0.01}
+        assert os.listdir(profile_dir) == ['repl-20151021T120527.000000.vmprof']
+        profiler.stop()
+
+    def test_delay_threshold(self, profile_dir, patch_vmprof, patch_time):
+        profiler = self._build_profiler(profile_dir, delay_threshold_seconds=30)
+        profiler.periodic_process(delay_seconds=10)
+        assert not profiler.running
+
+        patch_time.return_value += 1
+        profiler.periodic_process(delay_seconds=45)
+        assert profiler.running
+
+        patch_time.return_value += 1
+        profiler.periodic_process(delay_seconds=5)
+        assert not profiler.running
+        assert patch_vmprof.disable.call_count == 1
+
+    def test_checks_are_rate_limited(self, profile_dir, patch_vmprof, patch_time):
+        profiler = self._build_profiler(profile_dir, delay_threshold_seconds=30)
+        profiler.periodic_process(delay_seconds=10)
+        profiler.periodic_process(delay_seconds=45)
+        assert not profiler.running
+
+    def test_rotation_and_retention(self, profile_dir, patch_vmprof, patch_time):
+        profiler = self._build_profiler(profile_dir, max_files=2)
+        profiler.periodic_process()
+        for _ in range(3):
+            patch_time.return_value += 60
+            profiler.periodic_process()
+        profiler.stop()
+
+        assert patch_vmprof.enable.call_count == 4
+        assert patch_vmprof.disable.call_count == 4
+        assert sorted(os.listdir(profile_dir)) == [
+            'repl-20151021T120727.000000.vmprof',
+            'repl-20151021T120827.000000.vmprof',
+        ]
+
+    def test_rotate_when_stopped(self, profile_dir, patch_vmprof):
+        profiler = self._build_profiler(profile_dir)
+        profiler.rotate()
+        assert not profiler.running
+        assert patch_vmprof.enable.call_count == 0
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+
+import mock
+import pytest
+
+from replication_handler.util import heap_snapshot
+from replication_handler.util.heap_snapshot import HeapSnapshot
+
+
+class TestHeapSnapshot(object):
+
+    @pytest.fixture
+    def snapshot_file(self, tmpdir):
+        return tmpdir.join('heap_snapshot.log').strpath
+
+    def _build_heap_snapshot(self, snapshot_file, max_bytes=10 ** 6, interval_seconds=0):
+        return HeapSnapshot(
+            file_path=snapshot_file,
+            max_bytes=max_bytes,
+            backup_count=1,
+            top_n=3,
+            interval_seconds=interval_seconds
+        )
+
+    def test_write(self, snapshot_file):
+        snapshot = self._build_heap_snapshot(snapshot_file)
+        snapshot.write({'schema_wrapper_cache': 12})
+        snapshot.stop()
+        with open(snapshot_file) as f:
+            lines = f.read().splitlines()
+        assert lines[0].startswith("Heap snapshot at ")
+        assert "  schema_wrapper_cache: 12" in lines
+        object_lines = lines[lines.index("Objects by type:") + 1:]
+        assert len(object_lines) == 3
+
+    def test_file_rotated(self, snapshot_file):
+        snapshot = self._build_heap_snapshot(snapshot_file, max_bytes=100)
+        for _ in range(3):
+            snapshot.write({})
+        snapshot.stop()
+        assert sorted(os.listdir(os.path.dirname(snapshot_file))) == [
+            'heap_snapshot.log',
+            'heap_snapshot.log.1',
+        ]
+
+    def test_periodic_process(self, snapshot_file):
+        with mock.patch.object(heap_snapshot.time, 'time', return_value=0):
+            snapshot = self._build_heap_snapshot(snapshot_file, interval_seconds=60)
+        get_cache_sizes = mock.Mock(return_value={})
+        with mock.patch.object(snapshot, 'write') as mock_write, mock.patch.object(
+            heap_snapshot.time, 'time'
+        ) as mock_time:
+            for now in (30, 60, 90):
+                mock_time.return_value = now
+                snapshot.periodic_process(get_cache_sizes)
+        assert mock_write.call_count == 1
+        assert get_cache_sizes.call_count == 1
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+from data_pipeline.message import CreateMessage
+from data_pipeline.message import UpdateMessage
+
+from replication_handler.util.heavy_hitters import HeavyHitter
+from replication_handler.util.heavy_hitters import SpaceSaving
+from replication_handler.util.heavy_hitters import TableHeavyHitters
+
+
+class TestSpaceSaving(object):
+
+    def test_top(self):
+        space_saving = SpaceSaving(capacity=3)
+        for key, weight in [('a', 5), ('b', 3), ('c', 1), ('a', 2)]:
+            space_saving.add(key, weight)
+        assert space_saving.top(2) == [
+            HeavyHitter(key='a', count=7, error=0),
+            HeavyHitter(key='b', count=3, error=0),
+        ]
+
+    def test_eviction_keeps_heavy_hitters(self):
+        space_saving = SpaceSaving(capacity=3)
+        for i in range(100):
+            space_saving.add('bulk')
+            space_saving.add('key_{}'.format(i))
+        top = space_saving.top(1)[0]
+        assert top.key == 'bulk'
+        assert top.count == 100
+        assert len(space_saving.top(10)) == 3
+
+    def test_evicted_key_inherits_min_count(self):
+        space_saving = SpaceSaving(capacity=2)
+        space_saving.add('a', 5)
+        space_saving.add('b', 2)
+        space_saving.add('c', 1)
+        assert space_saving.top(2) == [
+            HeavyHitter(key='a', count=5, error=0),
+            HeavyHitter(key='c', count=3, error=2),
+        ]
+
+    def test_eviction_skips_outdated_heap_entries(self):
+        space_saving = SpaceSaving(capacity=2)
+        space_saving.add('a', 1)
+        space_saving.add('b', 2)
+        # The heap entry of a still has its first count.
+        space_saving.add('a', 5)
+        space_saving.add('c', 1)
+        assert space_saving.top(2) == [
+            HeavyHitter(key='a', count=6, error=0),
+            HeavyHitter(key='c', count=3, error=2),
+        ]
+
+
+class TestTableHeavyHitters(object):
+
+    def _event(self, table, message_type, read_at):
+        return mock.Mock(
+            schema='yelp',
+            table=table,
+            message_type=message_type,
+            row_size=11,
+            read_at=read_at,
+        )
+
+    def test_record(self):
+        table_heavy_hitters = TableHeavyHitters(capacity=10, top_n=1, log_interval_seconds=60)
+        table_heavy_hitters.record(self._event('business', CreateMessage, 9.0), 10.0)
+        table_heavy_hitters.record(self._event('business', CreateMessage, 9.5), 10.0)
+        table_heavy_hitters.record(self._event('review', UpdateMessage, 5.0), 10.0)
+        top = table_heavy_hitters.top()
+        assert top['rows'] == [
+            HeavyHitter(key=('yelp', 'business', 'CreateMessage'), count=2, error=0)
+        ]
+        assert top['bytes'][0].key == ('yelp', 'business', 'CreateMessage')
+        assert top['seconds'] == [
+            HeavyHitter(key=('yelp', 'review', 'UpdateMessage'), count=5.0, error=0)
+        ]
+
+    def test_top_logged_periodically(self):
+        with mock.patch('time.time', return_value=0):
+            table_heavy_hitters = TableHeavyHitters(capacity=10, top_n=1, log_interval_seconds=60)
+        with mock.patch.object(table_heavy_hitters, 'log_top') as mock_log_top:
+            table_heavy_hitters.record(self._event('business', CreateMessage, None), 30)
+            table_heavy_hitters.record(self._event('business', CreateMessage, None), 60)
+            table_heavy_hitters.record(self._event('business', CreateMessage, None), 90)
+        assert mock_log_top.call_count == 1
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.util.in_flight_memory import estimate_row_size
+from replication_handler.util.in_flight_memory import InFlightMemory
+from replication_handler.util.in_flight_memory import VALUE_OVERHEAD_BYTES
+
+
+class TestInFlightMemory(object):
+
+    @pytest.fixture
+    def in_flight_memory(self):
+        return InFlightMemory(max_bytes=100)
+
+    def _publish(self, in_flight_memory, size):
+        in_flight_memory.add(size)
+        return in_flight_memory.mark_published(mock.Mock(row_size=size))
+
+    def test_estimate_row_size(self):
+        assert estimate_row_size({'values': {'id': 1, 'name': 'abc', 'blob': b'x' * 10}}) == (
+            3 * VALUE_OVERHEAD_BYTES + 13
+        )
+        assert estimate_row_size({
+            'before_values': {'name': 'a'},
+            'after_values': {'name': 'bc'},
+        }) == 2 * VALUE_OVERHEAD_BYTES + 3
+
+    def test_limit(self, in_flight_memory):
+        in_flight_memory.add(99)
+        assert not in_flight_memory.is_over_limit
+        in_flight_memory.add(1)
+        assert in_flight_memory.is_over_limit
+        assert in_flight_memory.peak_in_flight_bytes == 100
+
+    def test_mark_delivered(self, in_flight_memory):
+        sizes = [self._publish(in_flight_memory, 10) for _ in range(3)]
+        in_flight_memory.mark_delivered(sizes[:2])
+        assert in_flight_memory.in_flight_bytes == 10
+        assert in_flight_memory.published_bytes == 10
+
+    def test_unpublished_rows_not_released(self, in_flight_memory):
+        size = self._publish(in_flight_memory, 10)
+        in_flight_memory.add(20)
+        in_flight_memory.mark_delivered([size])
+        assert in_flight_memory.in_flight_bytes == 20
+        assert in_flight_memory.published_bytes == 0
+        assert in_flight_memory.peak_in_flight_bytes == 30
+
+    def test_gauges(self, in_flight_memory):
+        self._publish(in_flight_memory, 10)
+        in_flight_memory.record_pause(0.5)
+        assert in_flight_memory.gauges() == {
+            'in_flight_bytes': 10,
+            'peak_in_flight_bytes': 10,
+            'producer_buffered_bytes': 10,
+            'pause_count': 1,
+            'paused_seconds': 0.5,
+        }
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.util.in_flight_tables import InFlightTables
+
+
+class TestInFlightTables(object):
+
+    @pytest.fixture
+    def in_flight_tables(self):
+        return InFlightTables()
+
+    @pytest.fixture
+    def published_tables(self, in_flight_tables):
+        return [
+            in_flight_tables.mark_published(mock.Mock(schema='yelp', table=table_name))
+            for table_name in ['business', 'user', 'business']
+        ]
+
+    def test_mark_delivered(self, in_flight_tables, published_tables):
+        assert in_flight_tables
+        in_flight_tables.mark_delivered(published_tables[:2])
+        assert ('yelp', 'business') in in_flight_tables
+        assert ('yelp', 'user') not in in_flight_tables
+        assert (in_flight_tables.published_count, in_flight_tables.delivered_count) == (3, 2)
+
+        in_flight_tables.mark_delivered(published_tables[2:])
+        assert not in_flight_tables
+        assert ('yelp', 'business') not in in_flight_tables
+        assert in_flight_tables.delivered_count == 3
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.util.message_latency import LatencyHistogram
+from replication_handler.util.message_latency import MessageLatency
+
+
+class TestMessageLatency(object):
+
+    @pytest.fixture
+    def message_latency(self):
+        return MessageLatency(slow_threshold_seconds=10, max_slow_traces=2)
+
+    def _publish(self, message_latency, timestamp=100, read_at=101.0, published_at=101.5):
+        event = mock.Mock(schema='yelp', table='business', timestamp=timestamp, read_at=read_at)
+        with mock.patch('time.time', return_value=published_at):
+            return message_latency.mark_published(event)
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.03, 0.04, 0.3, 400):
+            histogram.add(seconds)
+        assert histogram.to_dict() == {
+            'count': 4,
+            'mean': 100.0925,
+            'p50': 0.05,
+            'p99': 400,
+            'max': 400,
+        }
+
+    def test_mark_delivered(self, message_latency):
+        traces = [self._publish(message_latency) for _ in range(3)]
+        assert not message_latency.stats()
+        with mock.patch('time.time', return_value=102.0):
+            message_latency.mark_delivered(traces[:2])
+        stats = message_latency.stats()['yelp.business']
+        assert stats['commit_to_read']['count'] == 2
+        assert stats['commit_to_read']['max'] == 1.0
+        assert stats['read_to_publish']['max'] == 0.5
+        assert stats['publish_to_ack']['max'] == 0.5
+        assert stats['end_to_end']['max'] == 2.0
+
+    def test_unread_messages_only_traced_end_to_end(self, message_latency):
+        trace = self._publish(message_latency, read_at=None)
+        with mock.patch('time.time', return_value=102.0):
+            message_latency.mark_delivered([trace])
+        assert set(message_latency.stats()['yelp.business']) == {'publish_to_ack', 'end_to_end'}
+
+    def test_slow_traces(self, message_latency):
+        traces = [self._publish(message_latency, published_at=150.0) for _ in range(3)]
+        traces.append(self._publish(message_latency, timestamp=149, read_at=149.5))
+        with mock.patch('time.time', return_value=150.0):
+            message_latency.mark_delivered(traces)
+        assert len(message_latency.slow_traces) == 2
+        assert message_latency.slow_traces[-1] == {
+            'table': 'yelp.business',
+            'commit_to_read': 1.0,
+            'read_to_publish': 49.0,
+            'publish_to_ack': 0.0,
+            'end_to_end': 50.0,
+        }
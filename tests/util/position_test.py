@@ -55,6 +55,11 @@ class TestGtidPosition(object):
         assert p.to_replication_dict() == {"auto_position": "sid:1-10"}
         assert p.offset == 10
 
+    def test_replication_dict_executed_gtid_set(self):
+        p = GtidPosition(executed_gtid_set="sid:1-10:12,\nsid2:5-7")
+        assert p.to_replication_dict() == {"auto_position": "sid:1-11:12-13,sid2:5-8"}
+        assert p.to_dict() == {}
+
     def test_dict_just_gtid(self):
         p = GtidPosition(gtid="sid:10")
         assert p.to_dict() == {"gtid": "sid:10"}
@@ -159,6 +164,17 @@ class TestConstructPosition(object):
         assert position.hb_serial == 123
         assert position.hb_timestamp == 456
 
+    def test_construct_position_counts_skipped_rows(self):
+        position = GtidPosition(gtid="sid:1", offset=10, counts_skipped_rows=False)
+        assert position.to_dict() == {
+            "gtid": "sid:1",
+            "offset": 10,
+            "counts_skipped_rows": False,
+        }
+        assert construct_position(position.to_dict()).counts_skipped_rows is False
+        # Positions saved before the flag existed counted skipped rows.
+        assert construct_position({"gtid": "sid:1", "offset": 10}).counts_skipped_rows is True
+
     def test_invalid_position_dict(self):
         with pytest.raises(InvalidPositionDictException):
             construct_position({"position": "invalid"})
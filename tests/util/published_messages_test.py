@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.util.published_messages import get_position_key
+from replication_handler.util.published_messages import PublishedMessages
+
+
+class TestPublishedMessages(object):
+
+    @pytest.fixture
+    def trackers(self):
+        return [
+            mock.Mock(**{'mark_published.side_effect': lambda event: event.offset}),
+            mock.Mock(**{'mark_published.side_effect': lambda event: -event.offset}),
+        ]
+
+    @pytest.fixture
+    def published_messages(self, trackers):
+        published_messages = PublishedMessages(trackers)
+        for offset in range(3):
+            published_messages.mark_published(self._position_info(offset), mock.Mock(offset=offset))
+        return published_messages
+
+    def _position_info(self, offset):
+        return {
+            'table_name': 'business',
+            'position': {'log_file': 'binlog.001', 'log_pos': 4, 'offset': offset},
+        }
+
+    def test_get_position_key(self):
+        assert get_position_key(self._position_info(1)) == get_position_key({
+            'table_name': 'business',
+            'position': {'offset': 1, 'log_pos': 4, 'log_file': 'binlog.001'},
+        })
+
+    def test_mark_delivered_through(self, published_messages, trackers):
+        published_messages.mark_delivered_through(self._position_info(1))
+        trackers[0].mark_delivered.assert_called_once_with([0, 1])
+        trackers[1].mark_delivered.assert_called_once_with([0, -1])
+
+        # Positions already delivered deliver nothing again.
+        published_messages.mark_delivered_through(self._position_info(1))
+        published_messages.mark_delivered_through(None)
+        assert trackers[0].mark_delivered.call_count == 1
+
+    def test_mark_all_delivered(self, published_messages, trackers):
+        published_messages.mark_delivered_through(self._position_info(0))
+        published_messages.mark_all_delivered()
+        assert trackers[0].mark_delivered.call_args_list == [
+            mock.call([0]),
+            mock.call([1, 2]),
+        ]
+        published_messages.mark_all_delivered()
+        assert trackers[0].mark_delivered.call_args == mock.call([])
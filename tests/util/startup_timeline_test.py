@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from replication_handler.util import startup_timeline as startup_timeline_module
+from replication_handler.util.startup_timeline import Phase
+from replication_handler.util.startup_timeline import StartupTimeline
+
+
+class TestStartupTimeline(object):
+
+    @pytest.yield_fixture
+    def patch_time(self):
+        with mock.patch.object(startup_timeline_module.time, 'time') as mock_time:
+            mock_time.return_value = 100.0
+            yield mock_time
+
+    def test_phase(self, patch_time):
+        startup_timeline = StartupTimeline()
+        patch_time.return_value = 101.0
+        with startup_timeline.phase('db_connections'):
+            patch_time.return_value = 103.5
+        assert startup_timeline.phases == [
+            Phase(name='db_connections', started_at=1.0, seconds=2.5)
+        ]
+
+    def test_phase_recorded_on_exception(self, patch_time):
+        startup_timeline = StartupTimeline()
+        with pytest.raises(ValueError):
+            with startup_timeline.phase('zk_lock'):
+                raise ValueError()
+        assert [phase.name for phase in startup_timeline.phases] == ['zk_lock']
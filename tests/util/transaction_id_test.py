@@ -16,10 +16,14 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import mock
 import pytest
 
+from replication_handler.util.position import GtidPosition
+from replication_handler.util.position import LogPosition
 from replication_handler.util.transaction_id import get_gtid_meta_attribute
 from replication_handler.util.transaction_id import get_ltid_meta_attribute
+from replication_handler.util.transaction_id import TransactionIdCache
 
 
 class TestLogTransactionId(object):
@@ -97,3 +101,56 @@ class TestGlobalTransactionId(object):
 
     def test_transaction_id_payload_data(self, transaction_id, expected_to_dict):
         assert transaction_id.payload_data == expected_to_dict
+
+
+class TestTransactionIdCache(object):
+
+    @pytest.fixture
+    def cache(self, fake_transaction_id_schema_id):
+        return TransactionIdCache(fake_transaction_id_schema_id)
+
+    @pytest.mark.parametrize('positions', [
+        [GtidPosition(gtid='sid:10', offset=offset) for offset in range(3)],
+        [
+            LogPosition(
+                log_pos=100,
+                log_file='binlog.001',
+                offset=offset,
+                hb_serial=123,
+                hb_timestamp=1445429127,
+            ) for offset in range(3)
+        ],
+    ])
+    def test_matches_uncached_values(
+        self,
+        cache,
+        positions,
+        fake_transaction_id_schema_id
+    ):
+        for position in positions:
+            assert cache.get_position_dict(position, 'cluster1') == position.to_dict()
+            meta_attribute = cache.get_meta_attribute(position, 'cluster1')
+            expected = position.get_transaction_id(
+                fake_transaction_id_schema_id,
+                'cluster1'
+            )
+            assert meta_attribute.payload_data == expected.payload_data
+
+    def test_meta_attribute_built_once_per_transaction(self, cache):
+        with mock.patch.object(
+            GtidPosition,
+            'get_transaction_id'
+        ) as mock_get_transaction_id:
+            for gtid in ['sid:10', 'sid:10', 'sid:11', 'sid:11']:
+                for offset in range(3):
+                    cache.get_meta_attribute(
+                        GtidPosition(gtid=gtid, offset=offset),
+                        'cluster1'
+                    )
+            assert mock_get_transaction_id.call_count == 2
+
+    def test_position_dicts_are_not_shared(self, cache):
+        first = cache.get_position_dict(GtidPosition(gtid='sid:10', offset=1), 'cluster1')
+        second = cache.get_position_dict(GtidPosition(gtid='sid:10', offset=2), 'cluster1')
+        assert first == {'gtid': 'sid:10', 'offset': 1}
+        assert second == {'gtid': 'sid:10', 'offset': 2}